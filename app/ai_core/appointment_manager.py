@@ -3,6 +3,7 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 import groq
 import os
+from app.platform.tracing import traced
 
 class LlamaEngine:
     def __init__(self):
@@ -160,6 +161,7 @@ class AppointmentManager:
         self.llama = llama_engine
         self.calendar = calendar_manager
         
+    @traced('appointment')
     async def process_appointment_request(self, query: str) -> Dict[str, Any]:
         """Process appointment request and take appropriate action"""
         # Extract intent and parameters from query
@@ -189,6 +191,7 @@ class AppointmentManager:
                 'message': str(e)
             }
     
+    @traced('appointment.book')
     async def _handle_booking(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
         """Handle new appointment booking"""
         date = datetime.fromisoformat(parsed_query['date'])
@@ -218,6 +221,7 @@ class AppointmentManager:
             'appointment': appointment
         }
     
+    @traced('appointment.reschedule')
     async def _handle_rescheduling(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
         """Handle appointment rescheduling"""
         new_date = datetime.fromisoformat(parsed_query['date'])
@@ -247,6 +251,7 @@ class AppointmentManager:
             'appointment': appointment
         }
     
+    @traced('appointment.cancel')
     async def _handle_canceling(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
         """Handle appointment cancellation"""
         await self.calendar.cancel_appointment(
@@ -1,8 +1,15 @@
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
+import asyncio
+import threading
+import httplib2
 import pytz
+from app.platform.metrics import track_upstream
+from app.platform.tracing import span
 
 class CalendarManager:
     """
@@ -17,7 +24,10 @@ class CalendarManager:
             service_account_file: Path to the service account JSON file
         """
         self.SCOPES = ['https://www.googleapis.com/auth/calendar']
+        self.credentials = None
         self.service = self._authenticate(service_account_file)
+        # httplib2 connections are not thread-safe; each worker thread gets its own
+        self._local = threading.local()
         
     def _authenticate(self, service_account_file: str):
         """
@@ -30,14 +40,29 @@ class CalendarManager:
             Google Calendar API service
         """
         try:
-            credentials = service_account.Credentials.from_service_account_file(
+            self.credentials = service_account.Credentials.from_service_account_file(
                 service_account_file,
                 scopes=self.SCOPES
             )
-            return build('calendar', 'v3', credentials=credentials)
+            return build('calendar', 'v3', credentials=self.credentials)
         except Exception as e:
             raise Exception(f"Authentication failed: {str(e)}")
 
+    def _http(self) -> AuthorizedHttp:
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+        return http
+
+    async def _execute(self, operation: str, request):
+        """
+        Execute a Google API request on a worker thread, recording its
+        latency and outcome. The client library blocks, so running it inline
+        would stall the event loop and serialize every concurrent call.
+        """
+        with span(f'calendar.{operation}'), track_upstream('google', operation):
+            return await asyncio.to_thread(lambda: request.execute(http=self._http()))
+
     async def check_availability(
         self,
         calendar_id: str,
@@ -64,12 +89,12 @@ class CalendarManager:
             if end_time.tzinfo is None:
                 end_time = pytz.UTC.localize(end_time)
             
-            events_result = self.service.events().list(
+            events_result = await self._execute('events.list', self.service.events().list(
                 calendarId=calendar_id,
                 timeMin=start_time.isoformat(),
                 timeMax=end_time.isoformat(),
                 singleEvents=True
-            ).execute()
+            ))
             
             return len(events_result.get('items', [])) == 0
         except Exception as e:
@@ -125,11 +150,11 @@ class CalendarManager:
             if attendees:
                 event_data['attendees'] = [{'email': email} for email in attendees]
             
-            event = self.service.events().insert(
+            event = await self._execute('events.insert', self.service.events().insert(
                 calendarId=calendar_id,
                 body=event_data,
                 sendUpdates='all' if send_notifications else 'none'
-            ).execute()
+            ))
             
             return event
         except Exception as e:
@@ -163,10 +188,10 @@ class CalendarManager:
             Dict containing the updated event details
         """
         try:
-            event = self.service.events().get(
+            event = await self._execute('events.get', self.service.events().get(
                 calendarId=calendar_id,
                 eventId=event_id
-            ).execute()
+            ))
             
             if summary:
                 event['summary'] = summary
@@ -186,12 +211,12 @@ class CalendarManager:
             if attendees:
                 event['attendees'] = [{'email': email} for email in attendees]
             
-            updated_event = self.service.events().update(
+            updated_event = await self._execute('events.update', self.service.events().update(
                 calendarId=calendar_id,
                 eventId=event_id,
                 body=event,
                 sendUpdates='all' if send_notifications else 'none'
-            ).execute()
+            ))
             
             return updated_event
         except Exception as e:
@@ -212,11 +237,11 @@ class CalendarManager:
             send_notifications: Whether to send cancellation notifications
         """
         try:
-            self.service.events().delete(
+            await self._execute('events.delete', self.service.events().delete(
                 calendarId=calendar_id,
                 eventId=event_id,
                 sendUpdates='all' if send_notifications else 'none'
-            ).execute()
+            ))
         except Exception as e:
             raise Exception(f"Error canceling appointment: {str(e)}")
 
@@ -228,7 +253,7 @@ class CalendarManager:
             List of calendar details
         """
         try:
-            calendar_list = self.service.calendarList().list().execute()
+            calendar_list = await self._execute('calendarList.list', self.service.calendarList().list())
             return calendar_list.get('items', [])
         except Exception as e:
             raise Exception(f"Error getting calendar list: {str(e)}")
@@ -254,19 +279,147 @@ class CalendarManager:
             now = datetime.utcnow()
             time_max = now + timedelta(days=days)
             
-            events_result = self.service.events().list(
+            events_result = await self._execute('events.list', self.service.events().list(
                 calendarId=calendar_id,
                 timeMin=now.isoformat() + 'Z',
                 timeMax=time_max.isoformat() + 'Z',
                 maxResults=max_results,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ))
             
             return events_result.get('items', [])
         except Exception as e:
             raise Exception(f"Error getting upcoming appointments: {str(e)}")
 
+    async def get_events(
+        self,
+        calendar_id: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the events overlapping a time range.
+        
+        Args:
+            calendar_id: ID of the calendar
+            start_time: Start of the range
+            end_time: End of the range
+            
+        Returns:
+            List of event resources ordered by start time, across all pages
+        """
+        try:
+            if start_time.tzinfo is None:
+                start_time = pytz.UTC.localize(start_time)
+            if end_time.tzinfo is None:
+                end_time = pytz.UTC.localize(end_time)
+            
+            events = []
+            page_token = None
+            while True:
+                events_result = await self._execute('events.list', self.service.events().list(
+                    calendarId=calendar_id,
+                    timeMin=start_time.isoformat(),
+                    timeMax=end_time.isoformat(),
+                    singleEvents=True,
+                    orderBy='startTime',
+                    maxResults=2500,
+                    pageToken=page_token
+                ))
+                events.extend(events_result.get('items', []))
+                page_token = events_result.get('nextPageToken')
+                if not page_token:
+                    return events
+        except Exception as e:
+            raise Exception(f"Error getting events: {str(e)}")
+
+    async def create_event(self, calendar_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert an event resource as given.
+        
+        Callers may choose the event 'id' themselves, which lets them undo
+        or retry an insert whose response never arrived. Inserting an id
+        that already exists returns the existing event.
+        
+        Args:
+            calendar_id: ID of the calendar
+            event: Event resource (summary, start, end, optional id)
+            
+        Returns:
+            Dict containing the created event details
+        """
+        try:
+            return await self._execute('events.insert', self.service.events().insert(
+                calendarId=calendar_id,
+                body=event
+            ))
+        except HttpError as e:
+            if e.resp.status == 409 and event.get('id'):
+                return await self._execute('events.get', self.service.events().get(
+                    calendarId=calendar_id,
+                    eventId=event['id']
+                ))
+            raise Exception(f"Error creating event: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error creating event: {str(e)}")
+
+    async def update_event(
+        self,
+        calendar_id: str,
+        event_id: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> Dict[str, Any]:
+        """
+        Move an event to a new time range.
+        
+        Args:
+            calendar_id: ID of the calendar
+            event_id: ID of the event to move
+            start_time: New start time
+            end_time: New end time
+            
+        Returns:
+            Dict containing the updated event details
+        """
+        try:
+            if start_time.tzinfo is None:
+                start_time = pytz.UTC.localize(start_time)
+            if end_time.tzinfo is None:
+                end_time = pytz.UTC.localize(end_time)
+            
+            return await self._execute('events.patch', self.service.events().patch(
+                calendarId=calendar_id,
+                eventId=event_id,
+                body={
+                    'start': {'dateTime': start_time.isoformat(), 'timeZone': 'UTC'},
+                    'end': {'dateTime': end_time.isoformat(), 'timeZone': 'UTC'}
+                }
+            ))
+        except Exception as e:
+            raise Exception(f"Error updating event: {str(e)}")
+
+    async def delete_event(self, calendar_id: str, event_id: str) -> None:
+        """
+        Delete an event. An event that is already gone counts as deleted.
+        
+        Args:
+            calendar_id: ID of the calendar
+            event_id: ID of the event to delete
+        """
+        try:
+            await self._execute('events.delete', self.service.events().delete(
+                calendarId=calendar_id,
+                eventId=event_id
+            ))
+        except HttpError as e:
+            if e.resp.status in (404, 410):
+                return
+            raise Exception(f"Error deleting event: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error deleting event: {str(e)}")
+
 # Example usage
 if __name__ == '__main__':
     # Initialize the calendar manager
@@ -2,6 +2,8 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 import groq
 import os
+from app.platform.metrics import track_upstream
+from app.platform.tracing import span
 
 class LlamaEngine:
     def __init__(self):
@@ -15,12 +17,13 @@ class LlamaEngine:
         """
         prompt = self._create_prompt(query)
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=500
-        )
+        with span('llm', model=self.model), track_upstream('groq', 'chat.completions'):
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,
+                max_tokens=500
+            )
         
         return self._parse_response(response.choices[0].message.content)
     
@@ -0,0 +1,21 @@
+# __init__.py
+from .database import (
+    Database,
+    DatabaseError,
+    PoolTimeout,
+    QueryTimeout,
+    create_database,
+    translate_placeholders,
+)
+from .records import Doctor, Patient
+
+__all__ = [
+    'Database',
+    'DatabaseError',
+    'Doctor',
+    'Patient',
+    'PoolTimeout',
+    'QueryTimeout',
+    'create_database',
+    'translate_placeholders',
+]
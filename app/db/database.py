@@ -0,0 +1,120 @@
+# database.py
+from typing import Any, Dict, List, Optional, Sequence
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from urllib.parse import urlparse
+
+Row = Dict[str, Any]
+
+
+class DatabaseError(Exception):
+    """Base class for errors raised by the database layer"""
+
+
+class QueryTimeout(DatabaseError):
+    """A query ran longer than its timeout and was aborted"""
+
+
+class PoolTimeout(DatabaseError):
+    """No connection became free within the pool timeout"""
+
+
+@lru_cache(maxsize=1024)
+def translate_placeholders(query: str, style: str) -> str:
+    """
+    Rewrite the `%s` placeholders used throughout the app for a driver.
+
+    style is 'qmark' (`?`, sqlite3) or 'numeric' (`$1`, asyncpg). As with
+    psycopg, `%%` is a literal `%`. Results are cached, so each distinct
+    query is translated once per process.
+    """
+    parts = query.split('%%')
+    index = 0
+    for i, part in enumerate(parts):
+        pieces = part.split('%s')
+        if style == 'qmark':
+            parts[i] = '?'.join(pieces)
+            continue
+        out = [pieces[0]]
+        for piece in pieces[1:]:
+            index += 1
+            out.append(f'${index}{piece}')
+        parts[i] = ''.join(out)
+    return '%'.join(parts)
+
+
+class Database:
+    """
+    Async database interface shared by the doctor and patient modules.
+
+    Queries use `%s` placeholders whatever the backend. Every call accepts
+    an optional `timeout` in seconds overriding the default query timeout.
+    """
+
+    async def connect(self) -> None:
+        """Open the pool and prepare the schema where the backend manages it"""
+
+    async def close(self) -> None:
+        pass
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> Optional[Row]:
+        raise NotImplementedError
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> List[Row]:
+        raise NotImplementedError
+
+    async def execute(self, query: str, params: Sequence[Any] = (),
+                      timeout: Optional[float] = None) -> int:
+        """Run a statement and return the number of affected rows"""
+        raise NotImplementedError
+
+    async def execute_many(self, query: str, params_list: Sequence[Sequence[Any]],
+                           timeout: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run several statements on one connection atomically.
+
+        Usage:
+            async with db.transaction() as tx:
+                await tx.execute(...)
+                row = await tx.fetch_one(...)
+
+        `await tx.lock(key)` serializes transactions on the same key until
+        commit or rollback, so a check followed by a write cannot race
+        another transaction doing the same.
+        """
+        raise NotImplementedError
+        yield
+
+
+def create_database(url: Optional[str] = None, pool_size: int = 20, max_overflow: int = 10,
+                    query_timeout: float = 5.0, pool_timeout: float = 10.0,
+                    statement_cache_size: int = 256) -> Database:
+    """
+    Build the backend for DATABASE_URL.
+
+    postgres:// and postgresql:// use asyncpg; sqlite:///path (or no URL,
+    which means a local appointments.db) uses the standard library.
+    """
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'query_timeout': query_timeout,
+        'pool_timeout': pool_timeout,
+        'statement_cache_size': statement_cache_size
+    }
+    scheme = urlparse(url).scheme if url else 'sqlite'
+
+    if scheme in ('postgres', 'postgresql'):
+        from .postgres import PostgresDatabase
+        return PostgresDatabase(url, **options)
+    if scheme == 'sqlite':
+        from .sqlite import SQLiteDatabase
+        path = url[len('sqlite:///'):] if url else 'appointments.db'
+        return SQLiteDatabase(path or ':memory:', **options)
+    raise ValueError(f"Unsupported DATABASE_URL scheme: {scheme}")
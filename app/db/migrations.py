@@ -0,0 +1,70 @@
+# migrations.py
+"""
+Numbered changes to the schema, applied in order on connect.
+
+The tables in schema.py are created with IF NOT EXISTS, which cannot
+change a table that is already there. Anything added later (indexes,
+columns) goes here instead, and each database records the versions it
+has applied in schema_migrations, so every migration runs once. Append
+new migrations with the next version number; never edit one that has
+shipped.
+
+Statements run inside the connect transaction. On Postgres that means
+CREATE INDEX rather than CREATE INDEX CONCURRENTLY, which blocks writes
+to the table while the index builds; build large indexes by hand first
+and the IF NOT EXISTS here turns into a no-op.
+"""
+from typing import List, Tuple
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    statements: Tuple[str, ...]
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(1, 'appointment history indexes', (
+        # Patient history by status, newest first. id is the keyset tie-breaker,
+        # so pages come off the index already in order.
+        """
+        CREATE INDEX IF NOT EXISTS appointments_patient_status_slot
+        ON appointments (patient_id, status, slot_time, id)
+        """,
+        # A doctor's day: overlap checks when booking, and doctor history
+        """
+        CREATE INDEX IF NOT EXISTS appointments_doctor_slot
+        ON appointments (doctor_id, slot_time, id)
+        """,
+    )),
+)
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+async def migrate(tx, migrations: Tuple[Migration, ...] = MIGRATIONS) -> List[int]:
+    """Apply the migrations this database has not seen, returning their versions"""
+    await tx.execute(MIGRATIONS_TABLE)
+    rows = await tx.fetch_all("SELECT version FROM schema_migrations")
+    applied = {row['version'] for row in rows}
+
+    newly_applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        for statement in migration.statements:
+            await tx.execute(statement)
+        await tx.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name)
+        )
+        newly_applied.append(migration.version)
+    return newly_applied
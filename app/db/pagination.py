@@ -0,0 +1,51 @@
+# pagination.py
+"""
+Keyset pagination.
+
+A page is read with `WHERE (slot_time, id) < (last slot_time, last id)
+ORDER BY slot_time DESC, id DESC LIMIT n`, seeking straight to the next
+page through the index. Unlike OFFSET, the cost of a page does not grow
+with how deep it is, and rows inserted meanwhile do not shift later pages.
+
+The position between pages travels as an opaque cursor string, the key
+of the last row of a page.
+"""
+from typing import Any, List, Optional, Sequence, Tuple
+from datetime import datetime
+import base64
+import json
+
+from .database import Row
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not produced by encode_cursor"""
+
+
+def encode_cursor(slot_time: Any, row_id: Any) -> str:
+    if isinstance(slot_time, datetime):
+        slot_time = slot_time.isoformat()
+    data = json.dumps([slot_time, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """The (slot_time, id) key a cursor points past"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        slot_time, row_id = json.loads(data)
+        return datetime.fromisoformat(slot_time), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid pagination cursor')
+
+
+def keyset_page(rows: Sequence[Row], limit: int) -> Tuple[List[Row], Optional[str]]:
+    """
+    Split rows fetched with LIMIT limit + 1 into the page and the cursor
+    for the next one, None on the last page
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last['slot_time'], last['id'])
@@ -0,0 +1,170 @@
+# postgres.py
+from typing import Any, List, Optional, Sequence
+from contextlib import asynccontextmanager
+import asyncio
+import json
+
+from .database import Database, PoolTimeout, QueryTimeout, Row, translate_placeholders
+from .migrations import migrate
+from .schema import POSTGRES_SCHEMA
+
+# Advisory lock key held while the schema is created and migrated
+SCHEMA_LOCK = 7246001
+
+
+class PostgresTransaction:
+    """Statements run on one pooled connection inside a transaction"""
+
+    def __init__(self, database: 'PostgresDatabase', connection):
+        self._database = database
+        self._connection = connection
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> Optional[Row]:
+        return await self._database._fetch_one(self._connection, query, params, timeout)
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> List[Row]:
+        return await self._database._fetch_all(self._connection, query, params, timeout)
+
+    async def execute(self, query: str, params: Sequence[Any] = (),
+                      timeout: Optional[float] = None) -> int:
+        return await self._database._execute(self._connection, query, params, timeout)
+
+    async def execute_many(self, query: str, params_list: Sequence[Sequence[Any]],
+                           timeout: Optional[float] = None) -> None:
+        await self._connection.executemany(
+            translate_placeholders(query, 'numeric'),
+            [tuple(params) for params in params_list],
+            timeout=timeout or self._database.query_timeout
+        )
+
+    async def lock(self, key: str) -> None:
+        """Hold an advisory lock on `key` until the transaction ends"""
+        await self.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (key,))
+
+
+class PostgresDatabase(Database):
+    """
+    Postgres through asyncpg.
+
+    The pool keeps `pool_size` connections open and grows to
+    `pool_size + max_overflow` under load. asyncpg prepares each distinct
+    statement once per connection and keeps it in a per-connection cache
+    of `statement_cache_size` entries.
+    """
+
+    def __init__(self, dsn: str, pool_size: int = 20, max_overflow: int = 10,
+                 query_timeout: float = 5.0, pool_timeout: float = 10.0,
+                 statement_cache_size: int = 256):
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.query_timeout = query_timeout
+        self.pool_timeout = pool_timeout
+        self.statement_cache_size = statement_cache_size
+        self._pool = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        await self._get_pool()
+        async with self.transaction() as tx:
+            # Workers start together; one prepares the schema while the rest wait
+            await tx.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK,))
+            for statement in POSTGRES_SCHEMA:
+                await tx.execute(statement)
+            await migrate(tx)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    try:
+                        import asyncpg
+                    except ImportError as e:
+                        raise ImportError("asyncpg is required for postgres:// DATABASE_URLs") from e
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.pool_size,
+                        max_size=self.pool_size + self.max_overflow,
+                        statement_cache_size=self.statement_cache_size,
+                        command_timeout=self.query_timeout,
+                        init=self._init_connection
+                    )
+        return self._pool
+
+    @staticmethod
+    async def _init_connection(connection) -> None:
+        # Dicts and lists in and out of json/jsonb columns, like the SQLite backend
+        for type_name in ('json', 'jsonb'):
+            await connection.set_type_codec(
+                type_name, encoder=lambda value: json.dumps(value, default=str),
+                decoder=json.loads, schema='pg_catalog'
+            )
+
+    @asynccontextmanager
+    async def _connection(self):
+        pool = await self._get_pool()
+        try:
+            connection = await pool.acquire(timeout=self.pool_timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"No database connection free after {self.pool_timeout}s")
+        try:
+            yield connection
+        finally:
+            await pool.release(connection)
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> Optional[Row]:
+        async with self._connection() as connection:
+            return await self._fetch_one(connection, query, params, timeout)
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> List[Row]:
+        async with self._connection() as connection:
+            return await self._fetch_all(connection, query, params, timeout)
+
+    async def execute(self, query: str, params: Sequence[Any] = (),
+                      timeout: Optional[float] = None) -> int:
+        async with self._connection() as connection:
+            return await self._execute(connection, query, params, timeout)
+
+    async def execute_many(self, query: str, params_list: Sequence[Sequence[Any]],
+                           timeout: Optional[float] = None) -> None:
+        async with self.transaction() as tx:
+            await tx.execute_many(query, params_list, timeout)
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._connection() as connection:
+            async with connection.transaction():
+                yield PostgresTransaction(self, connection)
+
+    async def _fetch_one(self, connection, query, params, timeout) -> Optional[Row]:
+        row = await self._call(connection.fetchrow, query, params, timeout)
+        return dict(row) if row is not None else None
+
+    async def _fetch_all(self, connection, query, params, timeout) -> List[Row]:
+        rows = await self._call(connection.fetch, query, params, timeout)
+        return [dict(row) for row in rows]
+
+    async def _execute(self, connection, query, params, timeout) -> int:
+        status = await self._call(connection.execute, query, params, timeout)
+        # asyncpg returns the command tag, e.g. 'UPDATE 3'
+        count = status.rsplit(' ', 1)[-1]
+        return int(count) if count.isdigit() else 0
+
+    async def _call(self, method, query, params, timeout):
+        try:
+            return await method(
+                translate_placeholders(query, 'numeric'),
+                *params,
+                timeout=timeout or self.query_timeout
+            )
+        except asyncio.TimeoutError:
+            raise QueryTimeout(f"Query exceeded {timeout or self.query_timeout}s")
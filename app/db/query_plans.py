@@ -0,0 +1,57 @@
+# query_plans.py
+"""
+Assertions that a query is answered from an index.
+
+`assert_index_backed` asks the database for the plan of a query and fails
+on a full table scan, on a sort the index should have made unnecessary, or
+when the expected index is not used. tests/test_query_plans.py checks the
+app's hot queries with it against a fresh schema.
+"""
+from typing import Any, List, Optional, Sequence
+import re
+
+from .database import Database
+
+# Postgres sort nodes; an Incremental Sort only orders within an index range
+_POSTGRES_SORT = re.compile(r'(^|->)\s*Sort\b')
+
+
+class QueryPlanError(AssertionError):
+    """A query whose plan is not backed by the expected index"""
+
+
+async def explain(db: Database, query: str, params: Sequence[Any] = ()) -> List[str]:
+    """The plan of a query, one line per step"""
+    from .sqlite import SQLiteDatabase
+    if isinstance(db, SQLiteDatabase):
+        rows = await db.fetch_all('EXPLAIN QUERY PLAN ' + query, params)
+        return [row['detail'] for row in rows]
+
+    async with db.transaction() as tx:
+        # Small test tables are cheaper to scan; ask what the planner would do at scale
+        await tx.execute('SET LOCAL enable_seqscan = off')
+        rows = await tx.fetch_all('EXPLAIN ' + query, params)
+    return [row['QUERY PLAN'] for row in rows]
+
+
+async def assert_index_backed(db: Database, query: str, params: Sequence[Any] = (),
+                              index: Optional[str] = None, ordered: bool = True) -> List[str]:
+    """
+    Raise QueryPlanError unless the query avoids full scans, uses `index`
+    when given and, when `ordered`, needs no separate sort step.
+    Returns the plan.
+    """
+    plan = await explain(db, query, params)
+    problems = []
+    for line in plan:
+        step = line.strip()
+        if step.startswith('SCAN ') or 'Seq Scan' in step:
+            problems.append(f'full scan: {step}')
+        if ordered and ('USE TEMP B-TREE' in step or _POSTGRES_SORT.search(step)):
+            problems.append(f'sort outside the index: {step}')
+    if index is not None and not any(index in line for line in plan):
+        problems.append(f'index {index} not used')
+    if problems:
+        raise QueryPlanError('; '.join(problems) + '\n' + '\n'.join(plan))
+    return plan
+
@@ -0,0 +1,48 @@
+# records.py
+"""
+Typed rows for the doctors and patients tables.
+
+The classes use __slots__, so a cache holding many of them costs one small
+object per row rather than one dict per row. They are frozen because cached
+instances are shared between requests; treat the dict fields as read-only.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Doctor:
+    __slots__ = ('id', 'name', 'email', 'specialty', 'calendar_id',
+                 'working_hours', 'available_hours', 'cancellation_policy')
+    id: str
+    name: str
+    email: str
+    specialty: Optional[str]
+    calendar_id: Optional[str]
+    working_hours: Optional[Dict[str, Dict[str, str]]]
+    available_hours: Optional[Dict[str, list]]
+    cancellation_policy: Optional[Dict[str, Any]]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'Doctor':
+        """Build from a doctors row, ignoring columns such as password_hash"""
+        return cls(*(row.get(name) for name in cls.__slots__))
+
+
+@dataclass(frozen=True)
+class Patient:
+    __slots__ = ('id', 'name', 'email', 'phone', 'date_of_birth')
+    id: str
+    name: str
+    email: Optional[str]
+    phone: Optional[str]
+    date_of_birth: Optional[datetime]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'Patient':
+        return cls(*(row.get(name) for name in cls.__slots__))
+
+
+DOCTOR_COLUMNS = ', '.join(Doctor.__slots__)
+PATIENT_COLUMNS = ', '.join(Patient.__slots__)
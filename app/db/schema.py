@@ -0,0 +1,143 @@
+# schema.py
+"""
+Tables used by the doctor and patient modules.
+
+JSON columns hold dicts and lists (working hours, policies) and TIMESTAMP
+columns hold naive UTC datetimes, as the app writes them; the SQLite
+backend converts both on the way in and out, Postgres stores them as
+jsonb and timestamp without time zone. Appointment and outbox ids are
+integers (BIGSERIAL on Postgres), and asyncpg does not coerce strings to
+them, so callers pass ints.
+
+calendar_outbox holds the Google Calendar writes owed for appointment
+changes. Rows are inserted in the same transaction as the change and
+applied later by the calendar dispatcher. revoked_tokens is the JWT
+deny-list each worker reloads periodically.
+
+Indexes and other changes to existing tables are versioned migrations in
+migrations.py, applied after these statements.
+"""
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS doctors (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT,
+        specialty TEXT,
+        calendar_id TEXT,
+        working_hours JSON,
+        available_hours JSON,
+        cancellation_policy JSON
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS patients (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT,
+        phone TEXT,
+        date_of_birth TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS appointments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_id TEXT NOT NULL REFERENCES patients(id),
+        doctor_id TEXT NOT NULL REFERENCES doctors(id),
+        event_id TEXT,
+        slot_time TIMESTAMP NOT NULL,
+        status TEXT NOT NULL DEFAULT 'scheduled',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS calendar_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        appointment_id INTEGER NOT NULL REFERENCES appointments(id),
+        doctor_id TEXT NOT NULL,
+        operation TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        payload JSON,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMP NOT NULL,
+        last_error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS calendar_outbox_due ON calendar_outbox (status, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS calendar_outbox_appointment ON calendar_outbox (appointment_id, id)",
+    """
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        jti TEXT PRIMARY KEY,
+        doctor_id TEXT NOT NULL,
+        expires_at TIMESTAMP NOT NULL,
+        revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+]
+
+POSTGRES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS doctors (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT,
+        specialty TEXT,
+        calendar_id TEXT,
+        working_hours JSONB,
+        available_hours JSONB,
+        cancellation_policy JSONB
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS patients (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT,
+        phone TEXT,
+        date_of_birth TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS appointments (
+        id BIGSERIAL PRIMARY KEY,
+        patient_id TEXT NOT NULL REFERENCES patients(id),
+        doctor_id TEXT NOT NULL REFERENCES doctors(id),
+        event_id TEXT,
+        slot_time TIMESTAMP NOT NULL,
+        status TEXT NOT NULL DEFAULT 'scheduled',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS calendar_outbox (
+        id BIGSERIAL PRIMARY KEY,
+        appointment_id BIGINT NOT NULL REFERENCES appointments(id),
+        doctor_id TEXT NOT NULL,
+        operation TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        payload JSONB,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMP NOT NULL,
+        last_error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS calendar_outbox_due ON calendar_outbox (status, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS calendar_outbox_appointment ON calendar_outbox (appointment_id, id)",
+    """
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        jti TEXT PRIMARY KEY,
+        doctor_id TEXT NOT NULL,
+        expires_at TIMESTAMP NOT NULL,
+        revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+]
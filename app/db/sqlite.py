@@ -0,0 +1,260 @@
+# sqlite.py
+from typing import Any, Callable, List, Optional, Sequence
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+
+from .database import Database, PoolTimeout, QueryTimeout, Row, translate_placeholders
+from .migrations import migrate
+from .schema import SQLITE_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# Values written by the app and the declared column types they come back as
+sqlite3.register_adapter(datetime, lambda value: value.isoformat())
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(dict, lambda value: json.dumps(value, default=str))
+sqlite3.register_adapter(list, lambda value: json.dumps(value, default=str))
+sqlite3.register_converter('JSON', json.loads)
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+def _rows(cursor: sqlite3.Cursor) -> List[Row]:
+    rows = cursor.fetchall()
+    if not cursor.description:
+        return []
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` idle connections and opens up to `max_overflow`
+    more under load; overflow connections are closed when released.
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection], executor: ThreadPoolExecutor,
+                 size: int, max_overflow: int, timeout: float):
+        self._factory = factory
+        self._executor = executor
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self._idle: deque = deque()
+        self._total = 0
+        self._available = asyncio.Condition()
+
+    async def acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        async with self._available:
+            while not self._idle and self._total >= self.size + self.max_overflow:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                try:
+                    await asyncio.wait_for(self._available.wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+            if self._idle:
+                return self._idle.pop()
+            self._total += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._factory)
+        except BaseException:
+            async with self._available:
+                self._total -= 1
+                self._available.notify()
+            raise
+
+    async def release(self, connection: sqlite3.Connection, discard: bool = False) -> None:
+        async with self._available:
+            if discard or len(self._idle) >= self.size:
+                self._total -= 1
+                connection.close()
+            else:
+                self._idle.append(connection)
+            self._available.notify()
+
+    async def close(self) -> None:
+        async with self._available:
+            while self._idle:
+                self._idle.pop().close()
+                self._total -= 1
+
+
+class SQLiteTransaction:
+    """Statements run on one connection between BEGIN and COMMIT"""
+
+    def __init__(self, database: 'SQLiteDatabase', connection: sqlite3.Connection):
+        self._database = database
+        self._connection = connection
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> Optional[Row]:
+        rows = await self._database._query(self._connection, query, params, timeout)
+        return rows[0] if rows else None
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> List[Row]:
+        return await self._database._query(self._connection, query, params, timeout)
+
+    async def execute(self, query: str, params: Sequence[Any] = (),
+                      timeout: Optional[float] = None) -> int:
+        return await self._database._execute(self._connection, query, params, timeout)
+
+    async def execute_many(self, query: str, params_list: Sequence[Sequence[Any]],
+                           timeout: Optional[float] = None) -> None:
+        await self._database._execute(self._connection, query, params_list, timeout, many=True)
+
+    async def lock(self, key: str) -> None:
+        """Nothing to do: BEGIN IMMEDIATE already holds the database write lock"""
+
+
+class SQLiteDatabase(Database):
+    """
+    SQLite through the standard library, for local runs and single hosts.
+
+    sqlite3 is blocking, so every statement runs on a worker thread with a
+    pooled connection. Statements are compiled once per connection through
+    sqlite3's statement cache, and a query that outlives its timeout is
+    aborted with Connection.interrupt().
+    """
+
+    def __init__(self, path: str, pool_size: int = 20, max_overflow: int = 10,
+                 query_timeout: float = 5.0, pool_timeout: float = 10.0,
+                 statement_cache_size: int = 256):
+        self.path = path
+        self.query_timeout = query_timeout
+        self.statement_cache_size = statement_cache_size
+
+        if path == ':memory:':
+            # One shared in-memory database; a second connection would see another one
+            self._target = f'file:appointments-{id(self)}?mode=memory&cache=shared'
+            pool_size, max_overflow = 1, 0
+        else:
+            self._target = path
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size + max_overflow,
+            thread_name_prefix='sqlite'
+        )
+        self.pool = ConnectionPool(self._connect, self._executor, pool_size, max_overflow, pool_timeout)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._target,
+            uri=self._target.startswith('file:'),
+            timeout=self.query_timeout,
+            isolation_level=None,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size
+        )
+        connection.execute('PRAGMA foreign_keys = ON')
+        if self.path != ':memory:':
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+        return connection
+
+    async def connect(self) -> None:
+        async with self.transaction() as tx:
+            for statement in SQLITE_SCHEMA:
+                await tx.execute(statement)
+            await migrate(tx)
+
+    async def close(self) -> None:
+        await self.pool.close()
+        self._executor.shutdown(wait=False)
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> Optional[Row]:
+        rows = await self.fetch_all(query, params, timeout)
+        return rows[0] if rows else None
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = (),
+                        timeout: Optional[float] = None) -> List[Row]:
+        connection = await self.pool.acquire()
+        discard = False
+        try:
+            return await self._query(connection, query, params, timeout)
+        except asyncio.CancelledError:
+            discard = True
+            raise
+        finally:
+            await self.pool.release(connection, discard)
+
+    async def execute(self, query: str, params: Sequence[Any] = (),
+                      timeout: Optional[float] = None) -> int:
+        connection = await self.pool.acquire()
+        discard = False
+        try:
+            return await self._execute(connection, query, params, timeout)
+        except asyncio.CancelledError:
+            discard = True
+            raise
+        finally:
+            await self.pool.release(connection, discard)
+
+    async def execute_many(self, query: str, params_list: Sequence[Sequence[Any]],
+                           timeout: Optional[float] = None) -> None:
+        async with self.transaction() as tx:
+            await tx.execute_many(query, params_list, timeout)
+
+    @asynccontextmanager
+    async def transaction(self):
+        connection = await self.pool.acquire()
+        discard = False
+        try:
+            await self._run(connection, lambda: connection.execute('BEGIN IMMEDIATE'), None)
+            try:
+                yield SQLiteTransaction(self, connection)
+            except BaseException:
+                try:
+                    await self._run(connection, connection.rollback, None)
+                except Exception as e:
+                    logger.error(f"Rollback failed: {str(e)}")
+                    discard = True
+                raise
+            await self._run(connection, connection.commit, None)
+        except asyncio.CancelledError:
+            discard = True
+            raise
+        finally:
+            await self.pool.release(connection, discard)
+
+    async def _query(self, connection: sqlite3.Connection, query: str,
+                     params: Sequence[Any], timeout: Optional[float]) -> List[Row]:
+        sql = translate_placeholders(query, 'qmark')
+        return await self._run(connection, lambda: _rows(connection.execute(sql, tuple(params))), timeout)
+
+    async def _execute(self, connection: sqlite3.Connection, query: str, params: Any,
+                       timeout: Optional[float], many: bool = False) -> int:
+        sql = translate_placeholders(query, 'qmark')
+        if many:
+            work = lambda: connection.executemany(sql, [tuple(p) for p in params]).rowcount
+        else:
+            work = lambda: connection.execute(sql, tuple(params)).rowcount
+        return await self._run(connection, work, timeout)
+
+    async def _run(self, connection: sqlite3.Connection, work: Callable[[], Any],
+                   timeout: Optional[float]) -> Any:
+        """Run blocking work on the pool's threads, interrupting it after the timeout"""
+        future = asyncio.get_running_loop().run_in_executor(self._executor, work)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.query_timeout)
+        except asyncio.TimeoutError:
+            connection.interrupt()
+            await asyncio.gather(future, return_exceptions=True)
+            raise QueryTimeout(f"Query exceeded {timeout or self.query_timeout}s")
+        except asyncio.CancelledError:
+            # Never hand a connection back while a statement is still running on it
+            connection.interrupt()
+            await asyncio.gather(future, return_exceptions=True)
+            raise
@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
+from app.platform.schedule_store import DoctorSchedule
+
 @dataclass
 class Appointment:
     id: str
@@ -30,7 +32,7 @@ class DoctorCalendarView:
             
             return {
                 'success': True,
-                'schedule': self._format_schedule(appointments)
+                'schedule': self._format_schedule(doctor_id, appointments)
             }
         except Exception as e:
             return {
@@ -51,7 +53,7 @@ class DoctorCalendarView:
             
             return {
                 'success': True,
-                'schedule': self._format_schedule(appointments)
+                'schedule': self._format_schedule(doctor_id, appointments)
             }
         except Exception as e:
             return {
@@ -77,18 +79,9 @@ class DoctorCalendarView:
                 'message': str(e)
             }
     
-    def _format_schedule(self, appointments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Format appointments for display"""
-        formatted = []
-        for appt in appointments:
-            formatted.append({
-                'id': appt['id'],
-                'patient_name': appt['summary'].replace('Appointment with ', ''),
-                'start_time': appt['start']['dateTime'],
-                'end_time': appt['end']['dateTime'],
-                'status': appt.get('status', 'confirmed')
-            })
-        return formatted
+    def _format_schedule(self, doctor_id: str, appointments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Format appointments for display, in start order"""
+        return DoctorSchedule.from_events(doctor_id, appointments).to_dicts()
     
     def _format_appointment(self, appointment: Dict[str, Any]) -> Dict[str, Any]:
         """Format single appointment details"""
@@ -3,23 +3,22 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import os
 from typing import Dict, Optional, Any
-from datetime import datetime, timedelta
-import jwt
-from dataclasses import dataclass
 
-@dataclass
-class Doctor:
-    id: str
-    name: str
-    email: str
-    specialty: str
-    calendar_id: str
-    available_hours: Dict[str, list]
+from app.db.records import DOCTOR_COLUMNS, Doctor
+from app.doctor.passwords import PasswordHasher, parse_hash
+from app.doctor.token_auth import DoctorIdentity, TokenDenyList, TokenVerifier
+from app.platform.record_cache import ProfileCache
 
 class DoctorAuth:
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, profile_cache: Optional[ProfileCache] = None,
+                 token_verifier: Optional[TokenVerifier] = None,
+                 password_hasher: Optional[PasswordHasher] = None):
         self.db = db_connection
-        self.SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+        self.profile_cache = profile_cache or ProfileCache(db_connection)
+        self.token_verifier = token_verifier or TokenVerifier(
+            os.getenv('JWT_SECRET_KEY'), TokenDenyList(db_connection)
+        )
+        self.password_hasher = password_hasher or PasswordHasher()
         self.GOOGLE_SCOPES = [
             'https://www.googleapis.com/auth/calendar',
             'https://www.googleapis.com/auth/userinfo.email',
@@ -86,33 +85,90 @@ class DoctorAuth:
                 'message': str(e)
             }
     
-    async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Verify JWT token and return doctor info"""
+    async def verify_token(self, token: str) -> Optional[DoctorIdentity]:
+        """Verify JWT token and return the doctor it was issued to, from its claims"""
+        return self.token_verifier.verify(token)
+    
+    async def logout(self, token: str) -> Dict[str, Any]:
+        """Revoke a token so it is refused from now on"""
         try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=['HS256'])
-            doctor = await self._get_doctor_by_id(payload['doctor_id'])
-            return doctor if doctor else None
-        except:
-            return None
+            identity = self.token_verifier.verify(token)
+            if identity is None:
+                return {
+                    'success': False,
+                    'message': 'Invalid token'
+                }
+            if identity.jti is None or self.token_verifier.deny_list is None:
+                return {
+                    'success': False,
+                    'message': 'Token cannot be revoked'
+                }
+            
+            await self.token_verifier.deny_list.revoke(
+                identity.jti, identity.doctor_id, identity.expires_at
+            )
+            return {
+                'success': True,
+                'message': 'Logged out successfully'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
     
     def _generate_token(self, doctor: Doctor) -> str:
         """Generate JWT token for doctor"""
-        payload = {
-            'doctor_id': doctor.id,
-            'email': doctor.email,
-            'exp': datetime.utcnow() + timedelta(days=1)
-        }
-        return jwt.encode(payload, self.SECRET_KEY, algorithm='HS256')
+        return self.token_verifier.issue(doctor.id, doctor.email, doctor.name)
+    
+    async def set_password(self, doctor_id: str, password: str) -> Dict[str, Any]:
+        """Store a new password for a doctor, hashed with the current parameters"""
+        try:
+            password_hash = await self.password_hasher.hash(password)
+            updated = await self.db.execute(
+                "UPDATE doctors SET password_hash = %s WHERE id = %s", (password_hash, doctor_id)
+            )
+            if not updated:
+                return {
+                    'success': False,
+                    'message': 'Doctor not found'
+                }
+            return {
+                'success': True,
+                'message': 'Password updated'
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
     
     async def _verify_credentials(self, email: str, password: str) -> Optional[Doctor]:
-        """Verify doctor credentials against database"""
-        # Implementation would depend on your database schema
-        # This is a placeholder
-        query = "SELECT * FROM doctors WHERE email = %s"
+        """
+        Verify doctor credentials against database.
+
+        The hash is checked in the password hasher's worker processes. A
+        hash made with older parameters is replaced on success, unless the
+        password was changed in the meantime.
+        """
+        query = f"SELECT {DOCTOR_COLUMNS}, password_hash FROM doctors WHERE email = %s"
         result = await self.db.fetch_one(query, (email,))
-        if result and self._verify_password(password, result['password_hash']):
-            return Doctor(**result)
-        return None
+        if not result or parse_hash(result['password_hash']) is None:
+            # Take as long as a wrong password, so unknown emails cannot be told apart
+            await self.password_hasher.burn(password)
+            return None
+        
+        valid, upgraded_hash = await self.password_hasher.verify_and_upgrade(
+            password, result['password_hash']
+        )
+        if not valid:
+            return None
+        if upgraded_hash:
+            await self.db.execute(
+                "UPDATE doctors SET password_hash = %s WHERE id = %s AND password_hash = %s",
+                (upgraded_hash, result['id'], result['password_hash'])
+            )
+        return Doctor.from_row(result)
     
     async def _get_google_profile(self, creds: Credentials) -> Doctor:
         """Get doctor profile from Google"""
@@ -121,7 +177,5 @@ class DoctorAuth:
         pass
     
     async def _get_doctor_by_id(self, doctor_id: str) -> Optional[Doctor]:
-        """Get doctor info from database"""
-        query = "SELECT * FROM doctors WHERE id = %s"
-        result = await self.db.fetch_one(query, (doctor_id,))
-        return Doctor(**result) if result else None
+        """Get doctor info, from the profile cache when fresh"""
+        return await self.profile_cache.get_doctor(doctor_id)
@@ -0,0 +1,137 @@
+# passwords.py
+from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+
+SCHEME = 'scrypt'
+
+
+def hash_password(password: str, n: int, r: int, p: int) -> str:
+    """'scrypt$n$r$p$salt$key', salt and key in unpadded base64"""
+    salt = os.urandom(16)
+    key = _scrypt(password, salt, n, r, p)
+    return '$'.join((SCHEME, str(n), str(r), str(p), _b64encode(salt), _b64encode(key)))
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Whether password matches an encoded hash; malformed hashes never match"""
+    params = parse_hash(encoded)
+    if params is None:
+        return False
+    n, r, p, salt, key = params
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p, len(key)), key)
+
+
+def parse_hash(encoded: Optional[str]) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+    try:
+        scheme, n, r, p, salt, key = encoded.split('$')
+        if scheme != SCHEME:
+            return None
+        return int(n), int(r), int(p), _b64decode(salt), _b64decode(key)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, length: int = 32) -> bytes:
+    # scrypt needs 128 * r * n bytes; the default cap of 32 MiB is too low for n >= 2**15
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * n + 1024 * 1024, dklen=length)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """
+    scrypt hashing and verification in a small pool of worker processes.
+
+    A KDF slow enough to resist offline guessing takes tens of milliseconds
+    of CPU per call; run on the event loop, every login would stall every
+    other request in the worker for that long. Here the work runs in
+    `workers` separate processes, and at most `max_pending` calls wait for
+    them, so a login burst queues cheaply instead of piling work onto the
+    pool.
+
+    Hashes record their own parameters. When n, r or p are raised, existing
+    hashes still verify and `verify_and_upgrade` returns a replacement
+    made with the current parameters, so passwords move to the new cost as
+    doctors sign in.
+    """
+
+    def __init__(self, workers: int = 2, n: int = 2 ** 14, r: int = 8, p: int = 1,
+                 max_pending: int = 64):
+        self.workers = workers
+        self.n = n
+        self.r = r
+        self.p = p
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dummy_hash: Optional[str] = None
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.n, self.r, self.p)
+
+    async def verify(self, password: str, encoded: Optional[str]) -> bool:
+        if parse_hash(encoded) is None:
+            return False
+        return await self._run(verify_password, password, encoded)
+
+    async def verify_and_upgrade(self, password: str, encoded: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Whether the password matches, and a new hash when the stored one uses old parameters"""
+        if not await self.verify(password, encoded):
+            return False, None
+        if self.needs_rehash(encoded):
+            return True, await self.hash(password)
+        return True, None
+
+    async def burn(self, password: str) -> None:
+        """
+        Spend the time of a verification without a stored hash, so an
+        unknown email takes as long to refuse as a wrong password
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(os.urandom(16).hex())
+        await self.verify(password, self._dummy_hash)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        params = parse_hash(encoded)
+        return params is None or params[:3] != (self.n, self.r, self.p)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, function, *args):
+        async with self._slots:
+            pool = self._executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(pool, function, *args)
+            except BrokenProcessPool:
+                # A worker died (killed, out of memory); start a fresh pool next time
+                if self._pool is pool:
+                    self.close()
+                raise
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Forking a process that runs threads (database, Google clients) can copy
+            # a held lock into the child. A fork server only preloads this module.
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
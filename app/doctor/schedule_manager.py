@@ -1,12 +1,19 @@
 # schedule_manager.py
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import pytz
 
+from app.platform.record_cache import ProfileCache
+
 class DoctorScheduleManager:
-    def __init__(self, calendar_manager, db_connection):
+    def __init__(self, calendar_manager, db_connection,
+                 profile_cache: Optional[ProfileCache] = None,
+                 schedule_notifier=None):
         self.calendar_manager = calendar_manager
         self.db = db_connection
+        self.profile_cache = profile_cache
+        # Bumps the calendar version, so cached schedule and slot reads are recomputed
+        self.schedule_notifier = schedule_notifier
     
     async def set_availability(self, doctor_id: str, 
                              availability: Dict[str, List[Dict[str, str]]]) -> Dict[str, Any]:
@@ -17,6 +24,7 @@ class DoctorScheduleManager:
             
             # Create availability blocks in calendar
             await self._create_calendar_blocks(doctor_id, availability)
+            await self._notify_availability(doctor_id)
             
             return {
                 'success': True,
@@ -63,6 +71,7 @@ class DoctorScheduleManager:
             }
             
             await self.calendar_manager.create_event(doctor_id, event)
+            await self._notify_availability(doctor_id)
             
             return {
                 'success': True,
@@ -85,6 +94,9 @@ class DoctorScheduleManager:
                 WHERE id = %s
             """
             await self.db.execute(query, (working_hours, doctor_id))
+            if self.profile_cache:
+                await self.profile_cache.doctor_changed(doctor_id)
+            await self._notify_availability(doctor_id)
             
             return {
                 'success': True,
@@ -96,6 +108,10 @@ class DoctorScheduleManager:
                 'message': str(e)
             }
     
+    async def _notify_availability(self, doctor_id: str) -> None:
+        if self.schedule_notifier:
+            await self.schedule_notifier.notify(doctor_id, 'availability')
+    
     async def _update_doctor_availability(self, doctor_id: str,
                                         availability: Dict[str, List[Dict[str, str]]]) -> None:
         """Update doctor's availability in database"""
@@ -105,6 +121,8 @@ class DoctorScheduleManager:
             WHERE id = %s
         """
         await self.db.execute(query, (availability, doctor_id))
+        if self.profile_cache:
+            await self.profile_cache.doctor_changed(doctor_id)
     
     async def _create_calendar_blocks(self, doctor_id: str,
                                     availability: Dict[str, List[Dict[str, str]]]) -> None:
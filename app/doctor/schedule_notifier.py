@@ -0,0 +1,152 @@
+# schedule_notifier.py
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+from collections import deque
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_CHANNEL = 'schedule_updates'
+
+
+class ScheduleSubscription:
+    """A single dashboard session listening to one doctor's schedule"""
+
+    def __init__(self, doctor_id: str, max_pending: int):
+        self.doctor_id = doctor_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def offer(self, delta: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            # The session fell behind, it will be told to resync
+            self.overflowed = True
+
+
+class ScheduleNotifier:
+    """
+    Pushes compact schedule deltas to doctor dashboards.
+
+    Deltas carry a per-doctor sequence number shared by all workers. Every
+    worker keeps a short history of recent deltas so a dashboard that
+    reconnects can resume from the last sequence number it saw.
+    """
+
+    def __init__(self, state_backend, history_size: int = 256, max_pending: int = 100):
+        self.state_backend = state_backend
+        self.history_size = history_size
+        self.max_pending = max_pending
+        self._history: Dict[str, deque] = {}
+        self._subscriptions: Dict[str, Set[ScheduleSubscription]] = {}
+        # Called with the doctor ID whenever any worker changes that doctor's schedule
+        self._change_listeners: List[Callable[[str], None]] = []
+
+    async def start(self) -> None:
+        """Listen for deltas published by any worker"""
+        await self.state_backend.subscribe(SCHEDULE_CHANNEL, self._on_delta)
+
+    async def publish(self, doctor_id: str, op: str, appointment_id: Optional[str] = None,
+                      start_time: Optional[datetime] = None,
+                      end_time: Optional[datetime] = None,
+                      status: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Announce a change to a doctor's schedule
+
+        Args:
+            doctor_id: Doctor whose day changed
+            op: 'add', 'move', 'remove', 'availability' when working hours,
+                availability or blocked time change, or 'synced' once queued
+                calendar writes have reached Google Calendar
+            appointment_id: Calendar event ID of the appointment (not sent for 'availability' or 'synced')
+            start_time: New start time (add/move)
+            end_time: New end time (add/move)
+            status: Appointment status
+        """
+        delta = {
+            'doctor_id': doctor_id,
+            'seq': await self.state_backend.next_sequence(f'schedule_seq:{doctor_id}'),
+            'op': op
+        }
+        if appointment_id is not None:
+            delta['id'] = appointment_id
+        if start_time is not None:
+            delta['start'] = start_time.isoformat()
+        if end_time is not None:
+            delta['end'] = end_time.isoformat()
+        if status is not None:
+            delta['status'] = status
+
+        await self.state_backend.publish(SCHEDULE_CHANNEL, delta)
+        return delta
+
+    async def notify(self, doctor_id: str, op: str, appointment_id: Optional[str] = None,
+                     **fields) -> None:
+        """Best-effort publish used by write paths; a push failure never fails a booking"""
+        try:
+            await self.publish(doctor_id, op, appointment_id, **fields)
+        except Exception as e:
+            logger.error(f"Failed to push schedule update for doctor {doctor_id}: {str(e)}")
+
+    async def version(self, doctor_id: str) -> int:
+        """
+        Calendar version of a doctor, shared by all workers. Bumped by every
+        write when it commits and again when the calendar dispatcher has
+        applied it to Google, which is what schedule and slot reads see.
+        """
+        return await self.state_backend.get_sequence(f'schedule_seq:{doctor_id}')
+
+    def add_change_listener(self, listener: Callable[[str], None]) -> None:
+        self._change_listeners.append(listener)
+
+    def subscribe(self, doctor_id: str) -> ScheduleSubscription:
+        subscription = ScheduleSubscription(doctor_id, self.max_pending)
+        self._subscriptions.setdefault(doctor_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ScheduleSubscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.doctor_id)
+        if subscriptions:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.doctor_id]
+
+    def replay(self, doctor_id: str, since: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Deltas newer than `since`, or None if the history no longer reaches
+        back that far and the dashboard must reload the full schedule
+        """
+        history = self._history.get(doctor_id, ())
+        if history and since < history[0]['seq'] - 1:
+            return None
+        if not history and since > 0:
+            # Nothing recorded on this worker (e.g. after a restart)
+            return None
+        return [delta for delta in history if delta['seq'] > since]
+
+    def latest_sequence(self, doctor_id: str) -> int:
+        history = self._history.get(doctor_id)
+        return history[-1]['seq'] if history else 0
+
+    async def _on_delta(self, delta: Dict[str, Any]) -> None:
+        doctor_id = delta['doctor_id']
+        history = self._history.get(doctor_id)
+        if history is None:
+            history = self._history[doctor_id] = deque(maxlen=self.history_size)
+        if history and delta['seq'] < history[-1]['seq']:
+            # Concurrent publishers can arrive out of order, keep history sorted
+            position = next(i for i, d in enumerate(history) if d['seq'] > delta['seq'])
+            if len(history) == history.maxlen:
+                history.popleft()
+                position -= 1
+            history.insert(max(position, 0), delta)
+        else:
+            history.append(delta)
+
+        for listener in self._change_listeners:
+            listener(doctor_id)
+
+        for subscription in self._subscriptions.get(doctor_id, ()):
+            subscription.offer(delta)
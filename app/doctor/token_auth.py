@@ -0,0 +1,182 @@
+# token_auth.py
+from typing import Any, Dict, Optional, Set
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import time
+import uuid
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DoctorIdentity:
+    """Who a verified token belongs to, taken from its claims alone"""
+    __slots__ = ('doctor_id', 'email', 'name', 'jti', 'expires_at')
+    doctor_id: str
+    email: Optional[str]
+    name: Optional[str]
+    jti: Optional[str]
+    expires_at: float
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> 'DoctorIdentity':
+        return cls(
+            str(claims.get('sub') or claims['doctor_id']),
+            claims.get('email'),
+            claims.get('name'),
+            claims.get('jti'),
+            float(claims['exp'])
+        )
+
+
+class VerifiedTokenCache:
+    """
+    Tokens whose signature and claims have already been checked.
+
+    Bounded LRU; an entry is dropped once its token expires, so a hit never
+    returns an identity the token itself would no longer grant.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, DoctorIdentity]' = OrderedDict()
+
+    def get(self, token: str) -> Optional[DoctorIdentity]:
+        identity = self._entries.get(token)
+        if identity is None:
+            return None
+        if identity.expires_at <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return identity
+
+    def put(self, token: str, identity: DoctorIdentity) -> None:
+        self._entries[token] = identity
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TokenDenyList:
+    """
+    Revoked token ids, kept in memory and reloaded from the revoked_tokens
+    table every `sync_interval` seconds.
+
+    A revocation takes effect at once on the worker that made it and on the
+    others at their next sync. Only unexpired revocations are loaded, so the
+    set stays as small as the number of tokens revoked within one token
+    lifetime.
+    """
+
+    def __init__(self, db_connection, sync_interval: float = 30.0):
+        self.db = db_connection
+        self.sync_interval = sync_interval
+        self._revoked: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.last_synced: Optional[float] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    async def revoke(self, jti: str, doctor_id: str, expires_at: float) -> None:
+        query = """
+            INSERT INTO revoked_tokens (jti, doctor_id, expires_at)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (jti) DO NOTHING
+        """
+        expiry = datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+        if not self.is_revoked(jti):
+            await self.db.execute(query, (jti, doctor_id, expiry))
+            self._revoked.add(jti)
+
+    async def sync(self) -> None:
+        now = datetime.utcnow()
+        rows = await self.db.fetch_all(
+            "SELECT jti FROM revoked_tokens WHERE expires_at > %s", (now,)
+        )
+        self._revoked = {row['jti'] for row in rows}
+        self.last_synced = time.time()
+
+    async def start(self) -> None:
+        """Load the list, then keep it in sync in the background"""
+        await self.sync()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                # Keep the last good list rather than forgetting revocations
+                logger.warning(f"Token deny-list sync failed: {str(e)}")
+
+
+class TokenVerifier:
+    """
+    Issues and verifies doctor JWTs without touching the database.
+
+    A token is trusted for what its claims say: the signature, expiry and
+    deny-list are checked, but the doctor row is not read. A verified token
+    is cached, so repeat requests skip the HMAC and JSON decoding too.
+    """
+
+    ALGORITHM = 'HS256'
+
+    def __init__(self, secret: Optional[str], deny_list: Optional[TokenDenyList] = None,
+                 cache_size: int = 10000, lifetime_hours: float = 24):
+        self.secret = secret
+        self.deny_list = deny_list
+        self.cache = VerifiedTokenCache(cache_size)
+        self.lifetime = timedelta(hours=lifetime_hours)
+
+    def issue(self, doctor_id: str, email: Optional[str] = None, name: Optional[str] = None) -> str:
+        now = datetime.now(timezone.utc)
+        payload = {
+            'sub': doctor_id,
+            'doctor_id': doctor_id,
+            'email': email,
+            'name': name,
+            'jti': uuid.uuid4().hex,
+            'iat': now,
+            'exp': now + self.lifetime
+        }
+        return jwt.encode(payload, self.secret, algorithm=self.ALGORITHM)
+
+    def verify(self, token: str) -> Optional[DoctorIdentity]:
+        """Identity for a valid, unrevoked token, or None"""
+        if not token or not self.secret:
+            return None
+        identity = self.cache.get(token)
+        if identity is None:
+            try:
+                claims = jwt.decode(token, self.secret, algorithms=[self.ALGORITHM])
+                identity = DoctorIdentity.from_claims(claims)
+            except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+                return None
+            self.cache.put(token, identity)
+        if self.deny_list and self.deny_list.is_revoked(identity.jti):
+            return None
+        return identity
+
+    def verify_header(self, authorization: Optional[str]) -> Optional[DoctorIdentity]:
+        """Identity for an 'Authorization: Bearer <token>' header value, or None"""
+        if not authorization or not authorization.lower().startswith('bearer '):
+            return None
+        return self.verify(authorization[7:].strip())
@@ -1,20 +1,58 @@
 # appointment_booking.py
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+import uuid
 
-@dataclass
-class Patient:
-    id: str
-    name: str
-    email: str
-    phone: str
-    date_of_birth: datetime
+from app.db.records import Patient
+from app.platform.calendar_outbox import CalendarOutbox
+from app.platform.concurrency import gather_or_cancel
+from app.platform.record_cache import ProfileCache
+from app.platform.schedule_store import DoctorSchedule
+from app.platform.slot_holds import SlotHold, SlotHolds
+
+# Served by the appointments (doctor_id, slot_time) index
+SLOT_TAKEN_QUERY = """
+    SELECT 1 FROM appointments
+    WHERE doctor_id = %s AND status = 'scheduled'
+      AND slot_time > %s AND slot_time < %s
+    LIMIT 1
+"""
+
+def doctor_lock(doctor_id: str) -> str:
+    """Transaction lock key serializing writes to one doctor's appointments"""
+    return f'appointments:{doctor_id}'
+
+def calendar_event(patient: Patient, slot_time: datetime) -> Dict[str, Any]:
+    """Event resource for an appointment, under a new id chosen by the app"""
+    return {
+        'id': uuid.uuid4().hex,
+        'summary': f'Appointment with {patient.name}',
+        'description': f'Patient: {patient.name}\nPhone: {patient.phone}',
+        'start': {
+            'dateTime': slot_time.isoformat(),
+            'timeZone': 'UTC',
+        },
+        'end': {
+            'dateTime': (slot_time + timedelta(minutes=30)).isoformat(),
+            'timeZone': 'UTC',
+        },
+        # Read back by the schedule store, which keeps patient ids per event
+        'extendedProperties': {
+            'private': {'patient_id': patient.id}
+        }
+    }
 
 class AppointmentBooking:
-    def __init__(self, calendar_manager, db_connection):
+    def __init__(self, calendar_manager, db_connection, schedule_notifier=None,
+                 calendar_outbox: Optional[CalendarOutbox] = None,
+                 profile_cache: Optional[ProfileCache] = None,
+                 slot_holds: Optional[SlotHolds] = None):
         self.calendar_manager = calendar_manager
         self.db = db_connection
+        self.schedule_notifier = schedule_notifier
+        self.calendar_outbox = calendar_outbox or CalendarOutbox(db_connection)
+        self.profile_cache = profile_cache or ProfileCache(db_connection)
+        self.slot_holds = slot_holds or SlotHolds()
         
     async def find_available_slots(self, doctor_id: str, 
                                  start_date: datetime,
@@ -24,12 +62,12 @@ class AppointmentBooking:
             # Get doctor's working hours
             working_hours = await self._get_doctor_working_hours(doctor_id)
             
-            # Get existing appointments
-            booked_slots = await self.calendar_manager.get_events(
+            # Get existing appointments, parsed once for this request into a searchable schedule
+            booked_slots = DoctorSchedule.from_events(doctor_id, await self.calendar_manager.get_events(
                 doctor_id,
                 start_date,
                 end_date
-            )
+            ))
             
             # Generate available slots
             available_slots = self._generate_available_slots(
@@ -49,53 +87,26 @@ class AppointmentBooking:
                 'message': str(e)
             }
     
-    async def book_appointment(self, patient_id: str, doctor_id: str,
-                             slot_time: datetime) -> Dict[str, Any]:
-        """Book an appointment for a patient"""
+    async def hold_slot(self, patient_id: str, doctor_id: str,
+                        slot_time: datetime) -> Dict[str, Any]:
+        """
+        Hold a free slot for a patient while they finish booking.
+
+        The returned hold_token is passed to book_appointment, which then
+        books without reading the calendar again.
+        """
         try:
-            # Verify slot is still available
-            is_available = await self.calendar_manager.check_availability(
-                doctor_id,
-                slot_time
-            )
-            
-            if not is_available:
+            hold, message = await self._hold_available_slot(patient_id, doctor_id, slot_time)
+            if hold is None:
                 return {
                     'success': False,
-                    'message': 'Selected time slot is no longer available'
-                }
-            
-            # Get patient details
-            patient = await self._get_patient_details(patient_id)
-            
-            # Create calendar event
-            event = {
-                'summary': f'Appointment with {patient.name}',
-                'description': f'Patient: {patient.name}\nPhone: {patient.phone}',
-                'start': {
-                    'dateTime': slot_time.isoformat(),
-                    'timeZone': 'UTC',
-                },
-                'end': {
-                    'dateTime': (slot_time + timedelta(minutes=30)).isoformat(),
-                    'timeZone': 'UTC',
+                    'message': message
                 }
-            }
-            
-            appointment = await self.calendar_manager.create_event(doctor_id, event)
-            
-            # Save appointment to database
-            await self._save_appointment_to_db(
-                patient_id,
-                doctor_id,
-                appointment['id'],
-                slot_time
-            )
-            
             return {
                 'success': True,
-                'message': 'Appointment booked successfully',
-                'appointment': appointment
+                'message': 'Slot held',
+                'hold_token': hold.token,
+                'expires_at': datetime.fromtimestamp(hold.expires_at, timezone.utc).isoformat()
             }
         except Exception as e:
             return {
@@ -103,29 +114,151 @@ class AppointmentBooking:
                 'message': str(e)
             }
     
+    async def book_appointment(self, patient_id: str, doctor_id: str,
+                             slot_time: datetime, hold_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Book an appointment for a patient.
+
+        The slot is held first, so of several patients booking it at once
+        only one goes on to read the calendar and write; the others are
+        turned away straight from the hold. With a hold_token from
+        hold_slot the availability check has already been done. The
+        appointment row and its calendar event are then committed in one
+        local transaction; the event itself is written to Google later by
+        the calendar dispatcher, under the id chosen here.
+        """
+        try:
+            if hold_token is None:
+                hold, message = await self._hold_available_slot(patient_id, doctor_id, slot_time)
+            else:
+                hold = await self.slot_holds.confirm(doctor_id, slot_time, hold_token)
+                message = 'Your hold on this slot has expired, please choose the slot again'
+            if hold is None:
+                return {
+                    'success': False,
+                    'message': message
+                }
+            try:
+                return await self._confirm_booking(patient_id, doctor_id, slot_time)
+            finally:
+                # Booked or not, the appointments table now decides
+                await self.slot_holds.release(hold)
+        except Exception as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+    
+    async def _hold_available_slot(self, patient_id: str, doctor_id: str,
+                                   slot_time: datetime) -> Tuple[Optional[SlotHold], Optional[str]]:
+        """A hold on a slot the calendar shows free, or None and the reason"""
+        hold = await self.slot_holds.hold(doctor_id, slot_time)
+        if hold is None:
+            return None, 'Selected time slot is being booked by another patient'
+        try:
+            is_available, _ = await gather_or_cancel(
+                self.calendar_manager.check_availability(doctor_id, slot_time),
+                self._get_patient_details(patient_id)
+            )
+        except BaseException:
+            await self.slot_holds.release(hold)
+            raise
+        if not is_available:
+            await self.slot_holds.release(hold)
+            return None, 'Selected time slot is no longer available'
+        return hold, None
+    
+    async def _confirm_booking(self, patient_id: str, doctor_id: str,
+                               slot_time: datetime) -> Dict[str, Any]:
+        """Write a held slot's appointment and announce it"""
+        # Cached by the availability check
+        patient = await self._get_patient_details(patient_id)
+        
+        # Calendar event, created by the dispatcher
+        event = calendar_event(patient, slot_time)
+        
+        appointment_id = await self._save_appointment_to_db(
+            patient_id,
+            doctor_id,
+            event,
+            slot_time
+        )
+        if appointment_id is None:
+            return {
+                'success': False,
+                'message': 'Selected time slot is no longer available'
+            }
+        self.calendar_outbox.wake()
+        
+        # Push the new slot to the doctor's open dashboards
+        if self.schedule_notifier:
+            await self.schedule_notifier.notify(
+                doctor_id,
+                'add',
+                event['id'],
+                start_time=slot_time,
+                end_time=slot_time + timedelta(minutes=30),
+                status='confirmed'
+            )
+        
+        return {
+            'success': True,
+            'message': 'Appointment booked successfully',
+            'appointment_id': appointment_id,
+            'appointment': event,
+            'sync_status': 'pending'
+        }
+    
     async def _get_doctor_working_hours(self, doctor_id: str) -> Dict[str, Dict[str, str]]:
-        """Get doctor's working hours from database"""
-        query = "SELECT working_hours FROM doctors WHERE id = %s"
-        result = await self.db.fetch_one(query, (doctor_id,))
-        return result['working_hours']
+        """Get doctor's working hours, from the profile cache when fresh"""
+        doctor = await self.profile_cache.get_doctor(doctor_id)
+        if doctor is None:
+            raise ValueError('Doctor not found')
+        return doctor.working_hours or {}
     
     async def _get_patient_details(self, patient_id: str) -> Patient:
-        """Get patient details from database"""
-        query = "SELECT * FROM patients WHERE id = %s"
-        result = await self.db.fetch_one(query, (patient_id,))
-        return Patient(**result)
+        """Get patient details, from the profile cache when fresh"""
+        patient = await self.profile_cache.get_patient(patient_id)
+        if patient is None:
+            raise ValueError('Patient not found')
+        return patient
     
     async def _save_appointment_to_db(self, patient_id: str, doctor_id: str,
-                                    event_id: str, slot_time: datetime) -> None:
-        """Save appointment details to database"""
-        query = """
-            INSERT INTO appointments (patient_id, doctor_id, event_id, slot_time)
-            VALUES (%s, %s, %s, %s)
+                                    event: Dict[str, Any], slot_time: datetime) -> Optional[int]:
+        """
+        Save the appointment and queue its calendar event in one transaction.
+
+        Returns the new appointment id, or None when another appointment
+        for the doctor overlaps the slot. The calendar lags the database
+        until the dispatcher catches up, so the database is what guards
+        against double bookings: the doctor's lock is taken before the
+        overlap check, so two bookings for the same doctor check and insert
+        one after the other rather than both passing the check.
         """
-        await self.db.execute(query, (patient_id, doctor_id, event_id, slot_time))
+        async with self.db.transaction() as tx:
+            await tx.lock(doctor_lock(doctor_id))
+            if await self._slot_taken(tx, doctor_id, slot_time):
+                return None
+            query = """
+                INSERT INTO appointments (patient_id, doctor_id, event_id, slot_time)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+            """
+            row = await tx.fetch_one(query, (patient_id, doctor_id, event['id'], slot_time))
+            await self.calendar_outbox.enqueue(tx, row['id'], doctor_id, 'create', event['id'], event)
+            return row['id']
+    
+    async def _slot_taken(self, tx, doctor_id: str, slot_time: datetime) -> bool:
+        """Whether a scheduled appointment overlaps the 30 minutes from slot_time"""
+        row = await tx.fetch_one(SLOT_TAKEN_QUERY, (
+            doctor_id,
+            slot_time - timedelta(minutes=30),
+            slot_time + timedelta(minutes=30)
+        ))
+        return row is not None
     
     def _generate_available_slots(self, working_hours: Dict[str, Dict[str, str]],
-                                booked_slots: List[Dict[str, Any]],
+                                booked_slots: DoctorSchedule,
                                 start_date: datetime,
                                 end_date: datetime) -> List[datetime]:
         """Generate list of available time slots"""
@@ -149,15 +282,6 @@ class AppointmentBooking:
         
         return available_slots
     
-    def _is_slot_booked(self, slot_time: datetime,
-                        booked_slots: List[Dict[str, Any]]) -> bool:
+    def _is_slot_booked(self, slot_time: datetime, booked_slots: DoctorSchedule) -> bool:
         """Check if a time slot is already booked"""
-        slot_end = slot_time + timedelta(minutes=30)
-        for event in booked_slots:
-            event_start = datetime.fromisoformat(event['start']['dateTime'].rstrip('Z'))
-            event_end = datetime.fromisoformat(event['end']['dateTime'].rstrip('Z'))
-            
-            if (slot_time >= event_start and slot_time < event_end) or \
-               (slot_end > event_start and slot_end <= event_end):
-                return True
-        return False
+        return booked_slots.is_busy(slot_time, slot_time + timedelta(minutes=30))
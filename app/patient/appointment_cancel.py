@@ -1,13 +1,23 @@
 
 # appointment_cancel.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from app.patient.appointment_history import AppointmentHistory
+from app.platform.calendar_outbox import CalendarOutbox
+from app.platform.record_cache import ProfileCache
 
 class AppointmentCancel:
-    def __init__(self, calendar_manager, db_connection):
+    def __init__(self, calendar_manager, db_connection, schedule_notifier=None,
+                 calendar_outbox: Optional[CalendarOutbox] = None,
+                 profile_cache: Optional[ProfileCache] = None):
         self.calendar_manager = calendar_manager
         self.db = db_connection
+        self.schedule_notifier = schedule_notifier
+        self.calendar_outbox = calendar_outbox or CalendarOutbox(db_connection)
+        self.profile_cache = profile_cache or ProfileCache(db_connection)
+        self.history = AppointmentHistory(db_connection)
     
-    async def cancel_appointment(self, appointment_id: str) -> Dict[str, Any]:
+    async def cancel_appointment(self, appointment_id: int) -> Dict[str, Any]:
         """Cancel an existing appointment"""
         try:
             # Get appointment details
@@ -23,18 +33,26 @@ class AppointmentCancel:
                     'message': 'Appointment not found'
                 }
             
-            # Delete calendar event
-            await self.calendar_manager.delete_event(
-                appointment['doctor_id'],
-                appointment['event_id']
-            )
+            # Cancel in the database; the dispatcher deletes the calendar event
+            async with self.db.transaction() as tx:
+                await self._update_appointment_status(tx, appointment_id, 'cancelled')
+                await self.calendar_outbox.enqueue(
+                    tx, appointment_id, appointment['doctor_id'], 'delete', appointment['event_id']
+                )
+            self.calendar_outbox.wake()
             
-            # Update database
-            await self._update_appointment_status(appointment_id, 'cancelled')
+            if self.schedule_notifier:
+                await self.schedule_notifier.notify(
+                    appointment['doctor_id'],
+                    'remove',
+                    appointment['event_id'],
+                    status='cancelled'
+                )
             
             return {
                 'success': True,
-                'message': 'Appointment cancelled successfully'
+                'message': 'Appointment cancelled successfully',
+                'sync_status': 'pending'
             }
         except Exception as e:
             return {
@@ -45,12 +63,16 @@ class AppointmentCancel:
     async def get_cancellation_policy(self, doctor_id: str) -> Dict[str, Any]:
         """Get doctor's cancellation policy"""
         try:
-            query = "SELECT cancellation_policy FROM doctors WHERE id = %s"
-            result = await self.db.fetch_one(query, (doctor_id,))
+            doctor = await self.profile_cache.get_doctor(doctor_id)
+            if doctor is None:
+                return {
+                    'success': False,
+                    'message': 'Doctor not found'
+                }
             
             return {
                 'success': True,
-                'policy': result['cancellation_policy']
+                'policy': doctor.cancellation_policy
             }
         except Exception as e:
             return {
@@ -58,34 +80,17 @@ class AppointmentCancel:
                 'message': str(e)
             }
     
-    async def _update_appointment_status(self, appointment_id: str,
+    async def _update_appointment_status(self, tx, appointment_id: int,
                                        status: str) -> None:
-        """Update appointment status in database"""
+        """Update appointment status within a transaction"""
         query = """
             UPDATE appointments
             SET status = %s
             WHERE id = %s
         """
-        await self.db.execute(query, (status, appointment_id))
+        await tx.execute(query, (status, appointment_id))
     
-    async def get_cancellation_history(self, patient_id: str) -> Dict[str, Any]:
-        """Get patient's appointment cancellation history"""
-        try:
-            query = """
-                SELECT a.*, d.name as doctor_name
-                FROM appointments a
-                JOIN doctors d ON a.doctor_id = d.id
-                WHERE a.patient_id = %s AND a.status = 'cancelled'
-                ORDER BY a.slot_time DESC
-            """
-            history = await self.db.fetch_all(query, (patient_id,))
-            
-            return {
-                'success': True,
-                'history': history
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'message': str(e)
-            }
\ No newline at end of file
+    async def get_cancellation_history(self, patient_id: str, limit: int = 20,
+                                       cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get a page of the patient's cancelled appointments, newest first"""
+        return await self.history.patient_history(patient_id, 'cancelled', limit, cursor)
@@ -0,0 +1,106 @@
+# appointment_history.py
+from typing import Dict, Any, Optional
+
+from app.db.pagination import decode_cursor, keyset_page
+
+# Newest first, one page at a time. {after} is empty on the first page and
+# AFTER_CURSOR on the rest; both forms are checked by tests/test_query_plans.py.
+PATIENT_HISTORY_QUERY = """
+    SELECT a.id, a.doctor_id, a.event_id, a.slot_time, a.status, a.created_at,
+           d.name AS doctor_name
+    FROM appointments a
+    JOIN doctors d ON a.doctor_id = d.id
+    WHERE a.patient_id = %s AND a.status = %s {after}
+    ORDER BY a.slot_time DESC, a.id DESC
+    LIMIT %s
+"""
+
+DOCTOR_HISTORY_QUERY = """
+    SELECT a.id, a.patient_id, a.event_id, a.slot_time, a.status, a.created_at,
+           p.name AS patient_name
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+    WHERE a.doctor_id = %s {status} {after}
+    ORDER BY a.slot_time DESC, a.id DESC
+    LIMIT %s
+"""
+
+AFTER_CURSOR = "AND (a.slot_time, a.id) < (%s, %s)"
+STATUSES = ('scheduled', 'cancelled')
+
+
+class AppointmentHistory:
+    """
+    Past and upcoming appointments of a patient or doctor, newest first.
+
+    Pages are read by keyset: pass the `next_cursor` of one page to get the
+    next, until it comes back None. Each page is one index range read on
+    appointments, whatever page it is.
+    """
+
+    def __init__(self, db_connection, max_page_size: int = 100):
+        self.db = db_connection
+        self.max_page_size = max_page_size
+
+    async def patient_history(self, patient_id: str, status: str = 'scheduled',
+                              limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """A page of a patient's appointments with the given status"""
+        try:
+            if status not in STATUSES:
+                return {
+                    'success': False,
+                    'message': f"status must be one of {', '.join(STATUSES)}"
+                }
+            limit = self._page_size(limit)
+            params = [patient_id, status]
+            after = ''
+            if cursor:
+                params.extend(decode_cursor(cursor))
+                after = AFTER_CURSOR
+            rows = await self.db.fetch_all(PATIENT_HISTORY_QUERY.format(after=after), (*params, limit + 1))
+            history, next_cursor = keyset_page(rows, limit)
+            return {
+                'success': True,
+                'history': history,
+                'next_cursor': next_cursor
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+    async def doctor_history(self, doctor_id: str, status: Optional[str] = None,
+                             limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """A page of a doctor's appointments, all of them or those with one status"""
+        try:
+            if status is not None and status not in STATUSES:
+                return {
+                    'success': False,
+                    'message': f"status must be one of {', '.join(STATUSES)}"
+                }
+            limit = self._page_size(limit)
+            params = [doctor_id]
+            status_clause = after = ''
+            if status is not None:
+                params.append(status)
+                status_clause = 'AND a.status = %s'
+            if cursor:
+                params.extend(decode_cursor(cursor))
+                after = AFTER_CURSOR
+            query = DOCTOR_HISTORY_QUERY.format(status=status_clause, after=after)
+            rows = await self.db.fetch_all(query, (*params, limit + 1))
+            history, next_cursor = keyset_page(rows, limit)
+            return {
+                'success': True,
+                'history': history,
+                'next_cursor': next_cursor
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+    def _page_size(self, limit: int) -> int:
+        return max(1, min(int(limit), self.max_page_size))
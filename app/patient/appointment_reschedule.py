@@ -3,6 +3,11 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 
+from app.patient.appointment_booking import doctor_lock
+from app.platform.calendar_outbox import CalendarOutbox
+from app.platform.concurrency import gather_or_cancel
+from app.platform.record_cache import ProfileCache
+
 @dataclass
 class Patient:
     id: str
@@ -163,29 +168,39 @@ class AppointmentBooking:
         return False
 
 # appointment_reschedule.py
+# By primary key; names come from the profile cache rather than a join
+APPOINTMENT_QUERY = """
+    SELECT id, patient_id, doctor_id, event_id, slot_time, status, created_at
+    FROM appointments
+    WHERE id = %s
+"""
+
 class AppointmentReschedule:
-    def __init__(self, calendar_manager, db_connection):
+    def __init__(self, calendar_manager, db_connection, schedule_notifier=None,
+                 calendar_outbox: Optional[CalendarOutbox] = None,
+                 profile_cache: Optional[ProfileCache] = None):
         self.calendar_manager = calendar_manager
         self.db = db_connection
+        self.schedule_notifier = schedule_notifier
+        self.calendar_outbox = calendar_outbox or CalendarOutbox(db_connection)
+        self.profile_cache = profile_cache or ProfileCache(db_connection)
         
-    async def get_appointment(self, appointment_id: str) -> Dict[str, Any]:
-        """Get appointment details"""
+    async def get_appointment(self, appointment_id: int) -> Dict[str, Any]:
+        """Get appointment details, with patient and doctor names from the profile cache"""
         try:
-            query = """
-                SELECT a.*, p.name as patient_name, d.name as doctor_name
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.id
-                JOIN doctors d ON a.doctor_id = d.id
-                WHERE a.id = %s
-            """
-            appointment = await self.db.fetch_one(query, (appointment_id,))
-            
+            appointment = await self._get_appointment_row(appointment_id)
             if not appointment:
                 return {
                     'success': False,
                     'message': 'Appointment not found'
                 }
             
+            patient, doctor = await gather_or_cancel(
+                self.profile_cache.get_patient(appointment['patient_id']),
+                self.profile_cache.get_doctor(appointment['doctor_id'])
+            )
+            appointment['patient_name'] = patient.name if patient else None
+            appointment['doctor_name'] = doctor.name if doctor else None
             return {
                 'success': True,
                 'appointment': appointment
@@ -196,42 +211,63 @@ class AppointmentReschedule:
                 'message': str(e)
             }
     
-    async def reschedule_appointment(self, appointment_id: str,
+    async def reschedule_appointment(self, appointment_id: int,
                                    new_slot_time: datetime) -> Dict[str, Any]:
-        """Reschedule an existing appointment"""
+        """
+        Reschedule an existing appointment.
+
+        The new time and the calendar move it needs are committed together;
+        the calendar dispatcher moves the Google event afterwards.
+        """
         try:
-            # Get appointment details
-            appointment = await self.get_appointment(appointment_id)
-            if not appointment['success']:
-                return appointment
+            # The row alone; rescheduling needs no names
+            appointment = await self._get_appointment_row(appointment_id)
+            if not appointment:
+                return {
+                    'success': False,
+                    'message': 'Appointment not found'
+                }
+            if appointment['status'] != 'scheduled':
+                return {
+                    'success': False,
+                    'message': f"Cannot reschedule a {appointment['status']} appointment"
+                }
+            
+            doctor_id = appointment['doctor_id']
+            event_id = appointment['event_id']
             
             # Verify new slot is available
             is_available = await self.calendar_manager.check_availability(
-                appointment['appointment']['doctor_id'],
+                doctor_id,
                 new_slot_time
             )
             
-            if not is_available:
+            if not is_available or not await self._update_appointment_in_db(
+                    appointment_id, doctor_id, event_id, new_slot_time):
                 return {
                     'success': False,
                     'message': 'Selected time slot is not available'
                 }
+            self.calendar_outbox.wake()
             
-            # Update calendar event
-            event = await self.calendar_manager.update_event(
-                appointment['appointment']['doctor_id'],
-                appointment['appointment']['event_id'],
-                new_slot_time,
-                new_slot_time + timedelta(minutes=30)
-            )
-            
-            # Update database
-            await self._update_appointment_in_db(appointment_id, new_slot_time)
+            if self.schedule_notifier:
+                await self.schedule_notifier.notify(
+                    doctor_id,
+                    'move',
+                    event_id,
+                    start_time=new_slot_time,
+                    end_time=new_slot_time + timedelta(minutes=30)
+                )
             
             return {
                 'success': True,
                 'message': 'Appointment rescheduled successfully',
-                'appointment': event
+                'appointment': {
+                    'id': appointment_id,
+                    'event_id': event_id,
+                    'slot_time': new_slot_time.isoformat()
+                },
+                'sync_status': 'pending'
             }
         except Exception as e:
             return {
@@ -239,12 +275,45 @@ class AppointmentReschedule:
                 'message': str(e)
             }
     
-    async def _update_appointment_in_db(self, appointment_id: str,
-                                      new_slot_time: datetime) -> None:
-        """Update appointment time in database"""
-        query = """
-            UPDATE appointments
-            SET slot_time = %s
-            WHERE id = %s
+    async def _get_appointment_row(self, appointment_id: int) -> Optional[Dict[str, Any]]:
+        return await self.db.fetch_one(APPOINTMENT_QUERY, (appointment_id,))
+    
+    async def _update_appointment_in_db(self, appointment_id: int, doctor_id: str,
+                                      event_id: str, new_slot_time: datetime) -> bool:
         """
-        await self.db.execute(query, (new_slot_time, appointment_id))
+        Move the appointment and queue the calendar move in one transaction.
+
+        Returns False when another scheduled appointment overlaps the new slot.
+        The doctor's lock is held from the overlap check to the commit.
+        Raises ValueError if the appointment was cancelled or completed since
+        it was read, so no calendar move is queued for a deleted event.
+        """
+        async with self.db.transaction() as tx:
+            await tx.lock(doctor_lock(doctor_id))
+            query = """
+                SELECT 1 FROM appointments
+                WHERE doctor_id = %s AND status = 'scheduled' AND id != %s
+                  AND slot_time > %s AND slot_time < %s
+                LIMIT 1
+            """
+            conflict = await tx.fetch_one(query, (
+                doctor_id,
+                appointment_id,
+                new_slot_time - timedelta(minutes=30),
+                new_slot_time + timedelta(minutes=30)
+            ))
+            if conflict:
+                return False
+            
+            query = """
+                UPDATE appointments
+                SET slot_time = %s
+                WHERE id = %s AND status = 'scheduled'
+            """
+            if not await tx.execute(query, (new_slot_time, appointment_id)):
+                raise ValueError('Appointment is no longer scheduled')
+            await self.calendar_outbox.enqueue(tx, appointment_id, doctor_id, 'move', event_id, {
+                'start': new_slot_time.isoformat(),
+                'end': (new_slot_time + timedelta(minutes=30)).isoformat()
+            })
+            return True
@@ -0,0 +1,320 @@
+# bulk_booking.py
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+from bisect import bisect_right
+from itertools import islice
+
+from app.db.records import PATIENT_COLUMNS, Patient
+from app.patient.appointment_booking import calendar_event, doctor_lock
+from app.patient.recurrence import RecurrenceError, expand_rrule
+from app.platform.calendar_outbox import CalendarOutbox
+from app.platform.concurrency import gather_or_cancel
+from app.platform.slot_holds import SlotHold, SlotHolds, slot_key
+
+SLOT_LENGTH = timedelta(minutes=30)
+
+
+@dataclass
+class BookingItem:
+    patient_id: str
+    doctor_id: str
+    slot_time: datetime
+
+
+class BusyTimes:
+    """
+    Busy intervals of one doctor, merged and sorted so that each slot is
+    checked with a binary search instead of a scan over every event.
+    """
+
+    def __init__(self, intervals: List[Tuple[datetime, datetime]]):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        index = bisect_right(self.starts, start) - 1
+        if index >= 0 and self.ends[index] > start:
+            return True
+        return index + 1 < len(self.starts) and self.starts[index + 1] < end
+
+
+class BulkBooking:
+    """
+    Books many appointments in one request: a patient's recurring series or
+    several patients at once.
+
+    Every slot is checked against one calendar read per doctor and one
+    database read, and the accepted appointments are written with their
+    outbox entries in a single transaction. With `atomic` the whole batch
+    is booked or none of it is; otherwise each slot that is free is booked
+    and the rest are reported.
+
+    Each slot is held for the length of the request, like a single booking,
+    so a slot another patient is holding through hold_slot is reported as
+    unavailable rather than taken from under them.
+    """
+
+    def __init__(self, calendar_manager, db_connection, schedule_notifier=None,
+                 calendar_outbox: Optional[CalendarOutbox] = None, max_items: int = 100,
+                 slot_holds: Optional[SlotHolds] = None):
+        self.calendar_manager = calendar_manager
+        self.db = db_connection
+        self.schedule_notifier = schedule_notifier
+        self.calendar_outbox = calendar_outbox or CalendarOutbox(db_connection)
+        self.max_items = max_items
+        self.slot_holds = slot_holds or SlotHolds()
+
+    async def book_series(self, patient_id: str, doctor_id: str, start: datetime,
+                          rrule: str, atomic: bool = True) -> Dict[str, Any]:
+        """Book every occurrence of an RRULE (e.g. 'FREQ=WEEKLY;BYDAY=MO;COUNT=8') from start"""
+        try:
+            # Take one past the limit to tell a long series from an exact fit
+            slots = list(islice(expand_rrule(start, rrule), self.max_items + 1))
+        except RecurrenceError as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+        if len(slots) > self.max_items:
+            return {
+                'success': False,
+                'message': f'A series can book at most {self.max_items} appointments; add COUNT or UNTIL'
+            }
+        items = [BookingItem(patient_id, doctor_id, slot) for slot in slots]
+        return await self.book_many(items, atomic)
+
+    async def book_many(self, items: List[BookingItem], atomic: bool = True) -> Dict[str, Any]:
+        """Book a list of appointments, returning one result per item in request order"""
+        if not items:
+            return {
+                'success': False,
+                'message': 'No appointments to book'
+            }
+        if len(items) > self.max_items:
+            return {
+                'success': False,
+                'message': f'At most {self.max_items} appointments can be booked at once'
+            }
+        try:
+            holds = await self._hold_slots(items)
+            try:
+                return await self._book_held(items, holds, atomic)
+            finally:
+                # Booked or not, the appointments table now decides
+                await gather_or_cancel(*(self.slot_holds.release(hold)
+                                         for hold in holds.values() if hold is not None))
+        except Exception as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+    async def _book_held(self, items: List[BookingItem], holds: Dict[str, Optional[SlotHold]],
+                         atomic: bool) -> Dict[str, Any]:
+        patients, calendar_busy = await gather_or_cancel(
+            self._get_patients({item.patient_id for item in items}),
+            self._get_calendar_busy(items)
+        )
+
+        async with self.db.transaction() as tx:
+            booked_busy = await self._get_booked_busy(tx, items)
+            reasons = self._check(items, patients, holds, calendar_busy, booked_busy)
+            rejected = any(reasons)
+            if atomic and rejected:
+                return self._results(items, reasons, {}, atomic)
+
+            accepted = [(item, calendar_event(patients[item.patient_id], item.slot_time))
+                        for item, reason in zip(items, reasons) if reason is None]
+            appointment_ids = await self._save_appointments(tx, accepted)
+        self.calendar_outbox.wake()
+
+        if self.schedule_notifier:
+            for item, event in accepted:
+                await self.schedule_notifier.notify(
+                    item.doctor_id,
+                    'add',
+                    event['id'],
+                    start_time=item.slot_time,
+                    end_time=item.slot_time + SLOT_LENGTH,
+                    status='confirmed'
+                )
+
+        booked = {id(item): (appointment_ids[event['id']], event['id']) for item, event in accepted}
+        return self._results(items, reasons, booked, atomic)
+
+    async def _hold_slots(self, items: List[BookingItem]) -> Dict[str, Optional[SlotHold]]:
+        """A hold on each distinct slot by slot key, None where someone else holds it"""
+        slots = {slot_key(item.doctor_id, item.slot_time): item for item in items}
+        holds = await gather_or_cancel(*(self.slot_holds.hold(item.doctor_id, item.slot_time)
+                                         for item in slots.values()))
+        return dict(zip(slots, holds))
+
+    async def _get_patients(self, patient_ids) -> Dict[str, Patient]:
+        patient_ids = list(patient_ids)
+        placeholders = ', '.join(['%s'] * len(patient_ids))
+        query = f"SELECT {PATIENT_COLUMNS} FROM patients WHERE id IN ({placeholders})"
+        rows = await self.db.fetch_all(query, patient_ids)
+        return {row['id']: Patient.from_row(row) for row in rows}
+
+    async def _get_calendar_busy(self, items: List[BookingItem]) -> Dict[str, BusyTimes]:
+        """One calendar read per doctor, spanning all of that doctor's slots"""
+        ranges = self._doctor_ranges(items)
+        doctors = list(ranges)
+        results = await gather_or_cancel(*[
+            self.calendar_manager.get_events(doctor_id, *ranges[doctor_id]) for doctor_id in doctors
+        ])
+        busy = {}
+        for doctor_id, events in zip(doctors, results):
+            intervals = []
+            for event in events:
+                # Free-time blocks and cancelled events do not take the slot
+                if event.get('transparency') == 'transparent' or event.get('status') == 'cancelled':
+                    continue
+                intervals.append((_event_time(event['start']), _event_time(event['end'])))
+            busy[doctor_id] = BusyTimes(intervals)
+        return busy
+
+    async def _get_booked_busy(self, tx, items: List[BookingItem]) -> Dict[str, BusyTimes]:
+        """
+        Scheduled appointments near the requested slots, read inside the write transaction.
+
+        Takes each doctor's lock first, in sorted order so two bulk requests
+        sharing doctors cannot deadlock.
+        """
+        ranges = self._doctor_ranges(items)
+        doctors = sorted(ranges)
+        for doctor_id in doctors:
+            await tx.lock(doctor_lock(doctor_id))
+        placeholders = ', '.join(['%s'] * len(doctors))
+        query = f"""
+            SELECT doctor_id, slot_time FROM appointments
+            WHERE doctor_id IN ({placeholders}) AND status = 'scheduled'
+              AND slot_time > %s AND slot_time < %s
+        """
+        earliest = min(start for start, _ in ranges.values()) - SLOT_LENGTH
+        latest = max(end for _, end in ranges.values())
+        rows = await tx.fetch_all(query, (*doctors, earliest, latest))
+
+        intervals: Dict[str, List[Tuple[datetime, datetime]]] = {doctor_id: [] for doctor_id in doctors}
+        for row in rows:
+            slot_time = row['slot_time']
+            if isinstance(slot_time, str):
+                slot_time = datetime.fromisoformat(slot_time)
+            slot_time = _utc(slot_time)
+            intervals[row['doctor_id']].append((slot_time, slot_time + SLOT_LENGTH))
+        return {doctor_id: BusyTimes(found) for doctor_id, found in intervals.items()}
+
+    def _check(self, items: List[BookingItem], patients: Dict[str, Patient],
+               holds: Dict[str, Optional[SlotHold]], calendar_busy: Dict[str, BusyTimes],
+               booked_busy: Dict[str, BusyTimes]) -> List[Optional[str]]:
+        """Why each item cannot be booked, or None when it can"""
+        reasons: List[Optional[str]] = []
+        taken: Dict[str, List[Tuple[datetime, datetime]]] = {}
+        for item in items:
+            start = _utc(item.slot_time)
+            end = start + SLOT_LENGTH
+            if item.patient_id not in patients:
+                reasons.append('Patient not found')
+            elif holds[slot_key(item.doctor_id, item.slot_time)] is None:
+                reasons.append('Slot is being booked by another patient')
+            elif booked_busy[item.doctor_id].overlaps(start, end):
+                reasons.append('Overlaps an existing appointment')
+            elif calendar_busy[item.doctor_id].overlaps(start, end):
+                reasons.append("Slot is busy on the doctor's calendar")
+            elif any(start < other_end and other_start < end
+                     for other_start, other_end in taken.get(item.doctor_id, ())):
+                reasons.append('Overlaps another appointment in this request')
+            else:
+                reasons.append(None)
+                taken.setdefault(item.doctor_id, []).append((start, end))
+        return reasons
+
+    async def _save_appointments(self, tx, accepted: List[Tuple[BookingItem, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Insert the appointments and their outbox entries, returning appointment ids by event id"""
+        if not accepted:
+            return {}
+        await tx.execute_many(
+            """
+            INSERT INTO appointments (patient_id, doctor_id, event_id, slot_time)
+            VALUES (%s, %s, %s, %s)
+            """,
+            [(item.patient_id, item.doctor_id, event['id'], item.slot_time) for item, event in accepted]
+        )
+        event_ids = [event['id'] for _, event in accepted]
+        placeholders = ', '.join(['%s'] * len(event_ids))
+        rows = await tx.fetch_all(
+            f"SELECT id, event_id FROM appointments WHERE event_id IN ({placeholders})",
+            event_ids
+        )
+        appointment_ids = {row['event_id']: row['id'] for row in rows}
+
+        await self.calendar_outbox.enqueue_many(tx, [
+            {
+                'appointment_id': appointment_ids[event['id']],
+                'doctor_id': item.doctor_id,
+                'operation': 'create',
+                'event_id': event['id'],
+                'payload': event
+            }
+            for item, event in accepted
+        ])
+        return appointment_ids
+
+    def _results(self, items: List[BookingItem], reasons: List[Optional[str]],
+                 booked: Dict[int, Tuple[Any, str]], atomic: bool) -> Dict[str, Any]:
+        results = []
+        for item, reason in zip(items, reasons):
+            result = {
+                'patient_id': item.patient_id,
+                'doctor_id': item.doctor_id,
+                'slot_time': item.slot_time.isoformat(),
+                'success': id(item) in booked
+            }
+            if id(item) in booked:
+                result['appointment_id'], result['event_id'] = booked[id(item)]
+                result['sync_status'] = 'pending'
+            else:
+                result['message'] = reason or 'Not booked because other appointments in the series failed'
+            results.append(result)
+
+        count = len(booked)
+        if atomic and count < len(items):
+            message = 'No appointments booked; some slots are not available'
+        else:
+            message = f'Booked {count} of {len(items)} appointments'
+        return {
+            'success': count == len(items) if atomic else count > 0,
+            'message': message,
+            'booked': count,
+            'results': results
+        }
+
+    @staticmethod
+    def _doctor_ranges(items: List[BookingItem]) -> Dict[str, Tuple[datetime, datetime]]:
+        ranges: Dict[str, Tuple[datetime, datetime]] = {}
+        for item in items:
+            start = _utc(item.slot_time)
+            earliest, latest = ranges.get(item.doctor_id, (start, start + SLOT_LENGTH))
+            ranges[item.doctor_id] = (min(earliest, start), max(latest, start + SLOT_LENGTH))
+        return ranges
+
+
+def _utc(value: datetime) -> datetime:
+    """Naive UTC, the form slot times are stored in"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _event_time(value: Dict[str, str]) -> datetime:
+    if 'dateTime' in value:
+        return _utc(datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00')))
+    # All-day events carry a date only
+    return datetime.fromisoformat(value['date'])
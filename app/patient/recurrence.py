@@ -0,0 +1,110 @@
+# recurrence.py
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime, timedelta
+import calendar
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+
+
+class RecurrenceError(ValueError):
+    """An RRULE that is malformed or uses parts that are not supported"""
+
+
+def parse_rrule(rule: str) -> Dict[str, str]:
+    """Split 'FREQ=WEEKLY;COUNT=4' (an optional 'RRULE:' prefix is allowed) into its parts"""
+    if rule.upper().startswith('RRULE:'):
+        rule = rule[len('RRULE:'):]
+    parts = {}
+    for part in filter(None, rule.split(';')):
+        name, sep, value = part.partition('=')
+        if not sep or not value:
+            raise RecurrenceError(f"Malformed RRULE part: {part!r}")
+        parts[name.strip().upper()] = value.strip().upper()
+    return parts
+
+
+def expand_rrule(start: datetime, rule: str) -> Iterator[datetime]:
+    """
+    Yield the occurrences of an RFC 5545 recurrence rule, starting at `start`.
+
+    Supports FREQ (DAILY, WEEKLY, MONTHLY), INTERVAL, COUNT, UNTIL and, for
+    weekly rules, BYDAY. Occurrences are produced one at a time, so an
+    open-ended rule costs nothing until the caller takes from it; callers
+    decide how many to take. A monthly rule skips months that are too
+    short for the start day, as RFC 5545 requires.
+    """
+    parts = parse_rrule(rule)
+    unknown = set(parts) - {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY'}
+    if unknown:
+        raise RecurrenceError(f"Unsupported RRULE parts: {', '.join(sorted(unknown))}")
+
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise RecurrenceError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    try:
+        interval = int(parts.get('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        raise RecurrenceError("INTERVAL and COUNT must be integers")
+    if interval < 1 or (count is not None and count < 0):
+        raise RecurrenceError("INTERVAL must be positive and COUNT not negative")
+    until = _parse_until(parts['UNTIL']) if 'UNTIL' in parts else None
+
+    weekdays = None
+    if 'BYDAY' in parts:
+        if freq != 'WEEKLY':
+            raise RecurrenceError("BYDAY is only supported with FREQ=WEEKLY")
+        try:
+            weekdays = sorted(WEEKDAYS[day] for day in parts['BYDAY'].split(','))
+        except KeyError:
+            raise RecurrenceError(f"Unknown BYDAY value in {parts['BYDAY']!r}")
+
+    produced = 0
+    for occurrence in _occurrences(start, freq, interval, weekdays):
+        if count is not None and produced >= count:
+            return
+        if until is not None and occurrence > until:
+            return
+        produced += 1
+        yield occurrence
+
+
+def _occurrences(start: datetime, freq: str, interval: int,
+                 weekdays: Optional[List[int]]) -> Iterator[datetime]:
+    if freq == 'DAILY':
+        step = timedelta(days=interval)
+        current = start
+        while True:
+            yield current
+            current += step
+
+    elif freq == 'WEEKLY':
+        if not weekdays:
+            weekdays = [start.weekday()]
+        week_start = start - timedelta(days=start.weekday())
+        while True:
+            for weekday in weekdays:
+                occurrence = week_start + timedelta(days=weekday)
+                if occurrence >= start:
+                    yield occurrence
+            week_start += timedelta(weeks=interval)
+
+    else:
+        year, month = start.year, start.month
+        while True:
+            if start.day <= calendar.monthrange(year, month)[1]:
+                yield start.replace(year=year, month=month)
+            month += interval
+            year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+
+
+def _parse_until(value: str) -> datetime:
+    for pattern in ('%Y%m%dT%H%M%SZ', '%Y%m%dT%H%M%S', '%Y%m%d'):
+        try:
+            until = datetime.strptime(value, pattern)
+        except ValueError:
+            continue
+        # A date-only UNTIL includes that whole day
+        return until + timedelta(days=1, microseconds=-1) if pattern == '%Y%m%d' else until
+    raise RecurrenceError(f"Malformed UNTIL: {value!r}")
@@ -1,4 +1,20 @@
-from .user_interaction import UserInteraction
-from .voice_input_handler import VoiceInputHandler
+from importlib import import_module
 
-__all__ = ['UserInteraction', 'VoiceInputHandler']
+# Submodules are imported on first attribute access so that light modules
+# such as turn_manager do not pull in the voice and AI dependencies
+_EXPORTS = {
+    'UserInteraction': '.user_interaction',
+    'VoiceInputHandler': '.voice_input_handler',
+    'TurnManager': '.turn_manager',
+    'ClientConnection': '.client_connection',
+}
+
+__all__ = ['UserInteraction', 'VoiceInputHandler', 'TurnManager', 'ClientConnection']
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,128 @@
+# admission.py
+from typing import Dict, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import IntEnum
+import asyncio
+import time
+
+
+class Priority(IntEnum):
+    """Request classes, most important first"""
+    BOOKING = 0   # booking, rescheduling, cancelling, login
+    BROWSE = 1    # slot and schedule reads
+    CHAT = 2      # conversational turns and voice processing
+
+
+@dataclass
+class Decision:
+    admitted: bool
+    reason: Optional[str] = None
+    retry_after: float = 0.0
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float, reserve: float = 0.0) -> float:
+        """
+        Take a token if doing so leaves at least `reserve` behind.
+        Returns 0 on success, otherwise the seconds until it would succeed.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = 1.0 + reserve
+        if self.tokens >= needed:
+            self.tokens -= 1.0
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes a sleeping task, a direct
+    signal that the worker has more work than it can keep up with.
+    """
+
+    def __init__(self, interval: float = 0.05, smoothing: float = 0.3):
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            # React to spikes immediately, decay smoothly
+            self.lag = lag if lag > self.lag else self.lag + self.smoothing * (lag - self.lag)
+
+
+class AdmissionController:
+    """
+    Decides whether to accept a request before any work is done for it.
+
+    Each client (JWT subject, client ID or address) has a token bucket.
+    Lower priority requests must leave a reserve of tokens untouched, so a
+    client that exhausts its budget on chat can still book. When event loop
+    lag passes a priority's threshold, requests of that priority are shed
+    for everyone, lowest priority first.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: float = 20.0, max_clients: int = 10000,
+                 lag_thresholds: Optional[Dict[Priority, float]] = None,
+                 lag_monitor: Optional[LoopLagMonitor] = None):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.lag_thresholds = lag_thresholds or {
+            Priority.BOOKING: 1.0,
+            Priority.BROWSE: 0.25,
+            Priority.CHAT: 0.1
+        }
+        # Share of the bucket each class must leave for higher classes
+        self.reserves = {
+            Priority.BOOKING: 0.0,
+            Priority.BROWSE: 0.25 * burst,
+            Priority.CHAT: 0.5 * burst
+        }
+        self.lag_monitor = lag_monitor or LoopLagMonitor()
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+
+    def admit(self, client_key: str, priority: Priority) -> Decision:
+        lag = self.lag_monitor.lag
+        if lag > self.lag_thresholds.get(priority, float('inf')):
+            return Decision(False, 'overloaded', retry_after=1.0)
+
+        now = time.monotonic()
+        bucket = self._buckets.get(client_key)
+        if bucket is None:
+            bucket = self._buckets[client_key] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_key)
+
+        wait = bucket.take(now, self.reserves.get(priority, 0.0))
+        if wait:
+            return Decision(False, 'rate_limited', retry_after=wait)
+        return Decision(True)
@@ -0,0 +1,300 @@
+# calendar_outbox.py
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import random
+
+from app.platform import metrics
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_OPERATIONS = metrics.registry.counter(
+    'calendar_outbox_operations_total',
+    'Calendar writes applied from the outbox by outcome',
+    ('operation', 'outcome')
+)
+
+# Oldest due entries whose appointment has no earlier entry still pending,
+# so the operations for one appointment are applied in the order committed
+DUE_ENTRIES = """
+    SELECT o.* FROM calendar_outbox o
+    WHERE o.status = 'pending' AND o.next_attempt_at <= %s
+      AND NOT EXISTS (
+          SELECT 1 FROM calendar_outbox earlier
+          WHERE earlier.appointment_id = o.appointment_id
+            AND earlier.id < o.id AND earlier.status = 'pending'
+      )
+    ORDER BY o.id
+    LIMIT %s
+"""
+
+
+class CalendarOutbox:
+    """
+    Calendar writes owed for committed appointment changes.
+
+    `enqueue` runs inside the caller's transaction, so an appointment row and
+    the calendar operation it needs are committed or rolled back together.
+    Operations are 'create' (payload is the event resource), 'move' (payload
+    has ISO 'start' and 'end') and 'delete'.
+    """
+
+    OPERATIONS = ('create', 'move', 'delete')
+
+    def __init__(self, db_connection):
+        self.db = db_connection
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, tx, appointment_id: int, doctor_id: str, operation: str,
+                      event_id: str, payload: Optional[Dict[str, Any]] = None) -> None:
+        """Record an operation on the given transaction; call `wake` after commit"""
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unknown calendar operation: {operation}")
+        query = """
+            INSERT INTO calendar_outbox
+                (appointment_id, doctor_id, operation, event_id, payload, next_attempt_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        await tx.execute(query, (appointment_id, doctor_id, operation, event_id,
+                                 payload, datetime.utcnow()))
+
+    async def enqueue_many(self, tx, entries: List[Dict[str, Any]]) -> None:
+        """
+        Record several operations in one statement. Each entry has the
+        arguments of `enqueue`: appointment_id, doctor_id, operation,
+        event_id and optionally payload.
+        """
+        now = datetime.utcnow()
+        rows = []
+        for entry in entries:
+            if entry['operation'] not in self.OPERATIONS:
+                raise ValueError(f"Unknown calendar operation: {entry['operation']}")
+            rows.append((entry['appointment_id'], entry['doctor_id'], entry['operation'],
+                         entry['event_id'], entry.get('payload'), now))
+        query = """
+            INSERT INTO calendar_outbox
+                (appointment_id, doctor_id, operation, event_id, payload, next_attempt_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        await tx.execute_many(query, rows)
+
+    def wake(self) -> None:
+        """Tell the dispatcher new entries are committed"""
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def sync_status(self, appointment_id: int) -> Dict[str, Any]:
+        """
+        Whether an appointment's calendar event matches the database.
+
+        'synced' once every operation has been applied, 'pending' while any
+        is queued or being retried, 'failed' when the latest one gave up.
+        """
+        try:
+            query = """
+                SELECT id, operation, status, attempts, last_error, updated_at
+                FROM calendar_outbox WHERE appointment_id = %s ORDER BY id
+            """
+            entries = await self.db.fetch_all(query, (appointment_id,))
+            if not entries:
+                return {
+                    'success': False,
+                    'message': 'No calendar operations recorded for this appointment'
+                }
+
+            latest = entries[-1]
+            pending = [entry for entry in entries if entry['status'] == 'pending']
+            if pending:
+                status = 'pending'
+            elif latest['status'] == 'failed':
+                status = 'failed'
+            else:
+                status = 'synced'
+
+            return {
+                'success': True,
+                'sync_status': status,
+                'pending_operations': [entry['operation'] for entry in pending],
+                'attempts': (pending[0] if pending else latest)['attempts'],
+                'last_error': (pending[0] if pending else latest)['last_error'],
+                'last_synced_at': max(
+                    (entry['updated_at'] for entry in entries
+                     if entry['status'] == 'done' and entry['updated_at']),
+                    default=None
+                )
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': str(e)
+            }
+
+
+class CalendarDispatcher:
+    """
+    Applies outbox entries to Google Calendar in the background.
+
+    Each round claims up to `batch_size` due entries by pushing their next
+    attempt past a lease, applies them with at most `concurrency` calls in
+    flight, and records the outcomes. Failures are retried with jittered
+    exponential backoff and marked 'failed' after `max_attempts`. A worker
+    that dies mid-round leaves its claims to be retried once the lease runs
+    out, which is safe because every operation is idempotent: events are
+    created under the id stored with the appointment, moves set absolute
+    times and deleting a missing event succeeds.
+
+    Reads of a doctor's calendar only see a change once it is applied here,
+    so applied listeners are called with each doctor whose calendar a round
+    changed, after the outcomes are recorded.
+    """
+
+    def __init__(self, outbox: CalendarOutbox, calendar_provider: Callable[[], Any],
+                 batch_size: int = 50, concurrency: int = 8, max_attempts: int = 8,
+                 retry_base: float = 2.0, retry_max: float = 300.0,
+                 poll_interval: float = 5.0, lease: float = 120.0):
+        self.outbox = outbox
+        self.db = outbox.db
+        self._calendar_provider = calendar_provider
+        self._calendar = None
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._task: Optional[asyncio.Task] = None
+        self._applied_listeners: List[Callable[[str], Awaitable[None]]] = []
+
+    def add_applied_listener(self, listener: Callable[[str], Awaitable[None]]) -> None:
+        self._applied_listeners.append(listener)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                applied = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Calendar dispatch failed: {str(e)}")
+                applied = 0
+            # A full batch suggests a backlog, so go straight to the next one
+            if applied < self.batch_size:
+                await self.outbox.wait(self.poll_interval)
+
+    async def dispatch_once(self) -> int:
+        """Claim and apply one batch, returning how many entries were claimed"""
+        entries = await self._claim()
+        if not entries:
+            return 0
+
+        calendar = await self._get_calendar()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def apply(entry):
+            async with semaphore:
+                try:
+                    await self._apply(calendar, entry)
+                    OUTBOX_OPERATIONS.inc(operation=entry['operation'], outcome='applied')
+                    return None
+                except Exception as e:
+                    return e
+
+        outcomes = await asyncio.gather(*[apply(entry) for entry in entries])
+
+        now = datetime.utcnow()
+        done = [(now, entry['id']) for entry, error in zip(entries, outcomes) if error is None]
+        if done:
+            await self.db.execute_many(
+                "UPDATE calendar_outbox SET status = 'done', last_error = NULL, updated_at = %s WHERE id = %s",
+                done
+            )
+        for entry, error in zip(entries, outcomes):
+            if error is not None:
+                await self._record_failure(entry, error, now)
+
+        for doctor_id in sorted({entry['doctor_id'] for entry, error in zip(entries, outcomes)
+                                 if error is None}):
+            for listener in self._applied_listeners:
+                try:
+                    await listener(doctor_id)
+                except Exception as e:
+                    logger.error(f"Applied listener failed for doctor {doctor_id}: {str(e)}")
+        return len(entries)
+
+    async def _get_calendar(self):
+        if self._calendar is None:
+            # Building the Google client reads credentials and blocks
+            self._calendar = await asyncio.to_thread(self._calendar_provider)
+        return self._calendar
+
+    async def _claim(self) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=self.lease)
+        claimed = []
+        async with self.db.transaction() as tx:
+            for entry in await tx.fetch_all(DUE_ENTRIES, (now, self.batch_size)):
+                # Another worker may have claimed it since the select
+                count = await tx.execute(
+                    """
+                    UPDATE calendar_outbox
+                    SET attempts = attempts + 1, next_attempt_at = %s
+                    WHERE id = %s AND status = 'pending' AND next_attempt_at <= %s
+                    """,
+                    (lease_until, entry['id'], now)
+                )
+                if count:
+                    entry['attempts'] += 1
+                    claimed.append(entry)
+        return claimed
+
+    async def _apply(self, calendar, entry: Dict[str, Any]) -> None:
+        operation = entry['operation']
+        payload = entry['payload'] or {}
+        if operation == 'create':
+            await calendar.create_event(entry['doctor_id'], payload)
+        elif operation == 'move':
+            await calendar.update_event(
+                entry['doctor_id'],
+                entry['event_id'],
+                datetime.fromisoformat(payload['start']),
+                datetime.fromisoformat(payload['end'])
+            )
+        elif operation == 'delete':
+            await calendar.delete_event(entry['doctor_id'], entry['event_id'])
+        else:
+            raise ValueError(f"Unknown calendar operation: {operation}")
+
+    async def _record_failure(self, entry: Dict[str, Any], error: Exception, now: datetime) -> None:
+        if entry['attempts'] >= self.max_attempts:
+            OUTBOX_OPERATIONS.inc(operation=entry['operation'], outcome='failed')
+            logger.error(
+                f"Giving up on calendar {entry['operation']} for appointment "
+                f"{entry['appointment_id']} after {entry['attempts']} attempts: {str(error)}"
+            )
+            query = "UPDATE calendar_outbox SET status = 'failed', last_error = %s, updated_at = %s WHERE id = %s"
+            await self.db.execute(query, (str(error), now, entry['id']))
+            return
+
+        OUTBOX_OPERATIONS.inc(operation=entry['operation'], outcome='retried')
+        delay = min(self.retry_max, self.retry_base * 2 ** (entry['attempts'] - 1))
+        retry_at = now + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+        query = "UPDATE calendar_outbox SET next_attempt_at = %s, last_error = %s, updated_at = %s WHERE id = %s"
+        await self.db.execute(query, (retry_at, str(error), now, entry['id']))
@@ -0,0 +1,114 @@
+# client_connection.py
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+from fastapi import WebSocket
+from .turn_manager import TurnManager
+from .metrics import WS_MESSAGE_DURATION
+from .wire_format import DEFAULT_CODEC, WireFormatError, receive_frame, send_frame
+
+logger = logging.getLogger(__name__)
+
+# Handled by the reader as soon as they arrive, even while a turn is running
+CONTROL_MESSAGE_TYPES = {'ping', 'interrupt'}
+
+# Message types reported individually in metrics, anything else counts as 'other'
+METRIC_MESSAGE_TYPES = CONTROL_MESSAGE_TYPES | {'transcription'}
+
+
+class ClientConnection:
+    """
+    One client's WebSocket, split into a reader and an ordered worker.
+
+    The reader parses every frame exactly once, answers control messages
+    immediately and queues everything else. The worker processes queued
+    messages one at a time so replies keep their request order. When the
+    queue is full the reader stops reading, which pushes back on the client.
+    Frames are JSON text or, if negotiated, MessagePack binary (see wire_format).
+    """
+
+    def __init__(self, websocket: WebSocket, client_id: str,
+                 handle_message: Callable[['ClientConnection', Dict[str, Any]], Awaitable[None]],
+                 turn_manager: TurnManager, queue_size: int = 8, codec: Optional[Any] = None):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.turn_manager = turn_manager
+        self.codec = codec or DEFAULT_CODEC
+        self._handle_message = handle_message
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        """Send a message; the lock keeps frames from reader and worker whole"""
+        async with self._send_lock:
+            await send_frame(self.websocket, self.codec, payload)
+
+    async def run(self) -> None:
+        """Serve the connection until the client disconnects"""
+        worker = asyncio.create_task(self._process())
+        try:
+            await self._read()
+        finally:
+            worker.cancel()
+            self.turn_manager.cancel_turn(self.client_id)
+            await asyncio.gather(worker, return_exceptions=True)
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                data = await receive_frame(self.websocket, self.codec)
+            except WireFormatError as e:
+                await self.send({'type': 'error', 'message': str(e)})
+                continue
+
+            if not isinstance(data, dict) or not data.get('type'):
+                await self.send({'type': 'error', 'message': 'Message type is required'})
+                continue
+
+            message_type = data['type']
+            if message_type in CONTROL_MESSAGE_TYPES:
+                with WS_MESSAGE_DURATION.time(type=message_type):
+                    await self._handle_control(data)
+                continue
+
+            if message_type == 'transcription':
+                # A new utterance supersedes the running turn and any queued ones
+                self.turn_manager.cancel_turn(self.client_id)
+                self._drop_queued('transcription')
+
+            await self._queue.put(data)
+
+    async def _handle_control(self, data: Dict[str, Any]) -> None:
+        if data['type'] == 'ping':
+            await self.send({'type': 'pong', 'timestamp': data.get('timestamp')})
+        elif data['type'] == 'interrupt':
+            self._drop_queued('transcription')
+            turn = self.turn_manager.cancel_turn(self.client_id)
+            await self.send({
+                'type': 'interrupted',
+                'turn_id': turn.metadata.get('client_turn_id') if turn else None
+            })
+
+    @staticmethod
+    def _metric_type(message_type: str) -> str:
+        return message_type if message_type in METRIC_MESSAGE_TYPES else 'other'
+
+    def _drop_queued(self, message_type: str) -> None:
+        """Remove queued messages of a type without disturbing the order of the rest"""
+        kept = []
+        while not self._queue.empty():
+            data = self._queue.get_nowait()
+            if data['type'] != message_type:
+                kept.append(data)
+        for data in kept:
+            self._queue.put_nowait(data)
+
+    async def _process(self) -> None:
+        while True:
+            data = await self._queue.get()
+            try:
+                with WS_MESSAGE_DURATION.time(type=self._metric_type(data['type'])):
+                    await self._handle_message(self, data)
+            except Exception as e:
+                logger.error(f"Error processing message: {str(e)}")
+                await self.send({'type': 'error', 'message': 'Error processing request'})
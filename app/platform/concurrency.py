@@ -0,0 +1,34 @@
+# concurrency.py
+from typing import Any, Awaitable, List
+import asyncio
+
+
+async def gather_or_cancel(*aws: Awaitable) -> List[Any]:
+    """
+    Run awaitables concurrently and return their results in order.
+
+    Unlike asyncio.gather, the first failure cancels the siblings that are
+    still running and waits for them to unwind before it is re-raised, and
+    cancelling the caller cancels every child.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except asyncio.CancelledError:
+        await _cancel(tasks)
+        raise
+
+    await _cancel(tasks)
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
+
+
+async def _cancel(tasks: List[asyncio.Future]) -> None:
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
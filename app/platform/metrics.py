@@ -0,0 +1,257 @@
+# metrics.py
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from contextlib import contextmanager
+from bisect import bisect_left
+import math
+import threading
+import time
+
+# Latency buckets in seconds, from fast control messages up to slow LLM turns
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for metrics keyed by a fixed tuple of label names"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Updates come from the event loop and from worker threads
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"Missing label {e} for metric {self.name}")
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. A gauge can also be given a callback,
+    which is read at scrape time instead of being updated on every change.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        if self.callback is not None:
+            return [f'{self.name} {_format_value(self.callback())}']
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram. Observing costs a binary search and a few
+    additions; cumulative bucket counts are only computed at scrape time.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2])
+                     for key, series in self._series.items()]
+
+        lines = []
+        bucket_labels = self.labelnames + ('le',)
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_labels, key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format"""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry and the application's metrics
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ('method', 'route', 'status')
+)
+WS_MESSAGE_DURATION = registry.histogram(
+    'ws_message_duration_seconds',
+    'Time to handle a WebSocket message by message type',
+    ('type',)
+)
+UPSTREAM_REQUESTS = registry.counter(
+    'upstream_requests_total',
+    'Calls to external services by outcome',
+    ('service', 'operation', 'outcome')
+)
+UPSTREAM_DURATION = registry.histogram(
+    'upstream_request_duration_seconds',
+    'Latency of calls to external services',
+    ('service', 'operation')
+)
+ACTIVE_CONNECTIONS = registry.gauge(
+    'websocket_active_connections',
+    'WebSocket connections held by this worker'
+)
+ACTIVE_SESSIONS = registry.gauge(
+    'conversation_sessions',
+    'Unexpired conversation sessions in the state backend'
+)
+
+ADMISSION_REJECTIONS = registry.counter(
+    'admission_rejections_total',
+    'Requests and turns refused before any work was done',
+    ('priority', 'reason')
+)
+EVENT_LOOP_LAG = registry.gauge(
+    'event_loop_lag_seconds',
+    'Smoothed delay of event loop wake-ups'
+)
+
+
+@contextmanager
+def track_upstream(service: str, operation: str):
+    """
+    Record latency and outcome of a call to Groq, Deepgram or Google
+
+    Usage:
+        with track_upstream('google', 'events.list'):
+            request.execute()
+    """
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        UPSTREAM_DURATION.observe(time.perf_counter() - started,
+                                  service=service, operation=operation)
+        UPSTREAM_REQUESTS.inc(service=service, operation=operation, outcome=outcome)
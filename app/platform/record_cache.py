@@ -0,0 +1,157 @@
+# record_cache.py
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+
+from app.db.records import DOCTOR_COLUMNS, PATIENT_COLUMNS, Doctor, Patient
+from app.platform import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+PROFILE_CHANNEL = 'profile_changes'
+
+RECORD_CACHE_LOOKUPS = metrics.registry.counter(
+    'record_cache_lookups_total',
+    'Record cache lookups by outcome',
+    ('cache', 'outcome')
+)
+
+
+class RecordCache(Generic[T]):
+    """
+    Read-through cache of records loaded by key.
+
+    Entries live for `ttl` seconds and the least recently used are evicted
+    beyond `max_entries`. Concurrent misses for one key share a single load,
+    so an expired hot record costs one query however many requests want it.
+    Missing records (a loader returning None) and failed loads are not
+    cached. `invalidate` also discards a load that is in flight, so a read
+    racing a write cannot put the old value back.
+    """
+
+    def __init__(self, loader: Callable[[Hashable], Awaitable[Optional[T]]],
+                 ttl: float = 300.0, max_entries: int = 10000, name: str = 'records'):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: 'OrderedDict[Hashable, Tuple[float, T]]' = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                RECORD_CACHE_LOOKUPS.inc(cache=self.name, outcome='hit')
+                return entry[1]
+            del self._entries[key]
+
+        task = self._loading.get(key)
+        if task is None:
+            RECORD_CACHE_LOOKUPS.inc(cache=self.name, outcome='miss')
+            task = asyncio.ensure_future(self._load(key))
+            self._loading[key] = task
+        else:
+            RECORD_CACHE_LOOKUPS.inc(cache=self.name, outcome='coalesced')
+        # A caller giving up must not cancel the load the others are waiting on
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._loading.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _load(self, key: Hashable) -> Optional[T]:
+        task = asyncio.current_task()
+        try:
+            value = await self._loader(key)
+            # Invalidated while loading: hand the value to the waiters but do not keep it
+            if value is not None and self._loading.get(key) is task:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            if self._loading.get(key) is task:
+                del self._loading[key]
+
+
+class ProfileCache:
+    """
+    Doctor and patient records, read through RecordCaches.
+
+    Writers call `doctor_changed` or `patient_changed` after changing a
+    row. The record is dropped on this worker at once and on the others
+    when the change reaches them through the state backend; without a
+    backend, or if the broadcast fails, other workers catch up within the
+    TTL. Appointment changes do not touch these rows and do not evict them.
+    """
+
+    def __init__(self, db_connection, ttl: float = 300.0, max_entries: int = 10000,
+                 state_backend=None):
+        self.db = db_connection
+        self.state_backend = state_backend
+        self.doctors: RecordCache[Doctor] = RecordCache(self._load_doctor, ttl, max_entries, 'doctor')
+        self.patients: RecordCache[Patient] = RecordCache(self._load_patient, ttl, max_entries, 'patient')
+
+    async def start(self) -> None:
+        """Listen for record changes made by any worker"""
+        if self.state_backend:
+            await self.state_backend.subscribe(PROFILE_CHANNEL, self._on_change)
+
+    async def get_doctor(self, doctor_id: str) -> Optional[Doctor]:
+        return await self.doctors.get(doctor_id)
+
+    async def get_patient(self, patient_id: str) -> Optional[Patient]:
+        return await self.patients.get(patient_id)
+
+    def invalidate_doctor(self, doctor_id: str) -> None:
+        self.doctors.invalidate(doctor_id)
+
+    def invalidate_patient(self, patient_id: str) -> None:
+        self.patients.invalidate(patient_id)
+
+    async def doctor_changed(self, doctor_id: str) -> None:
+        self.invalidate_doctor(doctor_id)
+        await self._broadcast('doctor', doctor_id)
+
+    async def patient_changed(self, patient_id: str) -> None:
+        self.invalidate_patient(patient_id)
+        await self._broadcast('patient', patient_id)
+
+    async def _broadcast(self, kind: str, record_id: str) -> None:
+        """Best-effort, like schedule pushes; the row is already written"""
+        if not self.state_backend:
+            return
+        try:
+            await self.state_backend.publish(PROFILE_CHANNEL, {'kind': kind, 'id': record_id})
+        except Exception as e:
+            logger.error(f"Failed to broadcast {kind} {record_id} change: {str(e)}")
+
+    async def _on_change(self, message: Dict[str, str]) -> None:
+        if message['kind'] == 'doctor':
+            self.invalidate_doctor(message['id'])
+        elif message['kind'] == 'patient':
+            self.invalidate_patient(message['id'])
+
+    async def _load_doctor(self, doctor_id: str) -> Optional[Doctor]:
+        query = f"SELECT {DOCTOR_COLUMNS} FROM doctors WHERE id = %s"
+        row = await self.db.fetch_one(query, (doctor_id,))
+        return Doctor.from_row(row) if row else None
+
+    async def _load_patient(self, patient_id: str) -> Optional[Patient]:
+        query = f"SELECT {PATIENT_COLUMNS} FROM patients WHERE id = %s"
+        row = await self.db.fetch_one(query, (patient_id,))
+        return Patient.from_row(row) if row else None
@@ -0,0 +1,87 @@
+# response_cache.py
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    version: int
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    Short-lived cache of serialized read responses, keyed by doctor.
+
+    Entries are tagged with an ETag derived from the doctor's calendar
+    version. A write anywhere bumps the version, which changes the ETag and
+    makes older entries unusable on every worker; `invalidate` additionally
+    frees them on this one. Because the ETag needs only the version, a
+    matching If-None-Match is answered without recomputing or reading the
+    cache. ETags also roll over every
+    `etag_max_age` seconds so edits made directly in Google Calendar, which
+    do not bump the version, still reach clients eventually.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 1024, etag_max_age: float = 300.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.etag_max_age = etag_max_age
+        self._entries: 'OrderedDict[Tuple[str, str, Tuple], CachedResponse]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def etag(self, doctor_id: str, version: int, route: str, params: Dict[str, Any]) -> str:
+        epoch = int(time.time() // self.etag_max_age) if self.etag_max_age else 0
+        key = json.dumps([doctor_id, route, sorted(params.items()), version, epoch], default=str)
+        return '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
+
+    def get(self, doctor_id: str, route: str, params: Dict[str, Any],
+            etag: str) -> Optional[CachedResponse]:
+        """Cached body for the representation identified by `etag`, if still fresh"""
+        key = self._key(doctor_id, route, params)
+        entry = self._entries.get(key)
+        if entry is None or entry.etag != etag or entry.expires_at <= time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, doctor_id: str, route: str, params: Dict[str, Any], version: int,
+            payload: Any, etag: str) -> CachedResponse:
+        """Serialize a payload once and keep it for `ttl` seconds"""
+        body = json.dumps(jsonable_encoder(payload), separators=(',', ':')).encode()
+        entry = CachedResponse(body, etag, version, time.monotonic() + self.ttl)
+        key = self._key(doctor_id, route, params)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, doctor_id: str) -> None:
+        for key in [key for key in self._entries if key[0] == doctor_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @staticmethod
+    def _key(doctor_id: str, route: str, params: Dict[str, Any]) -> Tuple[str, str, Tuple]:
+        return (doctor_id, route, tuple(sorted(params.items())))
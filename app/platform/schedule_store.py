@@ -0,0 +1,174 @@
+# schedule_store.py
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+STATUSES = ('confirmed', 'tentative', 'cancelled')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+CANCELLED = STATUS_CODES['cancelled']
+TRANSPARENT = 1  # flag: a free-time block that does not take the slot
+
+PATIENT_PREFIX = 'Appointment with '
+
+Moment = Union[datetime, int, float]
+
+
+class Interner:
+    """Each distinct string kept once and referred to by its index"""
+
+    def __init__(self):
+        self._indexes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        index = self._indexes.get(value)
+        if index is None:
+            index = self._indexes[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def lookup(self, index: int) -> Optional[str]:
+        return self.values[index] if index >= 0 else None
+
+
+class DoctorSchedule:
+    """
+    One doctor's calendar events as parallel arrays, sorted by start.
+
+    Each event is a row across the columns: start and end as UTC epoch
+    seconds, a status code, flags, and indexes into interned patient ids
+    and names. Times are parsed from Google's ISO strings once, on the way
+    in, and range queries are binary searches over the starts. Dicts are
+    built only by `to_dicts`, for the API response, with times as UTC ISO
+    strings carrying an explicit +00:00 offset.
+
+    A schedule is built from one calendar read and lives for one request;
+    it is not kept or updated between requests. Repeated reads are served
+    by the response cache, keyed on the doctor's calendar version.
+
+    Patient ids come from the event's private extended properties, which
+    the booking code sets; events made elsewhere have none.
+    """
+
+    def __init__(self, doctor_id: str, patient_ids: Optional[Interner] = None,
+                 names: Optional[Interner] = None):
+        self.doctor_id = doctor_id
+        self.starts = array('q')
+        self.ends = array('q')
+        self.statuses = array('b')
+        self.flags = array('B')
+        self.patients = array('l')
+        self.names = array('l')
+        self.event_ids: List[str] = []
+        self.patient_ids = patient_ids or Interner()
+        self.patient_names = names or Interner()
+        # Longest event seen; bounds how far before a range an overlapping event can start
+        self._longest = 0
+
+    @classmethod
+    def from_events(cls, doctor_id: str, events: Iterable[Dict[str, Any]], **interners) -> 'DoctorSchedule':
+        """Build from Google event resources, sorting once rather than inserting one by one"""
+        schedule = cls(doctor_id, **interners)
+        for row in sorted((schedule._parse(event) for event in events), key=lambda row: row[0]):
+            schedule._append(row)
+        return schedule
+
+    def add(self, event: Dict[str, Any]) -> None:
+        row = self._parse(event)
+        index = bisect_right(self.starts, row[0])
+        for column, value in zip(self._columns(), row):
+            column.insert(index, value)
+        self._longest = max(self._longest, row[1] - row[0])
+
+    def remove(self, event_id: str) -> bool:
+        try:
+            index = self.event_ids.index(event_id)
+        except ValueError:
+            return False
+        for column in self._columns():
+            del column[index]
+        return True
+
+    def between(self, start: Moment, end: Moment) -> List[int]:
+        """Indexes of the events overlapping [start, end), in start order"""
+        start, end = to_epoch(start), to_epoch(end)
+        low = bisect_right(self.starts, start - self._longest)
+        high = bisect_left(self.starts, end)
+        ends = self.ends
+        return [index for index in range(low, high) if ends[index] > start]
+
+    def is_busy(self, start: Moment, end: Moment) -> bool:
+        """Whether an event that takes time overlaps [start, end)"""
+        return any(
+            self.statuses[index] != CANCELLED and not self.flags[index] & TRANSPARENT
+            for index in self.between(start, end)
+        )
+
+    def to_dicts(self, indexes: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """Events as API dicts, all of them or those at the given indexes"""
+        if indexes is None:
+            indexes = range(len(self.event_ids))
+        return [self._to_dict(index) for index in indexes]
+
+    def __len__(self) -> int:
+        return len(self.event_ids)
+
+    def _to_dict(self, index: int) -> Dict[str, Any]:
+        event = {
+            'id': self.event_ids[index],
+            'patient_name': self.patient_names.lookup(self.names[index]),
+            'start_time': from_epoch(self.starts[index]).isoformat(),
+            'end_time': from_epoch(self.ends[index]).isoformat(),
+            'status': STATUSES[self.statuses[index]]
+        }
+        patient_id = self.patient_ids.lookup(self.patients[index])
+        if patient_id is not None:
+            event['patient_id'] = patient_id
+        return event
+
+    def _columns(self) -> Tuple:
+        return (self.starts, self.ends, self.statuses, self.flags,
+                self.patients, self.names, self.event_ids)
+
+    def _append(self, row: Tuple) -> None:
+        for column, value in zip(self._columns(), row):
+            column.append(value)
+        self._longest = max(self._longest, row[1] - row[0])
+
+    def _parse(self, event: Dict[str, Any]) -> Tuple:
+        summary = event.get('summary') or ''
+        name = summary[len(PATIENT_PREFIX):] if summary.startswith(PATIENT_PREFIX) else summary
+        private = (event.get('extendedProperties') or {}).get('private') or {}
+        return (
+            event_epoch(event['start']),
+            event_epoch(event['end']),
+            STATUS_CODES.get(event.get('status'), 0),
+            TRANSPARENT if event.get('transparency') == 'transparent' else 0,
+            self.patient_ids.intern(private.get('patient_id')),
+            self.patient_names.intern(name),
+            event['id']
+        )
+
+
+def to_epoch(moment: Moment) -> int:
+    """UTC epoch seconds; naive datetimes are taken as UTC, as stored"""
+    if isinstance(moment, datetime):
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp())
+    return int(moment)
+
+
+def from_epoch(seconds: int) -> datetime:
+    """Aware UTC, so isoformat() states the offset rather than leaving it implied"""
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def event_epoch(value: Dict[str, str]) -> int:
+    if 'dateTime' in value:
+        return to_epoch(datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00')))
+    # All-day events carry a date only
+    return to_epoch(datetime.fromisoformat(value['date']))
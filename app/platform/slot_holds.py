@@ -0,0 +1,73 @@
+# slot_holds.py
+from typing import Optional
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import time
+import uuid
+
+from app.platform import metrics
+from app.platform.state_backend import InMemoryStateBackend, StateBackend
+
+SLOT_HOLDS = metrics.registry.counter(
+    'slot_holds_total',
+    'Slot hold attempts by outcome',
+    ('outcome',)
+)
+
+
+@dataclass(frozen=True)
+class SlotHold:
+    """A short-lived claim on one doctor's slot, proven by its token"""
+    __slots__ = ('doctor_id', 'slot_time', 'token', 'expires_at')
+    doctor_id: str
+    slot_time: datetime
+    token: str
+    expires_at: float
+
+    @property
+    def key(self) -> str:
+        return slot_key(self.doctor_id, self.slot_time)
+
+
+def slot_key(doctor_id: str, slot_time: datetime) -> str:
+    if slot_time.tzinfo is not None:
+        slot_time = slot_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return f'{doctor_id}:{slot_time.isoformat()}'
+
+
+class SlotHolds:
+    """
+    Holds on appointment slots, shared by every worker through the state backend.
+
+    A booking first takes the hold on its slot; only one token can hold a
+    slot at a time, so concurrent bookers of a popular slot are turned away
+    at once instead of each reading the calendar and racing to the
+    database. Holds expire after `ttl` seconds, so a client that holds a
+    slot and walks away does not keep it. The database overlap check when
+    the appointment is written stays the final word, since slots that
+    overlap without starting at the same time have different holds.
+    """
+
+    def __init__(self, state_backend: Optional[StateBackend] = None, ttl: float = 120.0):
+        self.state_backend = state_backend or InMemoryStateBackend()
+        self.ttl = ttl
+
+    async def hold(self, doctor_id: str, slot_time: datetime) -> Optional[SlotHold]:
+        """A new hold on the slot, or None while someone else holds it"""
+        hold = SlotHold(doctor_id, slot_time, uuid.uuid4().hex, time.time() + self.ttl)
+        if not await self.state_backend.acquire_hold(hold.key, hold.token, self.ttl):
+            SLOT_HOLDS.inc(outcome='contended')
+            return None
+        SLOT_HOLDS.inc(outcome='acquired')
+        return hold
+
+    async def confirm(self, doctor_id: str, slot_time: datetime, token: str) -> Optional[SlotHold]:
+        """The live hold for token, extended by another ttl, or None when it has expired"""
+        hold = SlotHold(doctor_id, slot_time, token, time.time() + self.ttl)
+        if not await self.state_backend.extend_hold(hold.key, token, self.ttl):
+            SLOT_HOLDS.inc(outcome='lost')
+            return None
+        return hold
+
+    async def release(self, hold: SlotHold) -> bool:
+        return await self.state_backend.release_hold(hold.key, hold.token)
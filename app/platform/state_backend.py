@@ -0,0 +1,553 @@
+# state_backend.py
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+import json
+import logging
+import time
+
+from .timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class StateBackend:
+    """
+    Shared state for sessions, connection presence, slot holds and
+    cross-worker messaging.
+
+    Every uvicorn worker talks to the same backend so a session written on
+    one worker can be read on another, and a message for a client can be
+    routed to the worker that holds its WebSocket.
+    """
+
+    async def get_session(self, user_id: str) -> Optional[Dict[str, Any]]:
+        sessions = await self.get_sessions([user_id])
+        return sessions.get(user_id)
+
+    async def set_session(self, user_id: str, data: Dict[str, Any], ttl: int) -> None:
+        await self.set_sessions({user_id: data}, ttl)
+
+    async def get_sessions(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several sessions in one round trip"""
+        raise NotImplementedError
+
+    async def set_sessions(self, sessions: Dict[str, Dict[str, Any]], ttl: int) -> None:
+        """Write several sessions in one round trip"""
+        raise NotImplementedError
+
+    async def delete_session(self, user_id: str) -> None:
+        raise NotImplementedError
+
+    async def session_count(self) -> int:
+        raise NotImplementedError
+
+    async def register_connection(self, client_id: str, worker_id: str, ttl: int) -> None:
+        """Record which worker holds a client's WebSocket"""
+        await self.register_connections([client_id], worker_id, ttl)
+
+    async def register_connections(self, client_ids: Iterable[str], worker_id: str, ttl: int) -> None:
+        """Record or refresh presence for all of a worker's clients in one round trip"""
+        raise NotImplementedError
+
+    async def unregister_connection(self, client_id: str, worker_id: str) -> None:
+        raise NotImplementedError
+
+    async def connection_owner(self, client_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def next_sequence(self, key: str) -> int:
+        """Atomically increment and return a counter shared by all workers"""
+        raise NotImplementedError
+
+    async def get_sequence(self, key: str) -> int:
+        """Current value of a shared counter, 0 if it was never incremented"""
+        raise NotImplementedError
+
+    async def acquire_hold(self, key: str, token: str, ttl: float) -> bool:
+        """Hold key under token for ttl seconds, unless someone already holds it"""
+        raise NotImplementedError
+
+    async def extend_hold(self, key: str, token: str, ttl: float) -> bool:
+        """Push back the expiry of a hold, only if it is still held under token"""
+        raise NotImplementedError
+
+    async def release_hold(self, key: str, token: str) -> bool:
+        """Drop a hold, only if it is still held under token"""
+        raise NotImplementedError
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    async def _dispatch(self, channel: str, message: Dict[str, Any]) -> None:
+        """
+        Run a channel's handlers on a received message. A failing handler is
+        logged and never reaches the publisher or the other handlers.
+        """
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error(f"Error handling message on {channel}: {str(e)}")
+
+
+class InMemoryStateBackend(StateBackend):
+    """
+    Single-process backend, suitable for development and a single worker.
+
+    Messages are delivered the way the Redis backend delivers them: as a
+    JSON copy, in publish order, from a background task rather than inside
+    `publish`, with handler errors logged.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._connections: Dict[str, Tuple[float, str]] = {}
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._counters: Dict[str, int] = {}
+        self._holds: Dict[str, Tuple[float, str]] = {}
+        self._hold_expiry = TimingWheel(tick=0.5, now=time.time())
+        self._deliveries: Optional[asyncio.Queue] = None
+        self._delivery_task: Optional[asyncio.Task] = None
+
+    async def get_sessions(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        sessions = {}
+        for user_id in user_ids:
+            entry = self._sessions.get(user_id)
+            if entry and entry[0] > now:
+                sessions[user_id] = entry[1]
+        return sessions
+
+    async def set_sessions(self, sessions: Dict[str, Dict[str, Any]], ttl: int) -> None:
+        expires_at = time.time() + ttl
+        for user_id, data in sessions.items():
+            self._sessions[user_id] = (expires_at, data)
+
+    async def delete_session(self, user_id: str) -> None:
+        self._sessions.pop(user_id, None)
+
+    async def session_count(self) -> int:
+        now = time.time()
+        expired = [user_id for user_id, (expires_at, _) in self._sessions.items()
+                   if expires_at <= now]
+        for user_id in expired:
+            del self._sessions[user_id]
+        return len(self._sessions)
+
+    async def register_connections(self, client_ids: Iterable[str], worker_id: str, ttl: int) -> None:
+        expires_at = time.time() + ttl
+        for client_id in client_ids:
+            self._connections[client_id] = (expires_at, worker_id)
+
+    async def unregister_connection(self, client_id: str, worker_id: str) -> None:
+        entry = self._connections.get(client_id)
+        if entry and entry[1] == worker_id:
+            del self._connections[client_id]
+
+    async def connection_owner(self, client_id: str) -> Optional[str]:
+        entry = self._connections.get(client_id)
+        if entry and entry[0] > time.time():
+            return entry[1]
+        return None
+
+    async def next_sequence(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get_sequence(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def acquire_hold(self, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        self._expire_holds(now)
+        entry = self._holds.get(key)
+        if entry and entry[0] > now:
+            return False
+        self._holds[key] = (now + ttl, token)
+        self._hold_expiry.schedule(key, now + ttl)
+        return True
+
+    async def extend_hold(self, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        entry = self._holds.get(key)
+        if not entry or entry[0] <= now or entry[1] != token:
+            return False
+        self._holds[key] = (now + ttl, token)
+        self._hold_expiry.schedule(key, now + ttl)
+        return True
+
+    async def release_hold(self, key: str, token: str) -> bool:
+        entry = self._holds.get(key)
+        if entry and entry[1] == token:
+            del self._holds[key]
+            return entry[0] > time.time()
+        return False
+
+    def _expire_holds(self, now: float) -> None:
+        for key in self._hold_expiry.advance(now):
+            # An extended hold is still in the wheel under its old deadline
+            entry = self._holds.get(key)
+            if entry and entry[0] <= now:
+                del self._holds[key]
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        if self._delivery_task is None:
+            self._deliveries = asyncio.Queue()
+            self._delivery_task = asyncio.create_task(self._deliver())
+        self._deliveries.put_nowait((channel, json.dumps(message, default=str)))
+
+    async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def _deliver(self) -> None:
+        while True:
+            channel, payload = await self._deliveries.get()
+            await self._dispatch(channel, json.loads(payload))
+
+    async def close(self) -> None:
+        if self._delivery_task is not None:
+            self._delivery_task.cancel()
+            self._delivery_task = None
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RedisConnection:
+    """
+    Minimal RESP2 client.
+
+    Commands are written in batches and their replies read back in order,
+    so a pipeline costs a single round trip.
+    """
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            await self._roundtrip(setup)
+
+    async def execute(self, *args) -> Any:
+        return (await self.pipeline([args]))[0]
+
+    async def pipeline(self, commands: List[Tuple]) -> List[Any]:
+        """Send all commands at once and return their replies in order"""
+        async with self._lock:
+            if self._writer is None:
+                await self.connect()
+            try:
+                return await self._roundtrip(commands)
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+                # Replies may be left unread, drop the socket and reconnect next call
+                await self.close()
+                raise
+
+    async def _roundtrip(self, commands: List[Tuple]) -> List[Any]:
+        self._writer.write(b''.join(self._encode(command) for command in commands))
+        await self._writer.drain()
+
+        replies = [await self.read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def send(self, *args) -> None:
+        """Write a command without waiting for its reply (used by subscribers)"""
+        if self._writer is None:
+            await self.connect()
+        self._writer.write(self._encode(args))
+        await self._writer.drain()
+
+    async def read_reply(self) -> Any:
+        line = await self._reader.readuntil(b'\r\n')
+        prefix, body = line[:1], line[1:-2]
+
+        if prefix == b'+':
+            return body.decode()
+        if prefix == b'-':
+            return RedisError(body.decode())
+        if prefix == b':':
+            return int(body)
+        if prefix == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            length = int(body)
+            if length < 0:
+                return None
+            return [await self.read_reply() for _ in range(length)]
+        raise RedisError(f'Unexpected reply prefix: {prefix!r}')
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._reader = self._writer = None
+
+    @staticmethod
+    def _encode(args: Tuple) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+
+class RedisPool:
+    """
+    A few RedisConnections shared by a worker's commands.
+
+    Each command or pipeline borrows an idle connection for its round
+    trip, so concurrent requests do not queue behind one socket.
+    Connections open lazily and reconnect on the next use after an error.
+    """
+
+    def __init__(self, size: int = 4, **params):
+        self._connections = [RedisConnection(**params) for _ in range(max(1, size))]
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for connection in self._connections:
+            self._idle.put_nowait(connection)
+
+    async def execute(self, *args) -> Any:
+        return (await self.pipeline([args]))[0]
+
+    async def pipeline(self, commands: List[Tuple]) -> List[Any]:
+        connection = await self._idle.get()
+        try:
+            return await connection.pipeline(commands)
+        finally:
+            self._idle.put_nowait(connection)
+
+    async def close(self) -> None:
+        for connection in self._connections:
+            await connection.close()
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Backend for any server speaking the Redis protocol.
+
+    Sessions are JSON strings under `session:<user_id>` with a TTL, indexed
+    by expiry in the `sessions` sorted set so they can be counted cheaply.
+    Presence lives under `conn:<client_id>`, holds under `hold:<key>` and
+    messaging uses PUBLISH.
+
+    Commands share a small connection pool; subscriptions have a connection
+    of their own. When that one drops, it is reopened with backoff and every
+    channel is subscribed again. Messages published while it was down are
+    lost, as with any Redis pub/sub.
+    """
+
+    SESSION_INDEX = 'sessions'
+    # Compare the holder and act in one step, so a hold that just expired
+    # and was taken by another worker is never extended or deleted
+    EXTEND_HOLD = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('PEXPIRE', KEYS[1], ARGV[2]) end
+        return 0
+    """
+    RELEASE_HOLD = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+        return 0
+    """
+
+    RECONNECT_DELAY = 0.1
+    MAX_RECONNECT_DELAY = 5.0
+
+    def __init__(self, url: str, pool_size: int = 4):
+        parsed = urlparse(url)
+        self._params = {
+            'host': parsed.hostname or 'localhost',
+            'port': parsed.port or 6379,
+            'db': int(parsed.path.lstrip('/') or 0),
+            'password': parsed.password
+        }
+        self._connection = RedisPool(pool_size, **self._params)
+        self._subscriber: Optional[RedisConnection] = None
+        self._subscriber_task: Optional[asyncio.Task] = None
+        # Held while the subscriber connection is being written to or reopened
+        self._subscriber_lock = asyncio.Lock()
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+
+    async def get_sessions(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        values = await self._connection.execute('MGET', *[f'session:{u}' for u in user_ids])
+        return {
+            user_id: json.loads(value)
+            for user_id, value in zip(user_ids, values)
+            if value is not None
+        }
+
+    async def set_sessions(self, sessions: Dict[str, Dict[str, Any]], ttl: int) -> None:
+        if not sessions:
+            return
+        expires_at = time.time() + ttl
+        commands = []
+        for user_id, data in sessions.items():
+            commands.append(('SET', f'session:{user_id}', json.dumps(data, default=str), 'EX', ttl))
+            commands.append(('ZADD', self.SESSION_INDEX, expires_at, user_id))
+        await self._connection.pipeline(commands)
+
+    async def delete_session(self, user_id: str) -> None:
+        await self._connection.pipeline([
+            ('DEL', f'session:{user_id}'),
+            ('ZREM', self.SESSION_INDEX, user_id)
+        ])
+
+    async def session_count(self) -> int:
+        _, count = await self._connection.pipeline([
+            ('ZREMRANGEBYSCORE', self.SESSION_INDEX, '-inf', time.time()),
+            ('ZCARD', self.SESSION_INDEX)
+        ])
+        return count
+
+    async def register_connections(self, client_ids: Iterable[str], worker_id: str, ttl: int) -> None:
+        commands = [('SET', f'conn:{client_id}', worker_id, 'EX', ttl) for client_id in client_ids]
+        if commands:
+            await self._connection.pipeline(commands)
+
+    async def unregister_connection(self, client_id: str, worker_id: str) -> None:
+        # Only remove presence we own, the client may have reconnected elsewhere
+        key = f'conn:{client_id}'
+        owner = await self._connection.execute('GET', key)
+        if owner is not None and _text(owner) == worker_id:
+            await self._connection.execute('DEL', key)
+
+    async def connection_owner(self, client_id: str) -> Optional[str]:
+        owner = await self._connection.execute('GET', f'conn:{client_id}')
+        return _text(owner) if owner is not None else None
+
+    async def next_sequence(self, key: str) -> int:
+        return await self._connection.execute('INCR', key)
+
+    async def get_sequence(self, key: str) -> int:
+        value = await self._connection.execute('GET', key)
+        return int(value) if value is not None else 0
+
+    async def acquire_hold(self, key: str, token: str, ttl: float) -> bool:
+        # Expiry is left to the server's own key TTL
+        acquired = await self._connection.execute(
+            'SET', f'hold:{key}', token, 'NX', 'PX', max(1, int(ttl * 1000))
+        )
+        return acquired is not None
+
+    async def extend_hold(self, key: str, token: str, ttl: float) -> bool:
+        extended = await self._connection.execute(
+            'EVAL', self.EXTEND_HOLD, 1, f'hold:{key}', token, max(1, int(ttl * 1000))
+        )
+        return extended == 1
+
+    async def release_hold(self, key: str, token: str) -> bool:
+        released = await self._connection.execute('EVAL', self.RELEASE_HOLD, 1, f'hold:{key}', token)
+        return released == 1
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        await self._connection.execute('PUBLISH', channel, json.dumps(message, default=str))
+
+    async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        first = channel not in self._handlers
+        self._handlers.setdefault(channel, []).append(handler)
+        if self._subscriber is None:
+            self._subscriber = RedisConnection(**self._params)
+            async with self._subscriber_lock:
+                await self._subscriber.connect()
+            self._subscriber_task = asyncio.create_task(self._listen())
+        if first:
+            async with self._subscriber_lock:
+                try:
+                    await self._subscriber.send('SUBSCRIBE', channel)
+                except (ConnectionError, OSError) as e:
+                    # The listener subscribes every registered channel when it reconnects
+                    logger.warning(f"Subscribe to {channel} deferred until reconnect: {str(e)}")
+
+    async def _listen(self) -> None:
+        """Dispatch pushed messages from the subscriber connection"""
+        while True:
+            try:
+                reply = await self._subscriber.read_reply()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"State backend subscription lost: {str(e)}")
+                await self._resubscribe()
+                continue
+
+            if not isinstance(reply, list) or _text(reply[0]) != 'message':
+                continue
+
+            channel = _text(reply[1])
+            try:
+                message = json.loads(reply[2])
+            except ValueError:
+                logger.warning(f"Dropping malformed message on {channel}")
+                continue
+
+            await self._dispatch(channel, message)
+
+    async def _resubscribe(self) -> None:
+        """Reopen the subscriber connection with backoff and subscribe every channel again"""
+        delay = self.RECONNECT_DELAY
+        while True:
+            async with self._subscriber_lock:
+                await self._subscriber.close()
+                try:
+                    await self._subscriber.connect()
+                    channels = list(self._handlers)
+                    if channels:
+                        await self._subscriber.send('SUBSCRIBE', *channels)
+                    logger.info(f"State backend subscription restored ({len(channels)} channels)")
+                    return
+                except (ConnectionError, OSError, RedisError) as e:
+                    logger.warning(f"State backend reconnect failed ({str(e)}), retry in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+
+    async def close(self) -> None:
+        if self._subscriber_task is not None:
+            self._subscriber_task.cancel()
+        if self._subscriber is not None:
+            await self._subscriber.close()
+        await self._connection.close()
+
+
+def create_state_backend(url: Optional[str] = None, pool_size: int = 4) -> StateBackend:
+    """Build the backend for a URL, falling back to in-process memory"""
+    if url and url.startswith('redis://'):
+        return RedisStateBackend(url, pool_size)
+    return InMemoryStateBackend()
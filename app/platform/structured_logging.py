@@ -0,0 +1,190 @@
+# structured_logging.py
+from typing import Any, Dict, Optional, Tuple
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in _RECORD_FIELDS and not key.startswith('_')
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """`log_format` followed by the `extra` fields as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = _extra_fields(record)
+        if not fields:
+            return text
+        line, newline, rest = text.partition('\n')
+        pairs = ' '.join(f'{key}={value}' for key, value in fields.items())
+        return f'{line} {pairs}{newline}{rest}'
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` records per `interval` seconds from each
+    logging call site (logger, file and line); the rest are counted and
+    reported on the next record from that site that gets through.
+
+    Messages are not part of the key: they are rendered f-strings carrying
+    ids and exception text, so every one would be distinct. Windows that
+    ended without suppressing anything are dropped once per `interval`.
+    """
+
+    def __init__(self, burst: int = 5, interval: float = 60.0, level: int = logging.ERROR):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.level = level
+        self._windows: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune >= self.interval:
+                self._prune(now)
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            return True
+
+    def _prune(self, now: float) -> None:
+        # Windows with suppressed records are kept so the count is still reported
+        self._windows = {
+            key: window for key, window in self._windows.items()
+            if now - window[0] < self.interval or window[2]
+        }
+        self._last_prune = now
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking the event loop.
+
+    Only the message is rendered on the calling thread; JSON encoding and
+    I/O happen in the listener. When the queue is full the record is
+    dropped and counted rather than stalling the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # This is the root's only handler, so the record can be modified in place
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestLogSampler:
+    """
+    Decides which successful requests get an access log line.
+
+    Rates are per route template; errors and slow requests are always kept.
+    """
+
+    def __init__(self, default_rate: float = 1.0, route_rates: Optional[Dict[str, float]] = None,
+                 slow_threshold: float = 1.0):
+        self.default_rate = default_rate
+        self.route_rates = route_rates or {}
+        self.slow_threshold = slow_threshold
+
+    def should_log(self, route: str, status: int, duration: float) -> bool:
+        if status >= 400 or duration >= self.slow_threshold:
+            return True
+        rate = self.route_rates.get(route, self.default_rate)
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+    @staticmethod
+    def parse_rates(spec: Optional[str]) -> Dict[str, float]:
+        """Parse 'route=rate,route=rate', e.g. '/test=0,/patient/slots/{doctor_id}=0.05'"""
+        rates = {}
+        for item in (spec or '').split(','):
+            route, sep, rate = item.strip().rpartition('=')
+            if sep and route:
+                rates[route] = float(rate)
+        return rates
+
+
+def setup_logging(level: str = 'INFO', json_format: bool = True, queue_size: int = 10000,
+                  error_burst: int = 5, error_interval: float = 60.0,
+                  log_format: Optional[str] = None) -> QueueListener:
+    """
+    Route all logging through a bounded queue drained by a background thread.
+
+    Replaces any handlers on the root logger, so it is safe to call once at
+    startup instead of logging.basicConfig.
+    """
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if json_format else TextFormatter(log_format))
+
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(ErrorRateLimitFilter(error_burst, error_interval))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,65 @@
+# timing_wheel.py
+from typing import Hashable, List, Tuple
+import math
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel for expiring many short-lived keys.
+
+    Time is cut into ticks of `tick` seconds and each deadline goes into the
+    bucket of its tick, modulo `size`. Scheduling is O(1) and `advance` only
+    visits the buckets of the ticks that passed, so expiry costs nothing per
+    live key, unlike a periodic scan. Deadlines more than one turn away stay
+    in their bucket until their turn comes round.
+
+    The wheel only says which keys are due; the owner decides whether each
+    is still expired, so rescheduling a key never needs to remove the old
+    entry.
+    """
+
+    def __init__(self, tick: float = 1.0, size: int = 512, now: float = 0.0):
+        self.tick = tick
+        self.size = size
+        self._buckets: List[List[Tuple[int, Hashable]]] = [[] for _ in range(size)]
+        self._current = self._tick_of(now)
+        self._count = 0
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        # Due at the end of the tick holding the deadline, and never in a tick already passed
+        due = max(math.ceil(deadline / self.tick), self._current + 1)
+        self._buckets[due % self.size].append((due, key))
+        self._count += 1
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move the wheel to `now` and return the keys whose deadline has passed"""
+        target = self._tick_of(now)
+        if target <= self._current:
+            return []
+        if target - self._current >= self.size:
+            # A whole turn or more went by: every bucket is due once
+            ticks = range(self.size)
+        else:
+            ticks = range(self._current + 1, target + 1)
+        self._current = target
+
+        due_keys = []
+        for tick in ticks:
+            bucket = self._buckets[tick % self.size]
+            if not bucket:
+                continue
+            waiting = []
+            for due, key in bucket:
+                if due <= target:
+                    due_keys.append(key)
+                else:
+                    waiting.append((due, key))
+            self._buckets[tick % self.size] = waiting
+        self._count -= len(due_keys)
+        return due_keys
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tick_of(self, moment: float) -> int:
+        return math.floor(moment / self.tick)
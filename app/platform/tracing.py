@@ -0,0 +1,190 @@
+# tracing.py
+from typing import Any, Dict, List, Optional
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    duration: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+@dataclass
+class Trace:
+    """All spans recorded for one conversational turn"""
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+
+    @property
+    def root(self) -> Optional[Span]:
+        return self.spans[0] if self.spans else None
+
+    def timings(self) -> Dict[str, float]:
+        """Milliseconds spent per stage, summing spans that share a name"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            if span.duration is not None:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration * 1000
+        return {name: round(ms, 1) for name, ms in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'spans': [span.to_dict() for span in self.spans]
+        }
+
+
+class SpanExporter(ABC):
+    """
+    Receives every finished trace; called from a worker thread.
+
+    Subclasses must implement `export`; one that does not cannot be
+    constructed, rather than failing on the first exported trace.
+    """
+
+    @abstractmethod
+    def export(self, trace: Trace) -> None:
+        """Send or store one finished trace"""
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends one JSON object per trace to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+# Innermost open span of the running task; asyncio copies it into child tasks
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+
+class Tracer:
+    """
+    Turn-level tracer.
+
+    `start_trace` opens the root span of a turn. Any `span` opened while it
+    is active, in the same task or in tasks it spawns, is recorded under it.
+    Outside a trace `span` does nothing, so instrumented code pays almost
+    nothing when it is not part of a turn.
+    """
+
+    def __init__(self):
+        self.exporters: List[SpanExporter] = []
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        self.exporters.append(exporter)
+
+    @asynccontextmanager
+    async def start_trace(self, name: str, trace_id: Optional[str] = None, **attributes):
+        trace = Trace(trace_id=trace_id or uuid.uuid4().hex)
+        trace_token = _current_trace.set(trace)
+        try:
+            with self.span(name, **attributes):
+                yield trace
+        finally:
+            _current_trace.reset(trace_token)
+            if self.exporters:
+                await self._export(trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        trace = _current_trace.get()
+        if trace is None:
+            yield None
+            return
+
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=trace.trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start=time.time(),
+            attributes=attributes
+        )
+        trace.spans.append(span)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = 'cancelled' if isinstance(e, asyncio.CancelledError) else str(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+
+    def traced(self, name: str):
+        """Decorator wrapping an async function in a span"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current_trace_id(self) -> Optional[str]:
+        trace = _current_trace.get()
+        return trace.trace_id if trace else None
+
+    async def _export(self, trace: Trace) -> None:
+        for exporter in self.exporters:
+            try:
+                await asyncio.to_thread(exporter.export, trace)
+            except Exception as e:
+                logger.error(f"Error exporting trace {trace.trace_id}: {str(e)}")
+
+    def close(self) -> None:
+        for exporter in self.exporters:
+            exporter.close()
+
+
+# Process-wide tracer used by all instrumented components
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
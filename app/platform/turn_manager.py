@@ -0,0 +1,60 @@
+# turn_manager.py
+from typing import Dict, Any, Optional, Awaitable
+from dataclasses import dataclass, field
+import asyncio
+import itertools
+
+
+@dataclass
+class Turn:
+    id: int
+    client_id: str
+    task: Optional[asyncio.Task] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class TurnManager:
+    """
+    Tracks the in-flight conversational turn of every connected client.
+
+    Starting a new turn cancels the previous one, so a user who speaks
+    again (barge-in) does not wait for, or receive, a stale answer.
+    """
+
+    def __init__(self):
+        self._turns: Dict[str, Turn] = {}
+        self._ids = itertools.count(1)
+
+    def start_turn(self, client_id: str, work: Awaitable[Any],
+                   metadata: Optional[Dict[str, Any]] = None) -> Turn:
+        """Cancel the client's current turn and run `work` as the new one"""
+        self.cancel_turn(client_id)
+
+        turn = Turn(id=next(self._ids), client_id=client_id, metadata=metadata or {})
+        turn.task = asyncio.ensure_future(work)
+        turn.task.add_done_callback(lambda _: self._finish(turn))
+        self._turns[client_id] = turn
+        return turn
+
+    def cancel_turn(self, client_id: str) -> Optional[Turn]:
+        """Cancel the client's in-flight turn, returning it if there was one"""
+        turn = self._turns.pop(client_id, None)
+        if turn and turn.task and not turn.task.done():
+            turn.task.cancel()
+            return turn
+        return None
+
+    def current_turn(self, client_id: str) -> Optional[Turn]:
+        return self._turns.get(client_id)
+
+    def is_current(self, client_id: str, turn_id: int) -> bool:
+        """Whether `turn_id` is still the client's latest turn"""
+        turn = self._turns.get(client_id)
+        return turn is not None and turn.id == turn_id
+
+    def active_count(self) -> int:
+        return len(self._turns)
+
+    def _finish(self, turn: Turn) -> None:
+        if self._turns.get(turn.client_id) is turn:
+            del self._turns[turn.client_id]
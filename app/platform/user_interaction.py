@@ -1,18 +1,41 @@
 # user_interaction.py
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterable
 from datetime import datetime
 import asyncio
 import json
+from config.config import Config
+from .state_backend import StateBackend, InMemoryStateBackend
+from .tracing import tracer, span
 
 class UserInteraction:
-    def __init__(self, ai_engine, voice_handler, response_generator):
+    def __init__(self, ai_engine, voice_handler, response_generator,
+                 state_backend: Optional[StateBackend] = None):
         self.ai_engine = ai_engine
         self.voice_handler = voice_handler
         self.response_generator = response_generator
-        self.session_data = {}
+        # Sessions live in the shared backend so any worker can serve them
+        self.state_backend = state_backend or InMemoryStateBackend()
     
     async def process_user_input(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process user input and generate appropriate response"""
+        """
+        Process user input and generate appropriate response.
+        
+        Every call is traced as one turn. The reply carries the trace ID and,
+        when `include_timings` is set, the time spent in each stage.
+        """
+        async with tracer.start_trace(
+            'turn',
+            trace_id=input_data.get('trace_id'),
+            input_type=input_data.get('type')
+        ) as trace:
+            result = await self._process_user_input(input_data)
+        
+        result['trace_id'] = trace.trace_id
+        if input_data.get('include_timings'):
+            result['timings'] = trace.timings()
+        return result
+    
+    async def _process_user_input(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # If input is voice, convert to text
             if input_data.get('type') == 'voice':
@@ -32,7 +55,8 @@ class UserInteraction:
             ai_response = await self.ai_engine.process_query(text)
             
             # Generate response
-            response = self.response_generator.generate_response(ai_response)
+            with span('response'):
+                response = self.response_generator.generate_response(ai_response)
             
             # Convert response to speech if needed
             if input_data.get('type') == 'voice':
@@ -57,27 +81,27 @@ class UserInteraction:
     async def handle_conversation_context(self, user_id: str, 
                                         context_data: Dict[str, Any]) -> None:
         """Maintain conversation context for better responses"""
-        self.session_data[user_id] = {
-            'context': context_data,
-            'last_updated': datetime.utcnow()
-        }
+        await self.state_backend.set_session(
+            user_id,
+            {
+                'context': context_data,
+                'last_updated': datetime.utcnow().isoformat()
+            },
+            Config.SESSION_TIMEOUT
+        )
     
     async def get_conversation_context(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve conversation context for a user"""
-        session = self.session_data.get(user_id)
+        session = await self.state_backend.get_session(user_id)
         if session:
             return session['context']
         return None
     
-    def _clean_expired_sessions(self) -> None:
-        """Clean up expired session data"""
-        current_time = datetime.utcnow()
-        expired_users = []
-        
-        for user_id, session in self.session_data.items():
-            if (current_time - session['last_updated']).hours >= 1:
-                expired_users.append(user_id)
-        
-        for user_id in expired_users:
-            del self.session_data[user_id]
-
+    async def get_conversation_contexts(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Retrieve conversation context for several users in one backend round trip"""
+        sessions = await self.state_backend.get_sessions(user_ids)
+        return {user_id: session['context'] for user_id, session in sessions.items()}
+    
+    async def session_count(self) -> int:
+        """Number of live sessions across all workers (expired sessions are dropped by TTL)"""
+        return await self.state_backend.session_count()
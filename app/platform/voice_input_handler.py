@@ -1,36 +1,56 @@
 # voice_input_handler.py
-from deepgram import DeepgramClient, DeepgramClientOptions
 from typing import Dict, Any, Optional
 import base64
 import os
 import json
+import asyncio
+from config.deepgram_config import DeepgramConfig
+from app.voice.vad import VoiceActivityDetector
+from app.voice.wav_stream import validate_wav, WavFormatError
+from app.voice.deepgram_transport import DeepgramTransport
+from .tracing import span
 
 class VoiceInputHandler:
-    def __init__(self):
-        api_key = os.getenv('DEEPGRAM_API_KEY')
-        if not api_key:
-            raise ValueError("DEEPGRAM_API_KEY environment variable is not set")
-            
-        # Configure Deepgram client with options
-        config = DeepgramClientOptions(options={"keepalive": "true"})
-        self.deepgram_client = DeepgramClient(api_key, config)
+    def __init__(self, transport: Optional[DeepgramTransport] = None):
+        # Share the worker's pooled Deepgram client
+        self.transport = transport or DeepgramTransport()
+        self.deepgram_client = self.transport.client
+        self.voice_config = DeepgramConfig.get_stt_config()
+        self.vad = VoiceActivityDetector()
                                               
     async def convert_speech_to_text(self, audio_data: bytes) -> str:
         """Convert speech audio to text using Deepgram"""
         try:
-            response = await self.deepgram_client.transcription.prerecorded(
-                {'buffer': audio_data, 'mimetype': 'audio/wav'},
-                self.voice_config
-            )
-            
-            if response and response.get('results'):
-                return response['results']['channels'][0]['alternatives'][0]['transcript']
-            
-            return ''
+            # Trim silence and skip the upstream call when nobody spoke
+            try:
+                segments = self.vad.split_wav(audio_data)
+            except ValueError:
+                segments = [audio_data]
+            
+            if not segments:
+                return ''
+            
+            with span('stt', segments=len(segments), audio_bytes=len(audio_data)):
+                transcripts = await self.transport.map(self._transcribe_segment, segments)
+            return ' '.join(t for t in transcripts if t).strip()
         
         except Exception as e:
             raise Exception(f"Speech to text conversion failed: {str(e)}")
     
+    async def _transcribe_segment(self, audio_data: bytes) -> str:
+        """Transcribe a single speech segment"""
+        with span('stt.segment', audio_bytes=len(audio_data)):
+            response = await self.transport.call(
+                self.transport.transcribe_file,
+                audio_data,
+                self.voice_config
+            )
+        
+        if response and response.get('results'):
+            return response['results']['channels'][0]['alternatives'][0]['transcript']
+        
+        return ''
+    
     async def convert_text_to_speech(self, text: str) -> bytes:
         """Convert text to speech using Deepgram"""
         try:
@@ -43,7 +63,8 @@ class VoiceInputHandler:
             }
             
             # Call Deepgram TTS API
-            response = await self.deepgram_client.text_to_speech(tts_config)
+            with span('tts', characters=len(text)):
+                response = await self.transport.call(self.deepgram_client.text_to_speech, tts_config)
             
             return response['audio']
         
@@ -60,7 +81,10 @@ class VoiceInputHandler:
             }
             
             # Initialize streaming client
-            streaming = await self.deepgram_client.transcription.live(streaming_config)
+            streaming = await self.transport.call(
+                self.deepgram_client.transcription.live,
+                streaming_config
+            )
             
             # Set up event handlers
             async def handle_message(self, message):
@@ -93,18 +117,9 @@ class VoiceInputHandler:
     def _validate_audio_format(self, audio_data: bytes) -> bool:
         """Validate audio format and quality"""
         try:
-            # Check audio file header
-            if audio_data[:4] != b'RIFF':
-                return False
-            
-            # Check audio format (WAV)
-            if audio_data[8:12] != b'WAVE':
-                return False
-            
-            # Additional format checks can be added here
-            
+            validate_wav(audio_data, DeepgramConfig.AUDIO_CONFIG)
             return True
-        except:
+        except WavFormatError:
             return False
     
     async def detect_language(self, audio_data: bytes) -> str:
@@ -116,8 +131,9 @@ class VoiceInputHandler:
                 'model': 'general'
             }
             
-            response = await self.deepgram_client.transcription.prerecorded(
-                {'buffer': audio_data, 'mimetype': 'audio/wav'},
+            response = await self.transport.call(
+                self.transport.transcribe_file,
+                audio_data,
                 lang_config
             )
             
@@ -138,7 +154,8 @@ class VoiceInputHandler:
                 'remove_background': True
             }
             
-            response = await self.deepgram_client.audio.enhance(
+            response = await self.transport.call(
+                self.deepgram_client.audio.enhance,
                 {'buffer': audio_data, 'mimetype': 'audio/wav'},
                 enhance_config
             )
@@ -0,0 +1,96 @@
+# wire_format.py
+from typing import Any, Dict, Iterable, Optional, Union
+from datetime import date, time
+import json
+
+import msgpack
+from fastapi import WebSocketDisconnect
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an accelerator, not a requirement
+    orjson = None
+
+
+class WireFormatError(ValueError):
+    """A frame could not be decoded in the connection's format"""
+
+
+def _default(value: Any) -> Any:
+    # Enums, decimals and the like travel as strings in every format; dates
+    # and times as ISO 8601, which is also what orjson emits natively
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonCodec:
+    """JSON text frames, the default for clients that do not negotiate"""
+
+    subprotocol = 'json'
+    binary = False
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        if orjson is not None:
+            return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(payload, default=_default, separators=(',', ':'))
+
+    def decode(self, frame: Union[str, bytes]) -> Any:
+        try:
+            return orjson.loads(frame) if orjson is not None else json.loads(frame)
+        except ValueError as e:
+            raise WireFormatError('Invalid JSON format') from e
+
+
+class MsgpackCodec:
+    """MessagePack binary frames; smaller and cheaper for frequent pushes"""
+
+    subprotocol = 'msgpack'
+    binary = True
+
+    def encode(self, payload: Dict[str, Any]) -> bytes:
+        return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+    def decode(self, frame: Union[str, bytes]) -> Any:
+        if isinstance(frame, str):
+            raise WireFormatError('Expected a binary MessagePack frame')
+        try:
+            return msgpack.unpackb(frame, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise WireFormatError('Invalid MessagePack format') from e
+
+
+CODECS = {codec.subprotocol: codec for codec in (MsgpackCodec(), JsonCodec())}
+DEFAULT_CODEC = CODECS['json']
+
+
+def negotiate(requested: Iterable[str]):
+    """
+    Pick the first subprotocol the client offered that we support.
+
+    Returns the codec and the subprotocol to echo in the handshake, which
+    is None when the client offered none (plain JSON, no header).
+    """
+    for name in requested:
+        codec = CODECS.get(name.strip().lower())
+        if codec is not None:
+            return codec, codec.subprotocol
+    return DEFAULT_CODEC, None
+
+
+async def send_frame(websocket, codec, payload: Dict[str, Any]) -> None:
+    if codec.binary:
+        await websocket.send_bytes(codec.encode(payload))
+    else:
+        await websocket.send_text(codec.encode(payload))
+
+
+async def receive_frame(websocket, codec) -> Any:
+    """Decode the next data frame; raises WebSocketDisconnect when the client leaves"""
+    message = await websocket.receive()
+    if message['type'] == 'websocket.disconnect':
+        raise WebSocketDisconnect(message.get('code', 1000), message.get('reason'))
+    frame: Optional[Union[str, bytes]] = message.get('bytes')
+    if frame is None:
+        frame = message.get('text')
+    return codec.decode(frame)
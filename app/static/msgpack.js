@@ -0,0 +1,245 @@
+// msgpack.js
+// MessagePack for the patient page's WebSocket frames, served from /static
+// rather than a CDN. Exposes window.MessagePack.encode(value) -> Uint8Array
+// and window.MessagePack.decode(Uint8Array). Covers what the server's
+// msgpack.packb(use_bin_type=True) sends and accepts: nil, booleans,
+// integers, floats, str, bin, arrays and maps with string keys.
+(function (root) {
+    'use strict';
+
+    var textEncoder = new TextEncoder();
+    var textDecoder = new TextDecoder();
+
+    function Writer() {
+        this.view = new DataView(new ArrayBuffer(256));
+        this.length = 0;
+    }
+
+    Writer.prototype.reserve = function (size) {
+        var needed = this.length + size;
+        if (needed <= this.view.byteLength) {
+            return;
+        }
+        var capacity = this.view.byteLength * 2;
+        while (capacity < needed) {
+            capacity *= 2;
+        }
+        var grown = new Uint8Array(capacity);
+        grown.set(new Uint8Array(this.view.buffer, 0, this.length));
+        this.view = new DataView(grown.buffer);
+    };
+
+    Writer.prototype.u8 = function (value) {
+        this.reserve(1);
+        this.view.setUint8(this.length, value);
+        this.length += 1;
+    };
+
+    Writer.prototype.u16 = function (value) {
+        this.reserve(2);
+        this.view.setUint16(this.length, value);
+        this.length += 2;
+    };
+
+    Writer.prototype.u32 = function (value) {
+        this.reserve(4);
+        this.view.setUint32(this.length, value);
+        this.length += 4;
+    };
+
+    Writer.prototype.bytes = function (bytes) {
+        this.reserve(bytes.length);
+        new Uint8Array(this.view.buffer).set(bytes, this.length);
+        this.length += bytes.length;
+    };
+
+    Writer.prototype.header = function (size, fix, fixLimit, codes) {
+        if (fix !== null && size < fixLimit) {
+            this.u8(fix | size);
+        } else if (codes[0] !== null && size < 0x100) {
+            this.u8(codes[0]);
+            this.u8(size);
+        } else if (size < 0x10000) {
+            this.u8(codes[1]);
+            this.u16(size);
+        } else {
+            this.u8(codes[2]);
+            this.u32(size);
+        }
+    };
+
+    Writer.prototype.integer = function (value) {
+        if (value >= 0 && value < 0x80) {
+            this.u8(value);
+        } else if (value < 0 && value >= -0x20) {
+            this.u8(value & 0xff);
+        } else if (value >= 0 && value <= 0xffffffff) {
+            this.u8(0xce);
+            this.u32(value);
+        } else if (value >= -0x80000000 && value < 0) {
+            this.u8(0xd2);
+            this.reserve(4);
+            this.view.setInt32(this.length, value);
+            this.length += 4;
+        } else {
+            // Beyond 32 bits: int64, exact within Number's safe range
+            this.u8(0xd3);
+            this.reserve(8);
+            this.view.setBigInt64(this.length, BigInt(value));
+            this.length += 8;
+        }
+    };
+
+    Writer.prototype.value = function (value) {
+        if (value === null || value === undefined) {
+            this.u8(0xc0);
+        } else if (value === false) {
+            this.u8(0xc2);
+        } else if (value === true) {
+            this.u8(0xc3);
+        } else if (typeof value === 'number') {
+            if (Number.isSafeInteger(value)) {
+                this.integer(value);
+            } else {
+                this.u8(0xcb);
+                this.reserve(8);
+                this.view.setFloat64(this.length, value);
+                this.length += 8;
+            }
+        } else if (typeof value === 'string') {
+            var encoded = textEncoder.encode(value);
+            this.header(encoded.length, 0xa0, 32, [0xd9, 0xda, 0xdb]);
+            this.bytes(encoded);
+        } else if (value instanceof Uint8Array || value instanceof ArrayBuffer) {
+            var bytes = value instanceof ArrayBuffer ? new Uint8Array(value) : value;
+            this.header(bytes.length, null, 0, [0xc4, 0xc5, 0xc6]);
+            this.bytes(bytes);
+        } else if (Array.isArray(value)) {
+            this.header(value.length, 0x90, 16, [null, 0xdc, 0xdd]);
+            for (var i = 0; i < value.length; i++) {
+                this.value(value[i]);
+            }
+        } else if (value instanceof Date) {
+            this.value(value.toISOString());
+        } else if (typeof value === 'object') {
+            var keys = Object.keys(value).filter(function (key) {
+                return value[key] !== undefined;
+            });
+            this.header(keys.length, 0x80, 16, [null, 0xde, 0xdf]);
+            for (var j = 0; j < keys.length; j++) {
+                this.value(keys[j]);
+                this.value(value[keys[j]]);
+            }
+        } else {
+            throw new TypeError('Cannot encode ' + typeof value + ' as MessagePack');
+        }
+    };
+
+    function encode(value) {
+        var writer = new Writer();
+        writer.value(value);
+        return new Uint8Array(writer.view.buffer, 0, writer.length).slice();
+    }
+
+    function Reader(bytes) {
+        this.bytes = bytes;
+        this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        this.offset = 0;
+    }
+
+    Reader.prototype.take = function (size) {
+        if (this.offset + size > this.bytes.length) {
+            throw new RangeError('Truncated MessagePack data');
+        }
+        var start = this.offset;
+        this.offset += size;
+        return start;
+    };
+
+    Reader.prototype.str = function (size) {
+        var start = this.take(size);
+        return textDecoder.decode(this.bytes.subarray(start, start + size));
+    };
+
+    Reader.prototype.bin = function (size) {
+        var start = this.take(size);
+        return this.bytes.slice(start, start + size);
+    };
+
+    Reader.prototype.array = function (size) {
+        var out = new Array(size);
+        for (var i = 0; i < size; i++) {
+            out[i] = this.value();
+        }
+        return out;
+    };
+
+    Reader.prototype.map = function (size) {
+        var out = {};
+        for (var i = 0; i < size; i++) {
+            var key = this.value();
+            out[key] = this.value();
+        }
+        return out;
+    };
+
+    Reader.prototype.ext = function (size) {
+        var type = this.view.getInt8(this.take(1));
+        return {type: type, data: this.bin(size)};
+    };
+
+    Reader.prototype.value = function () {
+        var view = this.view;
+        var code = view.getUint8(this.take(1));
+        if (code < 0x80) return code;
+        if (code < 0x90) return this.map(code & 0x0f);
+        if (code < 0xa0) return this.array(code & 0x0f);
+        if (code < 0xc0) return this.str(code & 0x1f);
+        if (code >= 0xe0) return code - 0x100;
+        switch (code) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return this.bin(view.getUint8(this.take(1)));
+            case 0xc5: return this.bin(view.getUint16(this.take(2)));
+            case 0xc6: return this.bin(view.getUint32(this.take(4)));
+            case 0xc7: return this.ext(view.getUint8(this.take(1)));
+            case 0xc8: return this.ext(view.getUint16(this.take(2)));
+            case 0xc9: return this.ext(view.getUint32(this.take(4)));
+            case 0xca: return view.getFloat32(this.take(4));
+            case 0xcb: return view.getFloat64(this.take(8));
+            case 0xcc: return view.getUint8(this.take(1));
+            case 0xcd: return view.getUint16(this.take(2));
+            case 0xce: return view.getUint32(this.take(4));
+            case 0xcf: return Number(view.getBigUint64(this.take(8)));
+            case 0xd0: return view.getInt8(this.take(1));
+            case 0xd1: return view.getInt16(this.take(2));
+            case 0xd2: return view.getInt32(this.take(4));
+            case 0xd3: return Number(view.getBigInt64(this.take(8)));
+            case 0xd4: return this.ext(1);
+            case 0xd5: return this.ext(2);
+            case 0xd6: return this.ext(4);
+            case 0xd7: return this.ext(8);
+            case 0xd8: return this.ext(16);
+            case 0xd9: return this.str(view.getUint8(this.take(1)));
+            case 0xda: return this.str(view.getUint16(this.take(2)));
+            case 0xdb: return this.str(view.getUint32(this.take(4)));
+            case 0xdc: return this.array(view.getUint16(this.take(2)));
+            case 0xdd: return this.array(view.getUint32(this.take(4)));
+            case 0xde: return this.map(view.getUint16(this.take(2)));
+            case 0xdf: return this.map(view.getUint32(this.take(4)));
+        }
+        throw new RangeError('Unknown MessagePack type 0x' + code.toString(16));
+    };
+
+    function decode(bytes) {
+        var reader = new Reader(bytes instanceof ArrayBuffer ? new Uint8Array(bytes) : bytes);
+        var value = reader.value();
+        if (reader.offset !== reader.bytes.length) {
+            throw new RangeError('Extra bytes after MessagePack value');
+        }
+        return value;
+    }
+
+    root.MessagePack = {encode: encode, decode: decode};
+})(typeof window !== 'undefined' ? window : globalThis);
@@ -1,5 +1,19 @@
 # __init__.py
-from .stt_service import STTService
-from .tts_service import TTSService
+from importlib import import_module
 
-__all__ = ['STTService', 'TTSService']
\ No newline at end of file
+# Imported on first access so that e.g. audio_processing can be used
+# without loading the Deepgram SDK
+_EXPORTS = {
+    'STTService': '.stt_service',
+    'TTSService': '.tts_service',
+}
+
+__all__ = ['STTService', 'TTSService']
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,273 @@
+# audio_processing.py
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import struct
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_MULAW = 0x0007
+WAVE_FORMAT_IMA_ADPCM = 0x0011
+
+SUPPORTED_ENCODINGS = ('pcm', 'mulaw', 'adpcm')
+# Output rates a client may negotiate; never above the synthesized rate
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 24000)
+
+# IMA ADPCM step and index tables
+_IMA_STEP_TABLE = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41,
+    45, 50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190,
+    209, 230, 253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724,
+    796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272,
+    2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132,
+    7845, 8630, 9493, 10442, 11487, 12635, 13899, 15289, 16818, 18500, 20350,
+    22385, 24623, 27086, 29794, 32767
+]
+_IMA_INDEX_TABLE = [-1, -1, -1, -1, 2, 4, 6, 8]
+_ADPCM_BLOCK_ALIGN = 256
+
+
+@dataclass
+class WavInfo:
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    block_align: int
+    data_offset: int
+    data_size: int
+
+
+def parse_wav_header(audio_data: bytes) -> WavInfo:
+    """Walk the RIFF chunks of a WAV buffer and return its format and data location"""
+    view = memoryview(audio_data)
+    if len(view) < 12 or view[:4] != b'RIFF' or view[8:12] != b'WAVE':
+        raise ValueError('Not a RIFF/WAVE buffer')
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id == b'fmt ':
+            if chunk_size < 16:
+                raise ValueError('Truncated fmt chunk')
+            fmt = struct.unpack_from('<HHIIHH', view, body)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError('data chunk precedes fmt chunk')
+            # Streamed WAVs often carry a placeholder size, clamp to what we have
+            data_size = min(chunk_size, len(view) - body)
+            return WavInfo(
+                format_tag=fmt[0],
+                channels=fmt[1],
+                sample_rate=fmt[2],
+                bits_per_sample=fmt[5],
+                block_align=fmt[4],
+                data_offset=body,
+                data_size=data_size
+            )
+
+        # Chunks are word aligned
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError('WAV buffer has no data chunk')
+
+
+def decode_pcm16(audio_data: bytes) -> Tuple[np.ndarray, WavInfo]:
+    """Decode a 16-bit PCM WAV into an int16 array shaped (frames, channels)"""
+    info = parse_wav_header(audio_data)
+    if info.format_tag != WAVE_FORMAT_PCM or info.bits_per_sample != 16:
+        raise ValueError('Only 16-bit PCM WAV input is supported')
+
+    frame_count = info.data_size // (2 * info.channels)
+    samples = np.frombuffer(
+        audio_data,
+        dtype='<i2',
+        count=frame_count * info.channels,
+        offset=info.data_offset
+    )
+    return samples.reshape(frame_count, info.channels), info
+
+
+def downmix_to_mono(samples: np.ndarray) -> np.ndarray:
+    """Average all channels into a single (frames, 1) channel"""
+    if samples.shape[1] == 1:
+        return samples
+    mixed = samples.astype(np.int32).sum(axis=1) // samples.shape[1]
+    return mixed.astype(np.int16).reshape(-1, 1)
+
+
+def _lowpass_kernel(cutoff: float, taps: int = 63) -> np.ndarray:
+    """Hamming windowed-sinc low-pass kernel, cutoff as a fraction of the sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Resample (frames, channels) int16 audio using low-pass filtering and interpolation"""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+
+    frame_count = len(samples)
+    out_count = max(1, int(round(frame_count * target_rate / source_rate)))
+    positions = np.arange(out_count) * (source_rate / target_rate)
+    source_positions = np.arange(frame_count)
+    kernel = _lowpass_kernel(0.5 * target_rate / source_rate) if target_rate < source_rate else None
+
+    channels = []
+    for channel in range(samples.shape[1]):
+        signal = samples[:, channel].astype(np.float32)
+        if kernel is not None:
+            # Suppress content above the new Nyquist frequency before decimating
+            signal = np.convolve(signal, kernel, mode='same')
+        channels.append(np.interp(positions, source_positions, signal))
+
+    resampled = np.stack(channels, axis=1)
+    return np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+
+
+def encode_mulaw(samples: np.ndarray) -> np.ndarray:
+    """Encode int16 samples to 8-bit G.711 mu-law"""
+    # Work in the 14-bit domain of the reference G.711 encoder
+    pcm = samples.astype(np.int32).ravel() >> 2
+    sign = (pcm < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(pcm), 8158) + 0x21
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0, 7)
+    mantissa = (magnitude >> (exponent + 1)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+def encode_ima_adpcm(samples: np.ndarray,
+                     block_align: int = _ADPCM_BLOCK_ALIGN) -> Tuple[bytes, int]:
+    """
+    Encode mono int16 samples to WAV IMA ADPCM blocks
+
+    Returns:
+        Tuple of encoded bytes and samples per block
+    """
+    pcm = samples.ravel().tolist()
+    samples_per_block = (block_align - 4) * 2 + 1
+    step_table = _IMA_STEP_TABLE
+    index_table = _IMA_INDEX_TABLE
+    out = bytearray()
+
+    for start in range(0, len(pcm), samples_per_block):
+        block = pcm[start:start + samples_per_block]
+        # Pad the final block so every block has the declared size
+        block += [block[-1]] * (samples_per_block - len(block))
+
+        predictor = block[0]
+        index = 0 if start == 0 else index
+        out += struct.pack('<hBB', predictor, index, 0)
+
+        nibbles = []
+        for sample in block[1:]:
+            step = step_table[index]
+            diff = sample - predictor
+            code = 0
+            if diff < 0:
+                code = 8
+                diff = -diff
+
+            delta = step >> 3
+            if diff >= step:
+                code |= 4
+                diff -= step
+                delta += step
+            step >>= 1
+            if diff >= step:
+                code |= 2
+                diff -= step
+                delta += step
+            step >>= 1
+            if diff >= step:
+                code |= 1
+                delta += step
+
+            predictor = predictor - delta if code & 8 else predictor + delta
+            predictor = max(-32768, min(32767, predictor))
+            index = max(0, min(88, index + index_table[code & 7]))
+            nibbles.append(code)
+
+        out += bytes(lo | (hi << 4) for lo, hi in zip(nibbles[0::2], nibbles[1::2]))
+
+    return bytes(out), samples_per_block
+
+
+def build_wav(payload: bytes, format_tag: int, channels: int, sample_rate: int,
+              bits_per_sample: int, block_align: int,
+              fmt_extension: Optional[bytes] = None,
+              sample_count: Optional[int] = None) -> bytes:
+    """Wrap an encoded payload in a RIFF/WAVE container with correct sizes"""
+    byte_rate = sample_rate * block_align
+    if format_tag == WAVE_FORMAT_IMA_ADPCM:
+        samples_per_block = struct.unpack('<H', fmt_extension[-2:])[0]
+        byte_rate = sample_rate * block_align // samples_per_block
+
+    fmt_body = struct.pack(
+        '<HHIIHH', format_tag, channels, sample_rate, byte_rate,
+        block_align, bits_per_sample
+    )
+    if fmt_extension is not None:
+        fmt_body += fmt_extension
+
+    chunks = b'fmt ' + struct.pack('<I', len(fmt_body)) + fmt_body
+    # Non-PCM formats carry a fact chunk with the decoded sample count
+    if format_tag != WAVE_FORMAT_PCM:
+        chunks += b'fact' + struct.pack('<II', 4, sample_count or 0)
+
+    data = b'data' + struct.pack('<I', len(payload)) + payload
+    if len(payload) & 1:
+        data += b'\x00'
+
+    return b'RIFF' + struct.pack('<I', 4 + len(chunks) + len(data)) + b'WAVE' + chunks + data
+
+
+def optimize_wav(audio_data: bytes, target_rate: Optional[int] = None,
+                 mono: bool = True, encoding: str = 'pcm') -> bytes:
+    """
+    Compact a 16-bit PCM WAV for delivery to a client
+
+    Args:
+        audio_data: Source WAV bytes
+        target_rate: Sample rate negotiated with the client (None keeps the source rate)
+        mono: Whether to down-mix to a single channel
+        encoding: One of 'pcm', 'mulaw' or 'adpcm'
+
+    Returns:
+        Re-encoded WAV bytes with a rewritten header
+    """
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise ValueError(f'Unsupported encoding: {encoding}')
+
+    samples, info = decode_pcm16(audio_data)
+    sample_rate = target_rate or info.sample_rate
+    if sample_rate > info.sample_rate:
+        raise ValueError(f'Cannot upsample {info.sample_rate} Hz audio to {sample_rate} Hz')
+
+    # ADPCM blocks are encoded per channel, so we only emit mono
+    if mono or encoding == 'adpcm':
+        samples = downmix_to_mono(samples)
+    samples = resample(samples, info.sample_rate, sample_rate)
+    channels = samples.shape[1]
+
+    if encoding == 'mulaw':
+        payload = encode_mulaw(samples).tobytes()
+        return build_wav(payload, WAVE_FORMAT_MULAW, channels, sample_rate, 8,
+                         channels, fmt_extension=struct.pack('<H', 0),
+                         sample_count=len(samples))
+
+    if encoding == 'adpcm':
+        payload, samples_per_block = encode_ima_adpcm(samples)
+        return build_wav(payload, WAVE_FORMAT_IMA_ADPCM, 1, sample_rate, 4,
+                         _ADPCM_BLOCK_ALIGN,
+                         fmt_extension=struct.pack('<HH', 2, samples_per_block),
+                         sample_count=len(samples))
+
+    if (sample_rate, channels) == (info.sample_rate, info.channels):
+        return audio_data
+    return build_wav(samples.astype('<i2').tobytes(), WAVE_FORMAT_PCM, channels,
+                     sample_rate, 16, 2 * channels)
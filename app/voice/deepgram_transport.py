@@ -0,0 +1,138 @@
+# deepgram_transport.py
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from deepgram import DeepgramClient, DeepgramClientOptions
+import asyncio
+import httpx
+import logging
+import os
+import random
+from config.deepgram_config import DeepgramConfig
+from app.platform.metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class DeepgramTransport:
+    """
+    Shared Deepgram client for STT, TTS and voice input handling.
+
+    One transport is created per worker. Every upstream call goes through
+    `call`, which bounds concurrency and applies the timeout and retry
+    settings from DeepgramConfig.
+
+    The SDK opens a new HTTP client, and so a new TLS connection, for every
+    REST call; only its live websockets are long-lived. Prerecorded
+    transcription is therefore posted by `transcribe_file` through one
+    httpx client whose pool keeps connections to Deepgram open.
+    """
+
+    def __init__(self, api_key: Optional[str] = None,
+                 max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 retry_delay: Optional[float] = None):
+        api_key = api_key or os.getenv('DEEPGRAM_API_KEY')
+        if not api_key:
+            raise ValueError("DEEPGRAM_API_KEY environment variable is not set")
+
+        # keepalive applies to live websocket sessions
+        config = DeepgramClientOptions(options={"keepalive": "true"})
+        self.client = DeepgramClient(api_key, config)
+        self.timeout = timeout or DeepgramConfig.TIMEOUT
+        concurrency = max_concurrency or DeepgramConfig.MAX_CONCURRENCY
+        self.http = httpx.AsyncClient(
+            base_url=DeepgramConfig.API_URL,
+            headers={'Authorization': f'Token {api_key}'},
+            limits=httpx.Limits(max_connections=concurrency,
+                                max_keepalive_connections=concurrency),
+            timeout=httpx.Timeout(self.timeout, connect=10.0)
+        )
+        self.max_retries = DeepgramConfig.MAX_RETRIES if max_retries is None else max_retries
+        self.retry_delay = DeepgramConfig.RETRY_DELAY if retry_delay is None else retry_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args,
+                   timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Invoke a Deepgram SDK coroutine with concurrency limits, a per-call
+        timeout and jittered exponential backoff on transient failures
+        """
+        operation = getattr(func, '__name__', 'call')
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    with track_upstream('deepgram', operation):
+                        return await asyncio.wait_for(
+                            func(*args, **kwargs),
+                            timeout or self.timeout
+                        )
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(
+                    f"Deepgram call failed ({type(e).__name__}), "
+                    f"retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def transcribe_file(self, audio_data: bytes, options: Optional[Dict[str, Any]] = None,
+                              mimetype: str = 'audio/wav') -> Dict[str, Any]:
+        """
+        POST audio to the prerecorded /listen endpoint over the pooled
+        connections and return the decoded JSON response. Wrap in `call`
+        for the concurrency bound and retries.
+        """
+        params = {
+            key: str(value).lower() if isinstance(value, bool) else value
+            for key, value in (options or {}).items()
+            if value is not None
+        }
+        response = await self.http.post(
+            '/listen',
+            params=params,
+            content=audio_data,
+            headers={'Content-Type': mimetype}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self) -> None:
+        await self.http.aclose()
+
+    async def map(self, func: Callable[[Any], Awaitable[Any]], items: Iterable[Any],
+                  limit: Optional[int] = None) -> List[Any]:
+        """
+        Run func over items concurrently, results in order, with at most
+        `limit` of them running at once. func is expected to go through
+        `call`, so the worker-wide bound still applies on top.
+        """
+        gate = asyncio.Semaphore(limit or DeepgramConfig.MAX_FANOUT)
+
+        async def run(item):
+            async with gate:
+                return await func(item)
+
+        return await asyncio.gather(*[run(item) for item in items])
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff capped at DeepgramConfig.MAX_RETRY_DELAY"""
+        ceiling = min(DeepgramConfig.MAX_RETRY_DELAY, self.retry_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+            return True
+
+        status = getattr(error, 'status', None) or getattr(error, 'status_code', None)
+        if status is None and getattr(error, 'response', None) is not None:
+            status = getattr(error.response, 'status_code', None)
+        try:
+            return int(status) in RETRYABLE_STATUS_CODES
+        except (TypeError, ValueError):
+            return False
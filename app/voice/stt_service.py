@@ -1,21 +1,25 @@
 from typing import Dict, Any, Optional
 from deepgram import (
-    DeepgramClient,
     PrerecordedOptions,
+    PrerecordedResponse,
     LiveOptions,
     LiveTranscriptionEvents
 )
 import os
 import json
+import asyncio
 from datetime import datetime
+import numpy as np
+from config.deepgram_config import DeepgramConfig
+from .vad import VoiceActivityDetector
+from .audio_processing import WAVE_FORMAT_PCM, build_wav
+from .wav_stream import WavStreamParser, WavFormatError, validate_wav
+from .deepgram_transport import DeepgramTransport
 
 class STTService:
-    def __init__(self):
-        api_key = os.getenv('DEEPGRAM_API_KEY')
-        if not api_key:
-            raise ValueError("DEEPGRAM_API_KEY environment variable is not set")
-            
-        self.deepgram_client = DeepgramClient(api_key)
+    def __init__(self, transport: Optional[DeepgramTransport] = None):
+        self.transport = transport or DeepgramTransport()
+        self.deepgram_client = self.transport.client
         self.default_config = {
             'punctuate': True,
             'model': 'general',
@@ -23,6 +27,7 @@ class STTService:
             'tier': 'enhanced',
             'filler_words': False
         }
+        self.vad = VoiceActivityDetector()
     
     async def transcribe_audio(self, audio_data: bytes, 
                              config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -47,50 +52,186 @@ class STTService:
                     'message': 'Invalid audio data format'
                 }
             
+            # Trim silence so only speech is sent upstream
+            try:
+                segments = self.vad.split_wav(audio_data)
+            except ValueError:
+                # Not 16-bit PCM, send the upload as is
+                segments = [audio_data]
+            
+            if not segments:
+                return {
+                    'success': False,
+                    'message': 'No speech detected in audio'
+                }
+            
             # Create options for transcription
-            options = PrerecordedOptions(
-                model=transcription_config['model'],
-                smart_format=transcription_config['punctuate'],
-                language=transcription_config['language'],
-                tier=transcription_config['tier'],
-                filler_words=transcription_config['filler_words']
+            options = self._prerecorded_options(transcription_config)
+            
+            # Transcribe speech segments, a few at a time
+            results = await self.transport.map(
+                lambda segment: self._transcribe_segment(segment, options),
+                segments
             )
+            results = [result for result in results if result]
+            
+            if results:
+                return {
+                    'success': True,
+                    'transcript': ' '.join(result['transcript'] for result in results).strip(),
+                    'confidence': sum(result['confidence'] for result in results) / len(results),
+                    'segments': len(segments),
+                    'timestamp': datetime.utcnow().isoformat()
+                }
+            
+            return {
+                'success': False,
+                'message': 'No transcription results'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Transcription failed: {str(e)}'
+            }
+    
+    def _prerecorded_options(self, transcription_config: Dict[str, Any]) -> PrerecordedOptions:
+        return PrerecordedOptions(
+            model=transcription_config['model'],
+            smart_format=transcription_config['punctuate'],
+            language=transcription_config['language'],
+            tier=transcription_config['tier'],
+            filler_words=transcription_config['filler_words']
+        )
+    
+    async def _transcribe_segment(self, audio_data: bytes,
+                                  options: PrerecordedOptions) -> Optional[Dict[str, Any]]:
+        """Transcribe a single speech segment, returning None if nothing was recognised"""
+        result = await self.transport.call(
+            self.transport.transcribe_file,
+            audio_data,
+            options.to_dict()
+        )
+        response = PrerecordedResponse.from_dict(result)
+        
+        # Extract transcript from response
+        if response and response.results and response.results.channels:
+            channel = response.results.channels[0]
+            if channel.alternatives:
+                return {
+                    'transcript': channel.alternatives[0].transcript,
+                    'confidence': channel.alternatives[0].confidence
+                }
+        
+        return None
+    
+    async def transcribe_stream(self, audio_stream) -> Dict[str, Any]:
+        """
+        Transcribe a WAV upload while it is still arriving
+        
+        The RIFF header is parsed incrementally and the format and duration
+        limits are enforced as the body arrives. Leading silence is dropped
+        until the VAD sees speech, so all-silence uploads never reach
+        Deepgram; the speech that follows is sent through the pooled
+        prerecorded endpoint once the upload ends.
+        
+        Args:
+            audio_stream: Async iterator of raw body chunks
+            
+        Returns:
+            Dictionary containing transcription results or error information
+        """
+        audio_config = DeepgramConfig.AUDIO_CONFIG
+        parser = WavStreamParser(audio_config)
+        max_bytes = None
+        speech_started = False
+        pending = bytearray()
+        pending_start = 0  # offset of pending[0] in the data chunk
+        
+        try:
+            async for chunk in audio_stream:
+                for audio in parser.feed(chunk):
+                    info = parser.info
+                    if max_bytes is None:
+                        max_bytes = (DeepgramConfig.STREAMING_CONFIG['max_duration']
+                                     * info.sample_rate * info.block_align)
+                    if parser.data_received > max_bytes:
+                        raise WavFormatError('Audio exceeds maximum duration')
+                    
+                    pending += audio
+                    if speech_started:
+                        continue
+                    
+                    # Hold audio back until speech starts
+                    if not self._contains_speech(pending, info):
+                        # Keep the padding before speech, cut on a frame boundary of the
+                        # data chunk: body chunks have any length, so pending may not be
+                        preroll = info.sample_rate * self.vad.padding_ms // 1000 * info.block_align
+                        keep_from = pending_start + len(pending) - preroll
+                        keep_from = max(pending_start, keep_from - keep_from % info.block_align)
+                        del pending[:keep_from - pending_start]
+                        pending_start = keep_from
+                        continue
+                    speech_started = True
+            
+            info = parser.finish()
             
-            # Process transcription
-            response = await self.deepgram_client.transcribe_file(
-                audio_data,
-                mimetype='audio/wav',
-                options=options
+            if not speech_started:
+                return {
+                    'success': False,
+                    'message': 'No speech detected in audio'
+                }
+            
+            # pending starts on a frame boundary; drop a trailing partial frame
+            del pending[len(pending) - len(pending) % info.block_align:]
+            speech = build_wav(
+                bytes(pending),
+                WAVE_FORMAT_PCM,
+                info.channels,
+                info.sample_rate,
+                info.bits_per_sample,
+                info.block_align
             )
+            result = await self._transcribe_segment(speech, self._prerecorded_options(self.default_config))
             
-            # Extract transcript from response
-            if response and response.results and response.results.channels:
-                channel = response.results.channels[0]
-                if channel.alternatives:
-                    return {
-                        'success': True,
-                        'transcript': channel.alternatives[0].transcript,
-                        'confidence': channel.alternatives[0].confidence,
-                        'timestamp': datetime.utcnow().isoformat()
-                    }
+            if result:
+                return {
+                    'success': True,
+                    'transcript': result['transcript'].strip(),
+                    'confidence': result['confidence'],
+                    'timestamp': datetime.utcnow().isoformat()
+                }
             
             return {
                 'success': False,
                 'message': 'No transcription results'
             }
             
+        except WavFormatError as e:
+            return {
+                'success': False,
+                'message': f'Invalid audio data format: {str(e)}'
+            }
         except Exception as e:
             return {
                 'success': False,
                 'message': f'Transcription failed: {str(e)}'
             }
     
-    async def start_realtime_transcription(self, callback) -> Dict[str, Any]:
+    def _contains_speech(self, audio: bytearray, info) -> bool:
+        """Run the VAD over buffered 16-bit PCM audio"""
+        frame_count = len(audio) // info.block_align
+        samples = np.frombuffer(audio, dtype='<i2', count=frame_count * info.channels)
+        mono = samples.reshape(-1, info.channels).mean(axis=1).astype(np.int16)
+        return bool(self.vad.detect_speech_frames(mono, info.sample_rate).any())
+    
+    async def start_realtime_transcription(self, callback, **stream_options) -> Dict[str, Any]:
         """
         Initialize real-time transcription session
         
         Args:
             callback: Async function to handle transcription results
+            stream_options: Optional LiveOptions overrides (encoding, sample_rate, ...)
             
         Returns:
             Dictionary containing streaming client or error information
@@ -103,22 +244,26 @@ class STTService:
                 language=self.default_config['language'],
                 tier=self.default_config['tier'],
                 interim_results=True,
-                endpointing=True
+                endpointing=True,
+                **stream_options
             )
             
             # Initialize streaming
-            connection = await self.deepgram_client.listen.live.v1(options)
+            connection = self.deepgram_client.listen.asyncwebsocket.v('1')
             
             # Set up event handlers
-            @connection.on(LiveTranscriptionEvents.TRANSCRIPT)
-            async def handle_transcript(transcript):
-                if transcript.is_final:
+            async def handle_transcript(client, result, **kwargs):
+                if result.is_final:
                     await callback({
-                        'transcript': transcript.channel.alternatives[0].transcript,
-                        'confidence': transcript.channel.alternatives[0].confidence,
-                        'words': transcript.channel.alternatives[0].words
+                        'transcript': result.channel.alternatives[0].transcript,
+                        'confidence': result.channel.alternatives[0].confidence,
+                        'words': result.channel.alternatives[0].words
                     })
             
+            connection.on(LiveTranscriptionEvents.Transcript, handle_transcript)
+            if not await self.transport.call(connection.start, options):
+                raise RuntimeError('Deepgram refused the live connection')
+            
             return {
                 'success': True,
                 'streaming_client': connection
@@ -141,16 +286,7 @@ class STTService:
             bool: True if audio data appears valid, False otherwise
         """
         try:
-            # Basic WAV format validation
-            if len(audio_data) < 44:  # Minimum WAV header size
-                return False
-            
-            if audio_data[:4] != b'RIFF':
-                return False
-                
-            if audio_data[8:12] != b'WAVE':
-                return False
-            
+            validate_wav(audio_data, DeepgramConfig.AUDIO_CONFIG)
             return True
-        except:
-            return False
\ No newline at end of file
+        except WavFormatError:
+            return False
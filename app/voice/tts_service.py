@@ -2,27 +2,25 @@
 from typing import Dict, Any, Optional, List
 import os
 from datetime import datetime
-from deepgram import (
-    DeepgramClient,
-    PrerecordedOptions,
-    LiveOptions,
-    LiveTranscriptionEvents
-)
+from .audio_processing import optimize_wav, SUPPORTED_ENCODINGS, SUPPORTED_SAMPLE_RATES
+from .deepgram_transport import DeepgramTransport
+from app.platform.tracing import traced
 
 class TTSService:
-    def __init__(self):
-        api_key = os.getenv('DEEPGRAM_API_KEY')
-        if not api_key:
-            raise ValueError("DEEPGRAM_API_KEY environment variable is not set")
-            
-        self.deepgram_client = DeepgramClient(api_key)  # Updated client initialization
+    def __init__(self, transport: Optional[DeepgramTransport] = None):
+        self.transport = transport or DeepgramTransport()
+        self.deepgram_client = self.transport.client
         self.default_config = {
             'voice': 'female-1',
             'speed': 1.0,
             'pitch': 1.0,
-            'sample_rate': 24000
+            'sample_rate': 24000,
+            'output_sample_rate': None,
+            'output_encoding': 'pcm',
+            'output_mono': True
         }
             
+    @traced('tts.synthesize')
     async def synthesize_speech(self, text: str, 
                               config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -39,18 +37,45 @@ class TTSService:
                     'message': 'Invalid input text'
                 }
             
+            if tts_config['output_encoding'] not in SUPPORTED_ENCODINGS:
+                return {
+                    'success': False,
+                    'message': f"Unsupported output encoding: {tts_config['output_encoding']}"
+                }
+            
+            output_rate = tts_config['output_sample_rate']
+            if output_rate is not None and (output_rate not in SUPPORTED_SAMPLE_RATES
+                                            or output_rate > tts_config['sample_rate']):
+                return {
+                    'success': False,
+                    'message': f"Unsupported output sample rate: {output_rate}"
+                }
+            
             # Process text-to-speech
             tts_request = {
                 'text': text,
-                **tts_config
+                'voice': tts_config['voice'],
+                'speed': tts_config['speed'],
+                'pitch': tts_config['pitch'],
+                'sample_rate': tts_config['sample_rate']
             }
             
-            response = await self.deepgram_client.text_to_speech(tts_request)
+            response = await self.transport.call(self.deepgram_client.text_to_speech, tts_request)
             
             if response and response.get('audio'):
+                # Compact the audio to what the client negotiated
+                audio_data = self._optimize_audio_output(
+                    response['audio'],
+                    target_rate=tts_config['output_sample_rate'],
+                    encoding=tts_config['output_encoding'],
+                    mono=tts_config['output_mono']
+                )
+                
                 return {
                     'success': True,
-                    'audio_data': response['audio'],
+                    'audio_data': audio_data,
+                    'encoding': tts_config['output_encoding'],
+                    'sample_rate': tts_config['output_sample_rate'] or tts_config['sample_rate'],
                     'duration': response.get('duration'),
                     'timestamp': datetime.utcnow().isoformat()
                 }
@@ -93,11 +118,27 @@ class TTSService:
                 'message': f'Batch processing failed: {str(e)}'
             }
     
-    def _optimize_audio_output(self, audio_data: bytes) -> bytes:
+    def _optimize_audio_output(self, audio_data: bytes,
+                               target_rate: Optional[int] = None,
+                               encoding: str = 'pcm',
+                               mono: bool = True) -> bytes:
         """
-        Optimize audio output for better quality and smaller size
+        Optimize audio output for smaller size
+        
+        Resamples to the client-negotiated rate, down-mixes to mono and
+        optionally re-encodes as mu-law or IMA ADPCM. Audio that is not
+        16-bit PCM WAV is passed through unchanged.
         """
-        # Implementation for audio optimization
-        # This would involve audio processing logic
-        return audio_data
+        if audio_data[:4] != b'RIFF':
+            return audio_data
+        
+        try:
+            return optimize_wav(
+                audio_data,
+                target_rate=target_rate,
+                mono=mono,
+                encoding=encoding
+            )
+        except ValueError:
+            return audio_data
 
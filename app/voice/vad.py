@@ -0,0 +1,144 @@
+# vad.py
+from typing import List, Optional, Tuple
+import numpy as np
+from config.deepgram_config import DeepgramConfig
+from .audio_processing import decode_pcm16, downmix_to_mono, build_wav, WAVE_FORMAT_PCM
+
+
+class VoiceActivityDetector:
+    """
+    Energy and zero-crossing based voice activity detection.
+
+    Frames are classified as speech when their energy clears an adaptive
+    noise floor, or when they are slightly quieter but have the high
+    zero-crossing rate typical of unvoiced consonants. Speech runs closer
+    together than the hangover are merged into one segment.
+    """
+
+    def __init__(self, frame_ms: int = 20,
+                 hangover_ms: Optional[int] = None,
+                 max_segment_seconds: Optional[int] = None,
+                 padding_ms: int = 150,
+                 min_speech_ms: int = 60,
+                 min_energy_db: float = -50.0,
+                 max_threshold_db: float = -30.0,
+                 noise_margin_db: float = 12.0,
+                 zcr_threshold: float = 0.25):
+        streaming_config = DeepgramConfig.get_streaming_config()
+        self.frame_ms = frame_ms
+        self.hangover_ms = hangover_ms if hangover_ms is not None else streaming_config['vad_turnoff']
+        self.max_segment_seconds = max_segment_seconds or streaming_config['max_duration']
+        self.padding_ms = padding_ms
+        self.min_speech_ms = min_speech_ms
+        self.min_energy_db = min_energy_db
+        self.max_threshold_db = max_threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.zcr_threshold = zcr_threshold
+
+    def detect_speech_frames(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Return a boolean speech flag per frame for mono int16 samples"""
+        frame_length = max(1, sample_rate * self.frame_ms // 1000)
+        frame_count = len(samples) // frame_length
+        if frame_count == 0:
+            return np.zeros(0, dtype=bool)
+
+        frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+        frames = frames.astype(np.float32) / 32768.0
+
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+
+        # Adapt to the recording's noise floor within fixed bounds
+        noise_floor_db = np.percentile(energy_db, 10)
+        threshold_db = min(
+            max(self.min_energy_db, noise_floor_db + self.noise_margin_db),
+            self.max_threshold_db
+        )
+
+        voiced = energy_db > threshold_db
+        unvoiced = (energy_db > threshold_db - 6.0) & (zcr > self.zcr_threshold)
+        return voiced | unvoiced
+
+    def find_segments(self, samples: np.ndarray, sample_rate: int) -> List[Tuple[int, int]]:
+        """Return (start, end) sample ranges that contain speech"""
+        flags = self.detect_speech_frames(samples, sample_rate)
+        if not flags.any():
+            return []
+
+        frame_length = max(1, sample_rate * self.frame_ms // 1000)
+        hangover_frames = self.hangover_ms // self.frame_ms
+        min_speech_frames = max(1, self.min_speech_ms // self.frame_ms)
+
+        # Locate runs of speech frames
+        edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+
+        # Merge runs separated by less than the hangover, drop isolated clicks
+        merged = []
+        for start, end in zip(run_starts, run_ends):
+            if merged and start - merged[-1][1] <= hangover_frames:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        merged = [run for run in merged if run[1] - run[0] >= min_speech_frames]
+
+        padding = sample_rate * self.padding_ms // 1000
+        max_length = sample_rate * self.max_segment_seconds
+        segments = []
+        for start_frame, end_frame in merged:
+            start = max(0, start_frame * frame_length - padding)
+            end = min(len(samples), end_frame * frame_length + padding)
+
+            # Keep each upstream request within the streaming duration limit
+            for chunk_start in range(start, end, max_length):
+                segments.append((chunk_start, min(end, chunk_start + max_length)))
+
+        return segments
+
+    def merge_segments(self, segments: List[Tuple[int, int]],
+                       sample_rate: int) -> List[List[Tuple[int, int]]]:
+        """
+        Group consecutive segments so each group holds at most
+        max_segment_seconds of speech, one upstream request per group
+        """
+        max_length = sample_rate * self.max_segment_seconds
+        groups = []
+        length = 0
+        for start, end in segments:
+            if groups and length + (end - start) <= max_length:
+                groups[-1].append((start, end))
+                length += end - start
+            else:
+                groups.append([(start, end)])
+                length = end - start
+        return groups
+
+    def split_wav(self, audio_data: bytes) -> List[bytes]:
+        """
+        Trim silence from a 16-bit PCM WAV and pack its speech into as few
+        WAVs as the segment limit allows
+
+        Pauses are cut out, so the speech either side of one is joined with
+        only the padding between; a recording with many pauses is still a
+        single request unless it holds more than max_segment_seconds of speech.
+
+        Returns:
+            List of WAV encoded segments, empty if the audio has no speech
+        """
+        samples, info = decode_pcm16(audio_data)
+        mono = downmix_to_mono(samples).ravel()
+        segments = self.find_segments(mono, info.sample_rate)
+
+        return [
+            build_wav(
+                np.concatenate([samples[start:end] for start, end in group]).astype('<i2').tobytes(),
+                WAVE_FORMAT_PCM,
+                info.channels,
+                info.sample_rate,
+                16,
+                2 * info.channels
+            )
+            for group in self.merge_segments(segments, info.sample_rate)
+        ]
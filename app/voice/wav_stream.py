@@ -0,0 +1,143 @@
+# wav_stream.py
+from typing import Any, Dict, List, Optional
+import struct
+from .audio_processing import WavInfo, WAVE_FORMAT_PCM
+
+# Upper bound on the bytes we are willing to buffer before the data chunk
+MAX_HEADER_SIZE = 64 * 1024
+
+
+class WavFormatError(ValueError):
+    """Raised when a WAV stream is malformed or does not match the expected format"""
+
+
+class WavStreamParser:
+    """
+    Incremental RIFF/WAVE parser.
+
+    Chunks are fed as they arrive from the network. Only the header is
+    buffered; once the data chunk starts, audio is handed back as
+    memoryview slices of the fed chunks without copying.
+    """
+
+    def __init__(self, expected_format: Optional[Dict[str, Any]] = None):
+        self.expected_format = expected_format
+        self.info: Optional[WavInfo] = None
+        self.data_received = 0
+        self._header = bytearray()
+        self._fmt = None
+        self._remaining = None  # audio bytes left in the data chunk
+
+    @property
+    def header_complete(self) -> bool:
+        return self.info is not None
+
+    def feed(self, chunk: bytes) -> List[memoryview]:
+        """Consume a network chunk and return any audio payload it contains"""
+        if not chunk:
+            return []
+
+        view = memoryview(chunk)
+        if self.info is None:
+            # Only buffer when the header spans several chunks
+            if self._header:
+                self._header += chunk
+                view = memoryview(self._header)
+
+            offset = self._parse_header(view)
+            if offset is None:
+                if not self._header:
+                    self._header += chunk
+                if len(self._header) > MAX_HEADER_SIZE:
+                    raise WavFormatError('WAV header exceeds maximum size')
+                return []
+            view = view[offset:]
+
+        return self._take_audio(view)
+
+    def finish(self) -> WavInfo:
+        """Validate the stream once the body has been fully read"""
+        if self.info is None:
+            raise WavFormatError('WAV stream ended before the data chunk')
+        if self.data_received == 0:
+            raise WavFormatError('WAV stream contains no audio')
+        return self.info
+
+    def _take_audio(self, view: memoryview) -> List[memoryview]:
+        if self._remaining is not None:
+            view = view[:self._remaining]
+            self._remaining -= len(view)
+        self.data_received += len(view)
+        return [view] if len(view) else []
+
+    def _parse_header(self, view: memoryview) -> Optional[int]:
+        """Walk header chunks, returning the data offset once it is known"""
+        if len(view) < 12:
+            return None
+        if view[:4] != b'RIFF' or view[8:12] != b'WAVE':
+            raise WavFormatError('Not a RIFF/WAVE stream')
+
+        offset = 12
+        while offset + 8 <= len(view):
+            chunk_id = bytes(view[offset:offset + 4])
+            chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+            body = offset + 8
+
+            if chunk_id == b'data':
+                if self._fmt is None:
+                    raise WavFormatError('data chunk precedes fmt chunk')
+                self._set_info(body, chunk_size)
+                return body
+
+            if body + chunk_size > len(view):
+                # Wait for the rest of this chunk
+                return None
+
+            if chunk_id == b'fmt ':
+                if chunk_size < 16:
+                    raise WavFormatError('Truncated fmt chunk')
+                self._fmt = struct.unpack_from('<HHIIHH', view, body)
+
+            offset = body + chunk_size + (chunk_size & 1)
+
+        return None
+
+    def _set_info(self, data_offset: int, data_size: int) -> None:
+        format_tag, channels, sample_rate, byte_rate, block_align, bits = self._fmt
+
+        if channels == 0 or sample_rate == 0 or bits == 0:
+            raise WavFormatError('fmt chunk has zero channels, rate or bit depth')
+        if block_align != channels * bits // 8 or byte_rate != sample_rate * block_align:
+            raise WavFormatError('Inconsistent fmt chunk')
+
+        expected = self.expected_format
+        if expected:
+            if format_tag != WAVE_FORMAT_PCM:
+                raise WavFormatError('Only PCM WAV audio is supported')
+            if channels != expected['channels']:
+                raise WavFormatError(f"Expected {expected['channels']} channel(s), got {channels}")
+            if sample_rate != expected['sample_rate']:
+                raise WavFormatError(f"Expected {expected['sample_rate']} Hz, got {sample_rate} Hz")
+            if bits != expected['bit_depth']:
+                raise WavFormatError(f"Expected {expected['bit_depth']}-bit audio, got {bits}-bit")
+
+        # Streaming encoders write 0 or 0xFFFFFFFF when the length is unknown
+        if data_size not in (0, 0xFFFFFFFF):
+            self._remaining = data_size
+
+        self.info = WavInfo(
+            format_tag=format_tag,
+            channels=channels,
+            sample_rate=sample_rate,
+            bits_per_sample=bits,
+            block_align=block_align,
+            data_offset=data_offset,
+            data_size=data_size
+        )
+
+
+def validate_wav(audio_data: bytes, expected_format: Optional[Dict[str, Any]] = None) -> WavInfo:
+    """Validate a complete WAV buffer, raising WavFormatError on failure"""
+    parser = WavStreamParser(expected_format)
+    parser.feed(audio_data)
+    return parser.finish()
@@ -0,0 +1,40 @@
+# audio_compaction.py
+"""
+Compression ratio and throughput of optimize_wav for each output format
+negotiated with clients.
+
+    python -m benchmarks.audio_compaction
+"""
+import time
+
+import numpy as np
+
+from app.voice.audio_processing import WAVE_FORMAT_PCM, build_wav, optimize_wav
+
+
+def main():
+    source_rate = 24000
+    seconds = 10
+    t = np.arange(source_rate * seconds) / source_rate
+    left = 8000 * np.sin(2 * np.pi * 220 * t) + 500 * np.random.randn(len(t))
+    right = 8000 * np.sin(2 * np.pi * 330 * t) + 500 * np.random.randn(len(t))
+    stereo = np.clip(np.stack([left, right], axis=1), -32768, 32767).astype('<i2')
+    source = build_wav(stereo.tobytes(), WAVE_FORMAT_PCM, 2, source_rate, 16, 4)
+
+    print(f"Source: {len(source)} bytes, {seconds}s stereo @ {source_rate} Hz")
+    for rate, encoding in [(None, 'pcm'), (16000, 'pcm'), (8000, 'pcm'),
+                           (16000, 'mulaw'), (8000, 'mulaw'), (16000, 'adpcm'),
+                           (8000, 'adpcm')]:
+        runs = 5
+        started = time.perf_counter()
+        for _ in range(runs):
+            output = optimize_wav(source, target_rate=rate, encoding=encoding)
+        elapsed = (time.perf_counter() - started) / runs
+        print(f"{encoding:>6} @ {rate or source_rate:>5} Hz: "
+              f"{len(output):>8} bytes, ratio {len(source) / len(output):5.1f}x, "
+              f"{len(source) / elapsed / 1e6:7.1f} MB/s, "
+              f"{seconds / elapsed:7.1f}x realtime")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# booking.py
+"""
+Latency of the booking path with injected upstream delays, against the
+old path that wrote to Google inline, then many patients booking one
+slot at once with and without holds.
+
+    python -m benchmarks.booking
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import asyncio
+import time
+import uuid
+
+from app.db import create_database
+from app.patient.appointment_booking import AppointmentBooking
+from app.platform.calendar_outbox import CalendarDispatcher
+from app.platform.slot_holds import SlotHold, SlotHolds
+
+CALENDAR_DELAY = 0.12
+DB_DELAY = 0.04
+ROUNDS = 10
+CONTENDERS = 50
+
+
+class DelayedCalendar:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.events = {}
+        self.reads = 0
+
+    async def check_availability(self, calendar_id, start_time, duration_minutes=30):
+        self.reads += 1
+        await asyncio.sleep(CALENDAR_DELAY)
+        return True
+
+    async def create_event(self, calendar_id, event):
+        await asyncio.sleep(CALENDAR_DELAY)
+        if self.fail:
+            raise RuntimeError('calendar unavailable')
+        self.events[event['id']] = event
+        return event
+
+
+class DelayedDatabase:
+    def __init__(self, database):
+        self.database = database
+        self.transactions = 0
+
+    def __getattr__(self, name):
+        return getattr(self.database, name)
+
+    async def fetch_one(self, query, params=()):
+        await asyncio.sleep(DB_DELAY)
+        return await self.database.fetch_one(query, params)
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.transactions += 1
+        await asyncio.sleep(DB_DELAY)
+        async with self.database.transaction() as tx:
+            yield tx
+
+
+class Unheld(SlotHolds):
+    # Every booker gets the slot, as before holds
+    async def hold(self, doctor_id, slot_time):
+        return SlotHold(doctor_id, slot_time, uuid.uuid4().hex, time.time() + self.ttl)
+
+    async def release(self, hold):
+        return True
+
+
+async def inline(booking, patient_id, doctor_id, slot_time):
+    # The booking path before the outbox: every step in turn, Google write included
+    await booking.calendar_manager.check_availability(doctor_id, slot_time)
+    patient = await booking._get_patient_details(patient_id)
+    event = {'id': uuid.uuid4().hex, 'summary': f'Appointment with {patient.name}'}
+    await booking.calendar_manager.create_event(doctor_id, event)
+    async with booking.db.transaction() as tx:
+        await tx.execute(
+            "INSERT INTO appointments (patient_id, doctor_id, event_id, slot_time) VALUES (%s, %s, %s, %s)",
+            (patient_id, doctor_id, event['id'], slot_time)
+        )
+
+
+async def main():
+    database = create_database('sqlite:///:memory:')
+    await database.connect()
+    await database.execute(
+        "INSERT INTO doctors (id, name, email) VALUES (%s, %s, %s)", ('d1', 'Dr. Lee', 'lee@example.com')
+    )
+    await database.execute(
+        "INSERT INTO patients (id, name, email, phone, date_of_birth) VALUES (%s, %s, %s, %s, %s)",
+        ('p1', 'Ana', 'ana@example.com', '555-0100', datetime(1990, 1, 1))
+    )
+    calendar = DelayedCalendar()
+    booking = AppointmentBooking(calendar, DelayedDatabase(database))
+    slots = [datetime(2030, 1, 7, 9, 0) + timedelta(hours=hour) for hour in range(2 * ROUNDS)]
+
+    print(f"calendar calls {CALENDAR_DELAY * 1000:.0f}ms, database calls {DB_DELAY * 1000:.0f}ms")
+    for name, book, batch in (
+            ('inline', lambda slot: inline(booking, 'p1', 'd1', slot), slots[:ROUNDS]),
+            ('outbox', lambda slot: booking.book_appointment('p1', 'd1', slot), slots[ROUNDS:])):
+        started = time.perf_counter()
+        for slot in batch:
+            await book(slot)
+        elapsed = (time.perf_counter() - started) / ROUNDS
+        print(f"{name:>8}: {elapsed * 1000:.0f}ms per booking")
+
+    dispatcher = CalendarDispatcher(booking.calendar_outbox, lambda: calendar)
+    started = time.perf_counter()
+    applied = await dispatcher.dispatch_once()
+    print(f"dispatcher: {applied} events written in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    # Google down: the booking still commits and the event waits in the outbox
+    failing = AppointmentBooking(DelayedCalendar(fail=True), database, calendar_outbox=booking.calendar_outbox)
+    result = await failing.book_appointment('p1', 'd1', datetime(2030, 2, 1, 9, 0))
+    await CalendarDispatcher(booking.calendar_outbox, lambda: failing.calendar_manager).dispatch_once()
+    status = await booking.calendar_outbox.sync_status(result['appointment_id'])
+    print(f"calendar down: booked={result['success']}, sync={status['sync_status']}, "
+          f"error={status['last_error']!r}")
+
+    # One popular slot, every patient asking for it at the same moment
+    for name, holds in (('unheld', Unheld()), ('held', SlotHolds())):
+        calendar = DelayedCalendar()
+        delayed = DelayedDatabase(database)
+        booking = AppointmentBooking(calendar, delayed, calendar_outbox=booking.calendar_outbox,
+                                     profile_cache=booking.profile_cache, slot_holds=holds)
+        slot = datetime(2030, 3, 1, 9, 0) if name == 'unheld' else datetime(2030, 3, 1, 10, 0)
+        turned_away = []
+
+        async def attempt():
+            started = time.perf_counter()
+            result = await booking.book_appointment('p1', 'd1', slot)
+            if not result['success']:
+                turned_away.append(time.perf_counter() - started)
+            return result['success']
+
+        started = time.perf_counter()
+        booked = sum(await asyncio.gather(*[attempt() for _ in range(CONTENDERS)]))
+        elapsed = time.perf_counter() - started
+        print(f"{name:>8}: {CONTENDERS} bookers, {booked} booked, {calendar.reads} calendar reads, "
+              f"{delayed.transactions} transactions, losers answered in "
+              f"{sum(turned_away) / len(turned_away) * 1000:.0f}ms on average, {elapsed * 1000:.0f}ms overall")
+    await database.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+# metrics.py
+"""
+Overhead of the hot paths.
+
+    python -m benchmarks.metrics
+"""
+import time
+
+from app.platform.metrics import HTTP_REQUEST_DURATION, registry, track_upstream
+
+
+def main():
+    iterations = 200000
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        HTTP_REQUEST_DURATION.observe(0.042, method='GET', route='/patient/slots/{doctor_id}', status='200')
+    elapsed = time.perf_counter() - started
+    print(f"Histogram.observe: {elapsed / iterations * 1e9:.0f} ns/call")
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        with track_upstream('google', 'events.list'):
+            pass
+    elapsed = time.perf_counter() - started
+    print(f"track_upstream:    {elapsed / iterations * 1e9:.0f} ns/call")
+
+    started = time.perf_counter()
+    body = registry.render()
+    print(f"render:            {(time.perf_counter() - started) * 1e3:.2f} ms, {len(body)} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# password_hashing.py
+"""
+Event-loop lag while 100 doctors log in at once, verifying on the loop
+against verifying in the pool.
+
+    python -m benchmarks.password_hashing
+"""
+from typing import Tuple
+import asyncio
+import os
+import time
+
+from app.doctor.passwords import PasswordHasher, verify_password
+
+LOGINS = 100
+TICK = 0.005
+
+
+async def measure_lag(work) -> Tuple[float, float, float]:
+    """Run work while a ticker records how late each of its wakeups is"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - started - TICK)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK)
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await task
+    lags.sort()
+    return elapsed, lags[int(len(lags) * 0.99)], lags[-1]
+
+
+async def main():
+    hasher = PasswordHasher()
+    stored = await hasher.hash('correct horse')
+
+    async def login_on_loop():
+        return verify_password('correct horse', stored)
+
+    async def inline():
+        assert all(await asyncio.gather(*[login_on_loop() for _ in range(LOGINS)]))
+
+    async def pooled():
+        assert all(await asyncio.gather(*[hasher.verify('correct horse', stored) for _ in range(LOGINS)]))
+
+    print(f"{LOGINS} concurrent logins, scrypt n={hasher.n} r={hasher.r} p={hasher.p}, "
+          f"{hasher.workers} worker processes, {os.cpu_count()} CPUs")
+    for name, work in (('on loop', inline), ('pool', pooled)):
+        elapsed, p99, worst = await measure_lag(work)
+        print(f"{name:>8}: {elapsed * 1000:.0f}ms for all logins, "
+              f"loop lag p99 {p99 * 1000:.1f}ms, max {worst * 1000:.1f}ms")
+
+    # Raising the cost: the old hash still verifies and is replaced once
+    stronger = PasswordHasher(n=2 ** 15)
+    valid, upgraded = await stronger.verify_and_upgrade('correct horse', stored)
+    print(f"upgrade to n=2**15: valid={valid}, new hash {upgraded.split('$')[1:4]}, "
+          f"again={stronger.needs_rehash(upgraded)}")
+    hasher.close()
+    stronger.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+# schedule_store.py
+"""
+Memory and range-query time for 10k events of one doctor, as Google
+event dicts scanned the old way against the columnar schedule.
+
+    python -m benchmarks.schedule_store
+"""
+from datetime import datetime, timedelta
+import json
+import random
+import time
+import tracemalloc
+
+from app.platform.schedule_store import DoctorSchedule
+
+
+def main():
+    EVENTS = 10000
+    QUERIES = 200
+
+    def google_events():
+        first = datetime(2030, 1, 7, 9, 0)
+        events = []
+        for number in range(EVENTS):
+            # Sixteen half-hour appointments a day, patients seen repeatedly
+            start = first + timedelta(days=number // 16, minutes=30 * (number % 16))
+            patient = random.randrange(800)
+            events.append({
+                'id': f'{number:032x}',
+                'status': random.choice(('confirmed', 'confirmed', 'confirmed', 'cancelled')),
+                'summary': f'Appointment with Patient {patient}',
+                'start': {'dateTime': start.isoformat(), 'timeZone': 'UTC'},
+                'end': {'dateTime': (start + timedelta(minutes=30)).isoformat(), 'timeZone': 'UTC'},
+                'extendedProperties': {'private': {'patient_id': f'patient-{patient}'}}
+            })
+        # A round trip through JSON, as the events arrive from the API
+        return json.dumps(events)
+
+    def scan_dicts(events, start, end):
+        # The previous approach: parse every event's times on every query
+        found = []
+        for event in events:
+            event_start = datetime.fromisoformat(event['start']['dateTime'].rstrip('Z'))
+            event_end = datetime.fromisoformat(event['end']['dateTime'].rstrip('Z'))
+            if event_start < end and event_end > start:
+                found.append({
+                    'id': event['id'],
+                    'patient_name': event['summary'].replace('Appointment with ', ''),
+                    'start_time': event['start']['dateTime'],
+                    'end_time': event['end']['dateTime'],
+                    'status': event.get('status', 'confirmed')
+                })
+        return found
+
+    def allocated(build):
+        tracemalloc.start()
+        value = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return value, size
+
+    def timed(query, windows):
+        started = time.perf_counter()
+        results = [query(start, end) for start, end in windows]
+        return results, (time.perf_counter() - started) / len(windows)
+
+    random.seed(7)
+    payload = google_events()
+    events, dict_bytes = allocated(lambda: json.loads(payload))
+    schedule, column_bytes = allocated(lambda: DoctorSchedule.from_events('d1', json.loads(payload)))
+    print(f"{EVENTS} events: dicts {dict_bytes / 1024:,.0f} KiB, "
+          f"columns {column_bytes / 1024:,.0f} KiB ({dict_bytes / column_bytes:.1f}x smaller)")
+
+    last_day = datetime.fromisoformat(events[-1]['start']['dateTime'])
+    windows = []
+    for _ in range(QUERIES):
+        start = datetime(2030, 1, 7) + timedelta(days=random.randrange((last_day - datetime(2030, 1, 7)).days))
+        windows.append((start, start + timedelta(days=1)))
+
+    scanned, dict_time = timed(lambda start, end: scan_dicts(events, start, end), windows)
+    searched, column_time = timed(lambda start, end: schedule.to_dicts(schedule.between(start, end)), windows)
+    assert [[e['id'] for e in day] for day in scanned] == [[e['id'] for e in day] for day in searched]
+    print(f"one-day range, to API dicts: scan {dict_time * 1e6:,.0f}us, "
+          f"binary search {column_time * 1e6:,.0f}us ({dict_time / column_time:,.0f}x faster)")
+
+    slot = windows[0][0] + timedelta(hours=10)
+    _, busy_time = timed(lambda start, end: schedule.is_busy(start, end),
+                         [(slot, slot + timedelta(minutes=30))] * QUERIES)
+    print(f"is one slot busy: {busy_time * 1e6:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# structured_logging.py
+"""
+Time spent in the log call on the caller's thread when the sink is slow
+to accept writes (e.g. a container log pipe under pressure).
+
+    python -m benchmarks.structured_logging
+"""
+import atexit
+import io
+import logging
+import time
+
+from app.platform.structured_logging import JsonFormatter, setup_logging
+
+
+def main():
+    class SlowStream(io.StringIO):
+        def write(self, text):
+            time.sleep(0.00005)
+            return super().write(text)
+
+    iterations = 20000
+    extra = {'route': '/test', 'status': 200, 'duration_ms': 1.2}
+    logger = logging.getLogger('bench')
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+
+    stream = logging.StreamHandler(SlowStream())
+    stream.setFormatter(JsonFormatter())
+    root.addHandler(stream)
+    started = time.perf_counter()
+    for i in range(iterations):
+        logger.info('request', extra=extra)
+    sync_cost = (time.perf_counter() - started) / iterations
+    root.removeHandler(stream)
+
+    listener = setup_logging(queue_size=iterations)
+    listener.handlers[0].setStream(SlowStream())
+    started = time.perf_counter()
+    for i in range(iterations):
+        logger.info('request', extra=extra)
+    queued_cost = (time.perf_counter() - started) / iterations
+    listener.stop()
+    atexit.unregister(listener.stop)
+
+    print(f"synchronous JSON handler: {sync_cost * 1e6:.1f} us/call")
+    print(f"queued handler:           {queued_cost * 1e6:.1f} us/call")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# token_auth.py
+"""
+Requests/sec on an authenticated endpoint, verifying the token and
+loading the doctor on every request against claims plus the cache.
+
+    python -m benchmarks.token_auth
+"""
+import asyncio
+import time
+
+import httpx
+import jwt
+from fastapi import Depends, FastAPI, HTTPException, Request
+
+from app.db import create_database
+from app.db.records import Doctor, DOCTOR_COLUMNS
+from app.doctor.token_auth import TokenDenyList, TokenVerifier
+
+SECRET = 'benchmark-secret-of-at-least-32-bytes'
+REQUESTS = 2000
+CONCURRENCY = 50
+
+
+async def main():
+    database = create_database('sqlite:///:memory:')
+    await database.connect()
+    await database.execute(
+        "INSERT INTO doctors (id, name, email) VALUES (%s, %s, %s)", ('d1', 'Dr. Lee', 'lee@example.com')
+    )
+    deny_list = TokenDenyList(database)
+    await deny_list.sync()
+    verifier = TokenVerifier(SECRET, deny_list)
+    token = verifier.issue('d1', 'lee@example.com', 'Dr. Lee')
+
+    async def doctor_from_database(request: Request):
+        # The previous path: decode every time, then read the doctor row
+        try:
+            claims = jwt.decode(request.headers['authorization'][7:], SECRET, algorithms=['HS256'])
+        except jwt.PyJWTError:
+            raise HTTPException(status_code=401)
+        row = await database.fetch_one(
+            f"SELECT {DOCTOR_COLUMNS} FROM doctors WHERE id = %s", (claims['doctor_id'],)
+        )
+        if row is None:
+            raise HTTPException(status_code=401)
+        return Doctor.from_row(row).id
+
+    def doctor_from_claims(request: Request):
+        identity = verifier.verify_header(request.headers.get('authorization'))
+        if identity is None:
+            raise HTTPException(status_code=401)
+        return identity.doctor_id
+
+    app = FastAPI()
+
+    @app.get('/before')
+    async def before(doctor_id: str = Depends(doctor_from_database)):
+        return {'doctor_id': doctor_id}
+
+    @app.get('/after')
+    async def after(doctor_id: str = Depends(doctor_from_claims)):
+        return {'doctor_id': doctor_id}
+
+    headers = {'Authorization': f'Bearer {token}'}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url='http://bench') as client:
+        for path in ('/before', '/after'):
+            remaining = iter(range(REQUESTS))
+
+            async def worker():
+                for _ in remaining:
+                    response = await client.get(path, headers=headers)
+                    assert response.status_code == 200
+
+            started = time.perf_counter()
+            await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+            elapsed = time.perf_counter() - started
+            print(f"{path:>8}: {REQUESTS / elapsed:,.0f} requests/sec")
+
+    identity = verifier.verify(token)
+    await deny_list.revoke(identity.jti, identity.doctor_id, identity.expires_at)
+    print(f"after revocation: {verifier.verify(token)}")
+    await database.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
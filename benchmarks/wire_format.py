@@ -0,0 +1,46 @@
+# wire_format.py
+"""
+Encode/decode cost and size of a typical schedule push and reply.
+
+    python -m benchmarks.wire_format
+"""
+import json
+import time
+
+from app.platform.wire_format import JsonCodec, MsgpackCodec
+
+
+def main():
+    payloads = {
+        'schedule_delta': {'type': 'schedule_delta', 'doctor_id': 'dr-42', 'seq': 1832,
+                           'op': 'move', 'id': 'evt_8f2a9c1d', 'start': '2026-10-20T09:30:00',
+                           'end': '2026-10-20T10:00:00', 'status': 'confirmed'},
+        'response': {'type': 'response', 'turn_id': 17, 'trace_id': 'a' * 32,
+                     'text': 'Your appointment with Dr. Smith is confirmed for Tuesday at 9:30.',
+                     'timings': {'turn': 812.4, 'llm': 640.2, 'calendar.events.list': 120.7}}
+    }
+    iterations = 50000
+
+    class StdlibJson:
+        encode = staticmethod(json.dumps)
+        decode = staticmethod(json.loads)
+
+    stdlib = StdlibJson()
+
+    for label, payload in payloads.items():
+        print(label)
+        for name, codec in (('json (stdlib)', stdlib), ('json', JsonCodec()), ('msgpack', MsgpackCodec())):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                frame = codec.encode(payload)
+            encode = (time.perf_counter() - started) / iterations
+            started = time.perf_counter()
+            for _ in range(iterations):
+                codec.decode(frame)
+            decode = (time.perf_counter() - started) / iterations
+            size = len(frame.encode() if isinstance(frame, str) else frame)
+            print(f"  {name:<14} {size:>4} bytes  encode {encode * 1e6:5.2f} us  decode {decode * 1e6:5.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,9 @@ class Config:
     DATABASE_URL = os.getenv("DATABASE_URL")
     DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
     DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", 5))  # seconds per query
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # seconds to wait for a connection
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))  # per connection
     
     # Security Configuration
     SECRET_KEY = os.getenv("SECRET_KEY")
@@ -48,11 +51,80 @@ class Config:
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     LOG_FILE = "app.log"
+    LOG_JSON = os.getenv("LOG_JSON", "True").lower() == "true"
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # records buffered before dropping
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))  # share of successful requests logged
+    LOG_ROUTE_SAMPLE_RATES = os.getenv("LOG_ROUTE_SAMPLE_RATES", "/test=0,/metrics=0")  # route=rate,...
+    LOG_SLOW_REQUEST_SECONDS = float(os.getenv("LOG_SLOW_REQUEST_SECONDS", 1.0))  # always logged
+    LOG_ERROR_BURST = int(os.getenv("LOG_ERROR_BURST", 5))  # identical errors per interval
+    LOG_ERROR_INTERVAL = int(os.getenv("LOG_ERROR_INTERVAL", 60))  # seconds
+    LOG_PAYLOADS = os.getenv("LOG_PAYLOADS", "False").lower() == "true"  # full WebSocket bodies
     
     # Session Configuration
     SESSION_TIMEOUT = int(os.getenv("SESSION_TIMEOUT", 3600))  # 1 hour
     MAX_SESSION_SIZE = int(os.getenv("MAX_SESSION_SIZE", 1000))
     
+    # Shared State Configuration (redis://host:port/db, unset for in-process)
+    STATE_BACKEND_URL = os.getenv("STATE_BACKEND_URL")
+    STATE_BACKEND_POOL_SIZE = int(os.getenv("STATE_BACKEND_POOL_SIZE", 4))  # Redis connections per worker
+    CONNECTION_PRESENCE_TTL = int(os.getenv("CONNECTION_PRESENCE_TTL", 60))  # seconds
+    
+    # WebSocket Configuration
+    WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", 8))  # queued messages per connection
+    
+    # Admission Control Configuration (per client token buckets and load shedding)
+    ADMISSION_RATE = float(os.getenv("ADMISSION_RATE", 5))  # requests per second per client
+    ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", 20))
+    ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", 10000))  # buckets kept per worker
+    SHED_LAG_BOOKING = float(os.getenv("SHED_LAG_BOOKING", 1.0))  # event loop lag in seconds
+    SHED_LAG_BROWSE = float(os.getenv("SHED_LAG_BROWSE", 0.25))
+    SHED_LAG_CHAT = float(os.getenv("SHED_LAG_CHAT", 0.1))
+    
+    # Read Caching Configuration (doctor schedule and slot endpoints)
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 5))  # seconds
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1024))  # entries per worker
+    SCHEDULE_ETAG_MAX_AGE = int(os.getenv("SCHEDULE_ETAG_MAX_AGE", 300))  # seconds, catches external calendar edits
+    
+    # Calendar Sync Configuration (outbox dispatcher writing appointments to Google Calendar)
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 50))  # entries claimed per round
+    OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", 8))  # calendar calls in flight
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+    OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", 2))  # seconds, doubled per attempt
+    OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", 300))  # seconds
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 5))  # seconds, for other workers' entries
+    OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", 120))  # before a claimed entry is retried
+    
+    # Token Verification Configuration
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))  # verified JWTs kept per worker
+    DENY_LIST_SYNC_INTERVAL = float(os.getenv("DENY_LIST_SYNC_INTERVAL", 30))  # seconds between revocation reloads
+    
+    # Password Hashing Configuration (scrypt, in worker processes)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))  # processes per app worker
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))  # calls queued beyond that wait
+    PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", 2 ** 14))  # raising these rehashes passwords on login
+    PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", 8))
+    PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", 1))
+    
+    # Record Cache Configuration (doctor and patient rows, per worker)
+    PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", 300))  # seconds
+    PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 10000))  # records of each kind
+    
+    # Slot Hold Configuration
+    SLOT_HOLD_TTL = float(os.getenv("SLOT_HOLD_TTL", 120))  # seconds a patient can hold a slot before booking
+    
+    # Appointment History Configuration
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", 100))  # rows per page, whatever the client asks
+    
+    # Bulk Booking Configuration
+    BULK_BOOKING_MAX_ITEMS = int(os.getenv("BULK_BOOKING_MAX_ITEMS", 100))  # appointments per request or series
+    
+    # Tracing Configuration
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")  # JSON-lines file, unset to disable
+    TRACE_TIMINGS = os.getenv("TRACE_TIMINGS", "False").lower() == "true"  # stage timings in replies
+    
+    # Startup Configuration (build AI, calendar and voice clients in the background at boot)
+    WARMUP_COMPONENTS = os.getenv("WARMUP_COMPONENTS", "True").lower() == "true"
+    
     @classmethod
     def get_all_settings(cls) -> Dict[str, Any]:
         """Get all configuration settings as a dictionary"""
@@ -1,5 +1,8 @@
 
 # deepgram_config.py
+import os
+from typing import Dict, Any
+
 class DeepgramConfig:
     # API Configuration
     API_KEY = os.getenv("DEEPGRAM_API_KEY")
@@ -52,8 +55,14 @@ class DeepgramConfig:
     # Error Handling
     MAX_RETRIES = 3
     RETRY_DELAY = 1  # seconds
+    MAX_RETRY_DELAY = 8  # seconds
     TIMEOUT = 30     # seconds
     
+    # Shared transport
+    MAX_CONCURRENCY = int(os.getenv("DEEPGRAM_MAX_CONCURRENCY", 16))
+    # Calls one request may have in flight, so a long upload cannot take every slot
+    MAX_FANOUT = int(os.getenv("DEEPGRAM_MAX_FANOUT", 4))
+    
     @classmethod
     def get_stt_config(cls, **kwargs) -> Dict[str, Any]:
         """Get STT configuration with optional overrides"""
@@ -1,59 +1,451 @@
 # main.py
+import time
+PROCESS_STARTED = time.perf_counter()
+
 import os
+import sys
+import socket
 import asyncio
 import logging
-from fastapi import FastAPI, WebSocket, HTTPException
+import functools
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, WebSocket, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import uvicorn
 from datetime import datetime
 import json
 from fastapi import WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, JSONResponse
+
+from config.config import Config
+
+# Lightweight components only; AI, Google and Deepgram SDKs are imported
+# on first use inside AppointmentSystem so worker boot stays fast
+from app.doctor.schedule_notifier import ScheduleNotifier
+from app.platform.turn_manager import TurnManager
+from app.platform.client_connection import ClientConnection
+from app.platform.state_backend import create_state_backend
+from app.db import create_database
+from app.platform.calendar_outbox import CalendarOutbox, CalendarDispatcher
+from app.platform.record_cache import ProfileCache
+from app.platform.slot_holds import SlotHolds
+from app.platform import metrics
+from app.platform.tracing import tracer, JsonLinesExporter
+from app.platform.structured_logging import setup_logging, RequestLogSampler
+from app.platform.response_cache import ResponseCache
+from app.platform.admission import AdmissionController, Priority
+from app.doctor.token_auth import DoctorIdentity, TokenDenyList, TokenVerifier
+from app.doctor.passwords import PasswordHasher
+from app.platform.wire_format import negotiate, send_frame, receive_frame, WireFormatError
+
+# Configure logging: records are queued and written by a background thread
+setup_logging(
+    level=Config.LOG_LEVEL,
+    json_format=Config.LOG_JSON,
+    queue_size=Config.LOG_QUEUE_SIZE,
+    error_burst=Config.LOG_ERROR_BURST,
+    error_interval=Config.LOG_ERROR_INTERVAL,
+    log_format=Config.LOG_FORMAT
+)
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('access')
 
-# Import AI Core components
-from app.ai_core.llama_engine import LlamaEngine
-from app.ai_core.calendar_manager import CalendarManager
-from app.ai_core.appointment_manager import AppointmentManager
-from app.ai_core.response_generator import ResponseGenerator
+# Which successful requests get an access log line
+request_sampler = RequestLogSampler(
+    Config.LOG_SAMPLE_RATE,
+    RequestLogSampler.parse_rates(Config.LOG_ROUTE_SAMPLE_RATES),
+    Config.LOG_SLOW_REQUEST_SECONDS
+)
 
+# Get the absolute path
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "app", "static")
 
-# Import Doctor components
-from app.doctor.login import DoctorAuth
-from app.doctor.calendar_view import DoctorCalendarView
-from app.doctor.schedule_manager import DoctorScheduleManager
+# WebSockets held by this worker; presence for all workers lives in the state backend
+active_connections: Dict[str, ClientConnection] = {}
+
+# Identifies this worker for connection routing
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# In-flight conversational turn per client, used for barge-in
+turn_manager = TurnManager()
+metrics.ACTIVE_CONNECTIONS.callback = lambda: len(active_connections)
+
+# Per client rate limits and priority-based load shedding
+admission = AdmissionController(
+    Config.ADMISSION_RATE,
+    Config.ADMISSION_BURST,
+    Config.ADMISSION_MAX_CLIENTS,
+    {
+        Priority.BOOKING: Config.SHED_LAG_BOOKING,
+        Priority.BROWSE: Config.SHED_LAG_BROWSE,
+        Priority.CHAT: Config.SHED_LAG_CHAT
+    }
+)
+metrics.EVENT_LOOP_LAG.callback = lambda: admission.lag_monitor.lag
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+
+# Serialized schedule and slot responses, dropped when the doctor's calendar changes
+response_cache = ResponseCache(
+    Config.RESPONSE_CACHE_TTL,
+    Config.RESPONSE_CACHE_SIZE,
+    Config.SCHEDULE_ETAG_MAX_AGE
+)
 
-# Import Patient components
-from app.patient.appointment_booking import AppointmentBooking
-from app.patient.appointment_reschedule import AppointmentReschedule
-from app.patient.appointment_cancel import AppointmentCancel
 
-# Import Platform components
-from app.platform.user_interaction import UserInteraction
-from app.platform.voice_input_handler import VoiceInputHandler
+def component(build):
+    """Build a component lazily on first access and record how long it took"""
+    @functools.wraps(build)
+    def wrapper(self):
+        started = time.perf_counter()
+        value = build(self)
+        self.startup_timings[build.__name__] = time.perf_counter() - started
+        return value
+    return functools.cached_property(wrapper)
 
-# Import Voice components
-from app.voice.stt_service import STTService
-from app.voice.tts_service import TTSService
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+class AppointmentSystem:
+    """
+    Wires the application's components together.
+    
+    Components are constructed on first use, so importing this module does
+    not touch Google, Groq or Deepgram. `warm_up` builds them ahead of time.
+    """
+    
+    # Components with expensive constructors and no dependencies on each other
+    HEAVY_COMPONENTS = ['calendar_manager', 'llama_engine', 'deepgram_transport', 'doctor_auth']
+    
+    def __init__(self):
+        # Pooled database, SQLite unless DATABASE_URL points at Postgres
+        self.db_connection = create_database(
+            Config.DATABASE_URL,
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            query_timeout=Config.DB_QUERY_TIMEOUT,
+            pool_timeout=Config.DB_POOL_TIMEOUT,
+            statement_cache_size=Config.DB_STATEMENT_CACHE_SIZE
+        )
+        
+        # Doctor JWTs are verified from their claims, with revocations synced from the database
+        self.token_verifier = TokenVerifier(
+            JWT_SECRET_KEY,
+            TokenDenyList(self.db_connection, Config.DENY_LIST_SYNC_INTERVAL),
+            cache_size=Config.TOKEN_CACHE_SIZE,
+            lifetime_hours=Config.JWT_EXPIRATION_HOURS
+        )
+        
+        # Password hashing runs in its own processes, off the event loop
+        self.password_hasher = PasswordHasher(
+            Config.PASSWORD_HASH_WORKERS,
+            n=Config.PASSWORD_SCRYPT_N,
+            r=Config.PASSWORD_SCRYPT_R,
+            p=Config.PASSWORD_SCRYPT_P,
+            max_pending=Config.PASSWORD_HASH_MAX_PENDING
+        )
+        
+        # Shared state so sessions and presence survive across workers
+        self.state_backend = create_state_backend(Config.STATE_BACKEND_URL, Config.STATE_BACKEND_POOL_SIZE)
+        
+        # Doctor and patient rows, dropped on every worker when one of them is written
+        self.profile_cache = ProfileCache(
+            self.db_connection, Config.PROFILE_CACHE_TTL, Config.PROFILE_CACHE_SIZE,
+            state_backend=self.state_backend
+        )
+        
+        # Calendar writes are committed with each appointment change and
+        # applied to Google in the background
+        self.calendar_outbox = CalendarOutbox(self.db_connection)
+        self.calendar_dispatcher = CalendarDispatcher(
+            self.calendar_outbox,
+            lambda: self.calendar_manager,
+            batch_size=Config.OUTBOX_BATCH_SIZE,
+            concurrency=Config.OUTBOX_CONCURRENCY,
+            max_attempts=Config.OUTBOX_MAX_ATTEMPTS,
+            retry_base=Config.OUTBOX_RETRY_BASE,
+            retry_max=Config.OUTBOX_RETRY_MAX,
+            poll_interval=Config.OUTBOX_POLL_INTERVAL,
+            lease=Config.OUTBOX_LEASE_SECONDS
+        )
+        
+        self.schedule_notifier = ScheduleNotifier(self.state_backend)
+        self.schedule_notifier.add_change_listener(response_cache.invalidate)
+        # Schedule and slot reads come from Google, which changes when the outbox is applied
+        self.calendar_dispatcher.add_applied_listener(
+            lambda doctor_id: self.schedule_notifier.notify(doctor_id, 'synced')
+        )
+        
+        # Short-lived claims on slots being booked, shared by all workers
+        self.slot_holds = SlotHolds(self.state_backend, Config.SLOT_HOLD_TTL)
+        
+        # Seconds spent building each component (inclusive of its dependencies)
+        self.startup_timings: Dict[str, float] = {}
+    
+    # Core components
+    @component
+    def llama_engine(self):
+        from app.ai_core.llama_engine import LlamaEngine
+        return LlamaEngine()
+    
+    @component
+    def calendar_manager(self):
+        from app.ai_core.calendar_manager import CalendarManager
+        return CalendarManager()
+    
+    @component
+    def appointment_manager(self):
+        from app.ai_core.appointment_manager import AppointmentManager
+        return AppointmentManager(self.llama_engine, self.calendar_manager)
+    
+    @component
+    def response_generator(self):
+        from app.ai_core.response_generator import ResponseGenerator
+        return ResponseGenerator()
+    
+    # Doctor components
+    @component
+    def doctor_auth(self):
+        from app.doctor.login import DoctorAuth
+        return DoctorAuth(
+            self.db_connection, self.profile_cache, self.token_verifier, self.password_hasher
+        )
+    
+    @component
+    def doctor_calendar(self):
+        from app.doctor.calendar_view import DoctorCalendarView
+        return DoctorCalendarView(self.calendar_manager)
+    
+    @component
+    def doctor_schedule(self):
+        from app.doctor.schedule_manager import DoctorScheduleManager
+        return DoctorScheduleManager(
+            self.calendar_manager, self.db_connection, self.profile_cache,
+            self.schedule_notifier
+        )
+    
+    # Patient components
+    @component
+    def appointment_booking(self):
+        from app.patient.appointment_booking import AppointmentBooking
+        return AppointmentBooking(
+            self.calendar_manager, self.db_connection, self.schedule_notifier,
+            self.calendar_outbox, self.profile_cache, self.slot_holds
+        )
+    
+    @component
+    def bulk_booking(self):
+        from app.patient.bulk_booking import BulkBooking
+        return BulkBooking(
+            self.calendar_manager, self.db_connection, self.schedule_notifier,
+            self.calendar_outbox, max_items=Config.BULK_BOOKING_MAX_ITEMS,
+            slot_holds=self.slot_holds
+        )
+    
+    @component
+    def appointment_reschedule(self):
+        from app.patient.appointment_reschedule import AppointmentReschedule
+        return AppointmentReschedule(
+            self.calendar_manager, self.db_connection, self.schedule_notifier,
+            self.calendar_outbox, self.profile_cache
+        )
+    
+    @component
+    def appointment_history(self):
+        from app.patient.appointment_history import AppointmentHistory
+        return AppointmentHistory(self.db_connection, Config.HISTORY_MAX_PAGE_SIZE)
+    
+    @component
+    def appointment_cancel(self):
+        from app.patient.appointment_cancel import AppointmentCancel
+        return AppointmentCancel(
+            self.calendar_manager, self.db_connection, self.schedule_notifier,
+            self.calendar_outbox, self.profile_cache
+        )
+    
+    # Voice components, all on one shared Deepgram transport
+    @component
+    def deepgram_transport(self):
+        from app.voice.deepgram_transport import DeepgramTransport
+        return DeepgramTransport()
+    
+    @component
+    def stt_service(self):
+        from app.voice.stt_service import STTService
+        return STTService(self.deepgram_transport)
+    
+    @component
+    def tts_service(self):
+        from app.voice.tts_service import TTSService
+        return TTSService(self.deepgram_transport)
+    
+    @component
+    def voice_handler(self):
+        from app.platform.voice_input_handler import VoiceInputHandler
+        return VoiceInputHandler(self.deepgram_transport)
+    
+    # Platform components
+    @component
+    def user_interaction(self):
+        from app.platform.user_interaction import UserInteraction
+        return UserInteraction(
+            self.llama_engine,
+            self.voice_handler,
+            self.response_generator,
+            self.state_backend
+        )
+    
+    @classmethod
+    def component_names(cls) -> List[str]:
+        return [name for name, value in vars(cls).items()
+                if isinstance(value, functools.cached_property)]
+    
+    async def warm_up(self, names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Build components ahead of first use.
+        
+        Heavy, independent components are built concurrently in threads;
+        the cheap ones that depend on them follow in order. Failures are reported
+        rather than raised so an offline worker still starts.
+        """
+        names = names or self.component_names()
+        heavy = [name for name in self.HEAVY_COMPONENTS if name in names]
+        rest = [name for name in names if name not in heavy]
+        
+        errors = {}
+        results = await asyncio.gather(
+            *[asyncio.to_thread(getattr, self, name) for name in heavy],
+            return_exceptions=True
+        )
+        for name, result in zip(heavy, results):
+            if isinstance(result, Exception):
+                errors[name] = str(result)
+        
+        # The rest share dependencies, build them one at a time
+        for name in rest:
+            try:
+                getattr(self, name)
+            except Exception as e:
+                errors[name] = str(e)
+        return errors
+
+
+system = AppointmentSystem()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup
+    logger.info("Starting AI Appointment Management System")
+    logger.info(f"Index.html exists: {os.path.exists(os.path.join(STATIC_DIR, 'index.html'))}")
+    if Config.TRACE_EXPORT_PATH:
+        tracer.add_exporter(JsonLinesExporter(Config.TRACE_EXPORT_PATH))
+    await system.db_connection.connect()
+    system.calendar_dispatcher.start()
+    await system.token_verifier.deny_list.start()
+    await system.state_backend.subscribe(f"worker:{WORKER_ID}", deliver_worker_message)
+    await system.schedule_notifier.start()
+    await system.profile_cache.start()
+    presence_task = asyncio.create_task(refresh_presence())
+    admission.lag_monitor.start()
+    
+    # Warm components in the background so the worker accepts traffic immediately
+    warmup_task = None
+    if Config.WARMUP_COMPONENTS:
+        warmup_task = asyncio.create_task(warm_up_components())
+    yield
+    # Shutdown
+    logger.info("Shutting down AI Appointment Management System")
+    presence_task.cancel()
+    admission.lag_monitor.stop()
+    if warmup_task:
+        warmup_task.cancel()
+    await system.calendar_dispatcher.stop()
+    await system.token_verifier.deny_list.stop()
+    system.password_hasher.close()
+    if 'deepgram_transport' in vars(system):
+        await system.deepgram_transport.close()
+    await system.state_backend.close()
+    await system.db_connection.close()
+    tracer.close()
+
+
+async def warm_up_components():
+    errors = await system.warm_up()
+    for name, error in errors.items():
+        logger.warning(f"Could not warm up {name}: {error}")
+    timings = ', '.join(f"{name}={seconds * 1000:.0f}ms"
+                        for name, seconds in sorted(system.startup_timings.items()))
+    logger.info(f"Component warm-up finished: {timings}")
 
 
 # Initialize FastAPI app with your configurations
 app = FastAPI(
     title="AI Appointment Management System",
     description="AI-powered system for managing medical appointments",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+def request_priority(method: str, path: str) -> Optional[Priority]:
+    """Admission class of an HTTP request, None for requests that are never limited"""
+    if path.startswith('/patient/appointment') or path == '/doctor/login':
+        return Priority.BOOKING
+    if path.startswith('/doctor/') and method != 'GET':
+        return Priority.BOOKING
+    if path.startswith('/patient/slots') or path.startswith('/doctor/'):
+        return Priority.BROWSE
+    if path.startswith('/voice/'):
+        return Priority.CHAT
+    return None
+
+def reject(decision, priority: Priority) -> None:
+    metrics.ADMISSION_REJECTIONS.inc(priority=priority.name.lower(), reason=decision.reason)
+
+# Registered before log_requests, so it runs inside it: refused requests cost
+# little but still reach the access log and request metrics. CORS, added
+# last, wraps both so a 429 still carries CORS headers.
+@app.middleware("http")
+async def admission_control(request, call_next):
+    priority = request_priority(request.method, request.url.path)
+    if priority is None:
+        return await call_next(request)
+    
+    # Only a verified token picks the bucket; a forged one counts against the address
+    identity = system.token_verifier.verify_header(request.headers.get('authorization'))
+    client = identity.doctor_id if identity else (request.client.host if request.client else 'unknown')
+    decision = admission.admit(client, priority)
+    if not decision.admitted:
+        reject(decision, priority)
+        return JSONResponse(
+            status_code=429,
+            content={'success': False, 'message': 'Server busy, please retry shortly'},
+            headers={'Retry-After': str(max(1, round(decision.retry_after)))}
+        )
+    return await call_next(request)
+
 @app.middleware("http")
 async def log_requests(request, call_next):
-    logger.info(f"Request: {request.method} {request.url}")
-    response = await call_next(request)
-    logger.info(f"Response: {response.status_code}")
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # Label by route template, not the raw path, to keep series bounded
+        duration = time.perf_counter() - started
+        route = getattr(request.scope.get('route'), 'path', 'unmatched')
+        metrics.HTTP_REQUEST_DURATION.observe(
+            duration, method=request.method, route=route, status=status
+        )
+        if request_sampler.should_log(route, status, duration):
+            access_logger.info('request', extra={
+                'method': request.method,
+                'path': request.url.path,
+                'route': route,
+                'status': status,
+                'duration_ms': round(duration * 1000, 1)
+            })
     return response
 
 # Add CORS middleware
@@ -65,15 +457,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Get the absolute path
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-STATIC_DIR = os.path.join(BASE_DIR, "app", "static")
-
-# Add debug logging
-logger.info(f"Base Directory: {BASE_DIR}")
-logger.info(f"Static Directory: {STATIC_DIR}")
-logger.info(f"Index path: {os.path.join(STATIC_DIR, 'index.html')}")
-
 # Mount static files
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
@@ -93,156 +476,231 @@ async def read_root():
 async def test():
     return {"message": "API is working"}
 
-# Add startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Starting AI Appointment Management System")
-    # Log if index.html exists
-    index_path = os.path.join(STATIC_DIR, "index.html")
-    logger.info(f"Index.html exists: {os.path.exists(index_path)}")
-
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-# Global state for active connections
-active_connections: Dict[str, WebSocket] = {}
-
-class AppointmentSystem:
-    def __init__(self):
-        # Initialize database connection (placeholder)
-        self.db_connection = None
-        
-        # Initialize core components
-        self.llama_engine = LlamaEngine()
-        self.calendar_manager = CalendarManager()
-        self.appointment_manager = AppointmentManager(self.llama_engine, self.calendar_manager)
-        self.response_generator = ResponseGenerator()
-        
-        # Initialize doctor components
-        self.doctor_auth = DoctorAuth(self.db_connection)
-        self.doctor_calendar = DoctorCalendarView(self.calendar_manager)
-        self.doctor_schedule = DoctorScheduleManager(self.calendar_manager, self.db_connection)
-        
-        # Initialize patient components
-        self.appointment_booking = AppointmentBooking(self.calendar_manager, self.db_connection)
-        self.appointment_reschedule = AppointmentReschedule(self.calendar_manager, self.db_connection)
-        self.appointment_cancel = AppointmentCancel(self.calendar_manager, self.db_connection)
-        
-        # Initialize voice components
-        self.stt_service = STTService()
-        self.tts_service = TTSService()
-        self.voice_handler = VoiceInputHandler()
-        
-        # Initialize platform components
-        self.user_interaction = UserInteraction(
-            self.llama_engine,
-            self.voice_handler,
-            self.response_generator
-        )
-
-system = AppointmentSystem()
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint for this worker"""
+    try:
+        metrics.ACTIVE_SESSIONS.set(await system.state_backend.session_count())
+    except Exception as e:
+        logger.error(f"Error counting sessions: {str(e)}")
+    return Response(metrics.registry.render(), media_type=metrics.MetricsRegistry.CONTENT_TYPE)
 
 # WebSocket endpoint for real-time communication
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
+    # Clients opt into MessagePack with the "msgpack" subprotocol, JSON otherwise
+    codec, subprotocol = negotiate(websocket.scope.get('subprotocols', []))
+    connection = ClientConnection(
+        websocket,
+        client_id,
+        handle_websocket_message,
+        turn_manager,
+        Config.WS_QUEUE_SIZE,
+        codec
+    )
     try:
-        await websocket.accept()
-        active_connections[client_id] = websocket
+        await websocket.accept(subprotocol=subprotocol)
+        active_connections[client_id] = connection
+        await system.state_backend.register_connection(
+            client_id, WORKER_ID, Config.CONNECTION_PRESENCE_TTL
+        )
         
         # Send connection confirmation
-        await websocket.send_json({
+        await connection.send({
             "type": "connection_established",
             "client_id": client_id
         })
         
-        while True:
-            try:
-                # Accept both text and json messages
-                message = await websocket.receive_text()
-                
-                # Parse the message
-                try:
-                    data = json.loads(message)
-                except json.JSONDecodeError:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Invalid JSON format"
-                    })
-                    continue
-                
-                # Process the message
-                await handle_websocket_message(websocket, client_id, message)
-                
-            except WebSocketDisconnect:
-                logger.info(f"Client {client_id} disconnected")
-                break
-            except Exception as e:
-                logger.error(f"Error processing message: {str(e)}")
-                await websocket.send_json({
-                    "type": "error",
-                    "message": str(e)
-                })
-                
+        await connection.run()
+        
+    except WebSocketDisconnect:
+        logger.info(f"Client {client_id} disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
     finally:
-        if client_id in active_connections:
+        if active_connections.get(client_id) is connection:
             del active_connections[client_id]
+            await system.state_backend.unregister_connection(client_id, WORKER_ID)
         logger.info(f"Connection closed for client {client_id}")
 
 
-async def handle_websocket_message(websocket: WebSocket, client_id: str, message: str):
-    """Handle incoming WebSocket messages"""
-    logger.debug(f"Received message from client {client_id}: {message}")
-    try:
-        data = json.loads(message)
-        message_type = data.get('type')
-        
-        if not message_type:
-            await websocket.send_json({
-                'type': 'error',
-                'message': 'Message type is required'
+async def handle_websocket_message(connection: ClientConnection, data: Dict[str, Any]):
+    """Handle a parsed, non-control WebSocket message in arrival order"""
+    message_type = data['type']
+    if Config.LOG_PAYLOADS:
+        logger.debug('ws_message', extra={'client_id': connection.client_id, 'payload': data})
+    
+    if message_type == 'transcription':
+        decision = admission.admit(connection.client_id, Priority.CHAT)
+        if not decision.admitted:
+            reject(decision, Priority.CHAT)
+            await connection.send({
+                'type': 'busy',
+                'turn_id': data.get('turn_id'),
+                'retry_after': round(decision.retry_after, 2)
             })
             return
-            
-        if message_type == 'transcription':
-            response = await system.user_interaction.process_user_input({
-                'type': message_type,
-                'text': data.get('text', ''),
-                'audio_data': data.get('audio', None)
-            })
-            
-            await websocket.send_json({
-                'type': 'response',
-                'text': response.get('text', ''),
-                'audio': response.get('audio', None)
-            })
-        else:
-            await websocket.send_json({
-                'type': 'error',
-                'message': f'Unsupported message type: {message_type}'
-            })
-            
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
-        await websocket.send_json({
+        
+        # Run the turn as its own task so an interrupt can cancel it,
+        # and wait for it so replies stay in order
+        turn = turn_manager.start_turn(
+            connection.client_id,
+            run_turn(connection, data),
+            {'client_turn_id': data.get('turn_id')}
+        )
+        await asyncio.wait([turn.task])
+    else:
+        await connection.send({
             'type': 'error',
-            'message': 'Invalid JSON format'
+            'message': f'Unsupported message type: {message_type}'
+        })
+
+
+async def run_turn(connection: ClientConnection, data: Dict[str, Any]):
+    """Run a single conversational turn and send its reply"""
+    try:
+        response = await system.user_interaction.process_user_input({
+            'type': data['type'],
+            'text': data.get('text', ''),
+            'audio_data': data.get('audio', None),
+            'trace_id': data.get('trace_id'),
+            'include_timings': data.get('timings', Config.TRACE_TIMINGS)
         })
+        
+        reply = {
+            'type': 'response',
+            'turn_id': data.get('turn_id'),
+            'trace_id': response.get('trace_id'),
+            'text': response.get('text', ''),
+            'audio': response.get('audio', None)
+        }
+        if 'timings' in response:
+            reply['timings'] = response['timings']
+        await connection.send(reply)
+    except asyncio.CancelledError:
+        # Superseded by a newer utterance, drop any partial output
+        logger.debug(f"Turn cancelled for client {connection.client_id}")
+        raise
     except Exception as e:
-        logger.error(f"Error processing message: {str(e)}")
-        await websocket.send_json({
+        logger.error(f"Error processing turn: {str(e)}")
+        await connection.send({
             'type': 'error',
+            'turn_id': data.get('turn_id'),
             'message': 'Error processing request'
         })
 
 
+async def send_to_client(client_id: str, payload: Dict[str, Any]) -> bool:
+    """Send a message to a client, routing it to whichever worker holds its socket"""
+    connection = active_connections.get(client_id)
+    if connection is not None:
+        await connection.send(payload)
+        return True
+    
+    owner = await system.state_backend.connection_owner(client_id)
+    if owner is None:
+        return False
+    
+    await system.state_backend.publish(f"worker:{owner}", {
+        'client_id': client_id,
+        'payload': payload
+    })
+    return True
+
+
+async def deliver_worker_message(message: Dict[str, Any]) -> None:
+    """Deliver a message routed to this worker by another one"""
+    connection = active_connections.get(message.get('client_id'))
+    if connection is not None:
+        await connection.send(message['payload'])
+
+
+async def refresh_presence() -> None:
+    """Keep this worker's connection presence alive in the state backend"""
+    while True:
+        await asyncio.sleep(Config.CONNECTION_PRESENCE_TTL / 2)
+        try:
+            await system.state_backend.register_connections(
+                list(active_connections), WORKER_ID, Config.CONNECTION_PRESENCE_TTL
+            )
+        except Exception as e:
+            logger.error(f"Failed to refresh connection presence: {str(e)}")
+
+
 # Doctor endpoints
+@app.websocket("/ws/doctor/{doctor_id}")
+async def doctor_schedule_stream(websocket: WebSocket, doctor_id: str, since: int = 0,
+                                 token: Optional[str] = None):
+    """
+    Push schedule deltas to a doctor's dashboard.
+    
+    The doctor's bearer token comes as the `token` query parameter, since
+    browsers cannot set headers on a WebSocket, or in an Authorization
+    header; a missing token or one for another doctor closes with 1008.
+    Reconnecting dashboards pass the last `seq` they applied as `since`;
+    if that is too old to replay they are told to reload the schedule.
+    """
+    codec, subprotocol = negotiate(websocket.scope.get('subprotocols', []))
+    await websocket.accept(subprotocol=subprotocol)
+    if token is not None:
+        identity = system.token_verifier.verify(token)
+    else:
+        identity = system.token_verifier.verify_header(websocket.headers.get('authorization'))
+    if identity is None or identity.doctor_id != doctor_id:
+        await websocket.close(code=1008, reason='Invalid or expired token')
+        return
+    notifier = system.schedule_notifier
+    # Subscribe before replaying so nothing published in between is lost
+    subscription = notifier.subscribe(doctor_id)
+    
+    async def push():
+        replayed = notifier.replay(doctor_id, since)
+        if replayed is None:
+            await send_frame(websocket, codec, {
+                'type': 'resync',
+                'seq': notifier.latest_sequence(doctor_id)
+            })
+            replayed = []
+        for delta in replayed:
+            await send_frame(websocket, codec, {'type': 'schedule_delta', **delta})
+        sent = {delta['seq'] for delta in replayed}
+        
+        while True:
+            delta = await subscription.queue.get()
+            if subscription.overflowed:
+                # Too far behind to catch up delta by delta
+                subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                await send_frame(websocket, codec, {
+                    'type': 'resync',
+                    'seq': notifier.latest_sequence(doctor_id)
+                })
+                continue
+            if delta['seq'] not in sent:
+                await send_frame(websocket, codec, {'type': 'schedule_delta', **delta})
+    
+    async def listen():
+        # Only used to notice disconnects and answer pings
+        while True:
+            try:
+                message = await receive_frame(websocket, codec)
+            except WireFormatError:
+                continue
+            if isinstance(message, dict) and message.get('type') == 'ping':
+                await send_frame(websocket, codec, {'type': 'pong'})
+    
+    tasks = [asyncio.create_task(push()), asyncio.create_task(listen())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        notifier.unsubscribe(subscription)
+        logger.info(f"Schedule stream closed for doctor {doctor_id}")
+        # Retrieve every outcome, a disconnect included, so none is left unobserved
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 @app.post("/doctor/login")
 async def doctor_login(credentials: Dict[str, str]):
     """Doctor login endpoint"""
@@ -254,15 +712,69 @@ async def doctor_login(credentials: Dict[str, str]):
         raise HTTPException(status_code=401, detail=response['message'])
     return response
 
-@app.get("/doctor/{doctor_id}/schedule")
-async def get_doctor_schedule(doctor_id: str, date: str):
-    """Get doctor's schedule for a specific date"""
-    schedule_date = datetime.fromisoformat(date)
-    response = await system.doctor_calendar.get_daily_schedule(doctor_id, schedule_date)
+def current_doctor(request: Request) -> DoctorIdentity:
+    """Doctor named by the request's bearer token; no database read"""
+    identity = system.token_verifier.verify_header(request.headers.get('authorization'))
+    if identity is None:
+        raise HTTPException(status_code=401, detail='Invalid or expired token')
+    return identity
+
+@app.get("/doctor/me")
+async def get_current_doctor(doctor: DoctorIdentity = Depends(current_doctor)):
+    """Doctor the presented token was issued to"""
+    return {
+        'success': True,
+        'doctor': doctor
+    }
+
+@app.post("/doctor/logout")
+async def doctor_logout(request: Request, doctor: DoctorIdentity = Depends(current_doctor)):
+    """Revoke the presented token"""
+    token = request.headers['authorization'][7:].strip()
+    response = await system.doctor_auth.logout(token)
     if not response['success']:
         raise HTTPException(status_code=400, detail=response['message'])
     return response
 
+async def cached_doctor_read(request: Request, doctor_id: str, route: str,
+                             params: Dict[str, Any], compute) -> Response:
+    """
+    Serve a read of a doctor's calendar with ETag revalidation and a
+    short-lived server-side cache, computing it only when both miss
+    """
+    version = await system.schedule_notifier.version(doctor_id)
+    etag = response_cache.etag(doctor_id, version, route, params)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    
+    if ResponseCache.etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    
+    entry = response_cache.get(doctor_id, route, params, etag)
+    if entry is None:
+        response = await compute()
+        if not response['success']:
+            raise HTTPException(status_code=400, detail=response['message'])
+        entry = response_cache.put(doctor_id, route, params, version, response, etag)
+    return Response(entry.body, media_type='application/json', headers=headers)
+
+@app.get("/doctor/appointments")
+async def get_doctor_appointments(status: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None,
+                                  doctor: DoctorIdentity = Depends(current_doctor)):
+    """The signed-in doctor's appointments, newest first; pass next_cursor for the next page"""
+    response = await system.appointment_history.doctor_history(doctor.doctor_id, status, limit, cursor)
+    if not response['success']:
+        raise HTTPException(status_code=400, detail=response['message'])
+    return response
+
+@app.get("/doctor/{doctor_id}/schedule")
+async def get_doctor_schedule(request: Request, doctor_id: str, date: str):
+    """Get doctor's schedule for a specific date"""
+    schedule_date = datetime.fromisoformat(date)
+    return await cached_doctor_read(
+        request, doctor_id, 'schedule', {'date': schedule_date.date().isoformat()},
+        lambda: system.doctor_calendar.get_daily_schedule(doctor_id, schedule_date)
+    )
+
 @app.post("/doctor/{doctor_id}/availability")
 async def set_doctor_availability(doctor_id: str, availability: Dict[str, Any]):
     """Set doctor's availability"""
@@ -273,31 +785,78 @@ async def set_doctor_availability(doctor_id: str, availability: Dict[str, Any]):
 
 # Patient endpoints
 @app.get("/patient/slots/{doctor_id}")
-async def get_available_slots(doctor_id: str, start_date: str, end_date: str):
+async def get_available_slots(request: Request, doctor_id: str, start_date: str, end_date: str):
     """Get available appointment slots"""
-    response = await system.appointment_booking.find_available_slots(
-        doctor_id,
-        datetime.fromisoformat(start_date),
-        datetime.fromisoformat(end_date)
+    start = datetime.fromisoformat(start_date)
+    end = datetime.fromisoformat(end_date)
+    return await cached_doctor_read(
+        request, doctor_id, 'slots', {'start': start.isoformat(), 'end': end.isoformat()},
+        lambda: system.appointment_booking.find_available_slots(doctor_id, start, end)
+    )
+
+@app.post("/patient/appointment/hold")
+async def hold_slot(hold_data: Dict[str, Any]):
+    """Hold a free slot while the patient confirms; pass the hold_token to /book"""
+    response = await system.appointment_booking.hold_slot(
+        hold_data['patient_id'],
+        hold_data['doctor_id'],
+        datetime.fromisoformat(hold_data['slot_time'])
     )
     if not response['success']:
-        raise HTTPException(status_code=400, detail=response['message'])
+        raise HTTPException(status_code=409, detail=response['message'])
     return response
 
 @app.post("/patient/appointment/book")
 async def book_appointment(booking_data: Dict[str, Any]):
-    """Book a new appointment"""
+    """Book a new appointment, confirming a hold when a hold_token is given"""
     response = await system.appointment_booking.book_appointment(
         booking_data['patient_id'],
         booking_data['doctor_id'],
-        datetime.fromisoformat(booking_data['slot_time'])
+        datetime.fromisoformat(booking_data['slot_time']),
+        booking_data.get('hold_token')
     )
     if not response['success']:
         raise HTTPException(status_code=400, detail=response['message'])
     return response
 
+@app.post("/patient/appointment/book/bulk")
+async def book_appointments_bulk(booking_data: Dict[str, Any]):
+    """
+    Book several appointments at once.
+
+    The body holds either "items", a list of {patient_id, doctor_id, slot_time},
+    or "series", {patient_id, doctor_id, start, rrule}. With "atomic" (the
+    default) nothing is booked unless every slot is; otherwise each result
+    says whether that slot was booked.
+    """
+    from app.patient.bulk_booking import BookingItem
+    atomic = booking_data.get('atomic', True)
+    try:
+        if 'series' in booking_data:
+            series = booking_data['series']
+            response = await system.bulk_booking.book_series(
+                series['patient_id'],
+                series['doctor_id'],
+                datetime.fromisoformat(series['start']),
+                series['rrule'],
+                atomic
+            )
+        else:
+            items = [
+                BookingItem(item['patient_id'], item['doctor_id'], datetime.fromisoformat(item['slot_time']))
+                for item in booking_data['items']
+            ]
+            response = await system.bulk_booking.book_many(items, atomic)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk booking request: {str(e)}")
+    if not response['success']:
+        if 'results' in response:
+            return JSONResponse(status_code=409, content=response)
+        raise HTTPException(status_code=400, detail=response['message'])
+    return response
+
 @app.put("/patient/appointment/{appointment_id}/reschedule")
-async def reschedule_appointment(appointment_id: str, new_slot: Dict[str, str]):
+async def reschedule_appointment(appointment_id: int, new_slot: Dict[str, str]):
     """Reschedule an existing appointment"""
     response = await system.appointment_reschedule.reschedule_appointment(
         appointment_id,
@@ -307,27 +866,67 @@ async def reschedule_appointment(appointment_id: str, new_slot: Dict[str, str]):
         raise HTTPException(status_code=400, detail=response['message'])
     return response
 
+@app.get("/patient/appointment/{appointment_id}/sync")
+async def get_appointment_sync_status(appointment_id: int):
+    """Whether the appointment's Google Calendar event is up to date"""
+    response = await system.calendar_outbox.sync_status(appointment_id)
+    if not response['success']:
+        raise HTTPException(status_code=404, detail=response['message'])
+    return response
+
 @app.delete("/patient/appointment/{appointment_id}")
-async def cancel_appointment(appointment_id: str):
+async def cancel_appointment(appointment_id: int):
     """Cancel an appointment"""
     response = await system.appointment_cancel.cancel_appointment(appointment_id)
     if not response['success']:
         raise HTTPException(status_code=400, detail=response['message'])
     return response
 
+@app.get("/patient/{patient_id}/appointments")
+async def get_patient_appointments(patient_id: str, status: str = 'scheduled', limit: int = 20,
+                                   cursor: Optional[str] = None):
+    """A patient's appointments with one status, newest first; pass next_cursor for the next page"""
+    response = await system.appointment_history.patient_history(patient_id, status, limit, cursor)
+    if not response['success']:
+        raise HTTPException(status_code=400, detail=response['message'])
+    return response
+
+@app.get("/patient/{patient_id}/cancellations")
+async def get_cancellation_history(patient_id: str, limit: int = 20, cursor: Optional[str] = None):
+    """A patient's cancelled appointments, newest first; pass next_cursor for the next page"""
+    response = await system.appointment_cancel.get_cancellation_history(patient_id, limit, cursor)
+    if not response['success']:
+        raise HTTPException(status_code=400, detail=response['message'])
+    return response
+
 # Voice processing endpoints
 @app.post("/voice/transcribe")
-async def transcribe_audio(audio_data: bytes):
+async def transcribe_audio(request: Request):
     """Transcribe audio to text"""
-    response = await system.stt_service.transcribe_audio(audio_data)
+    # Stream the body so audio reaches Deepgram while it is still uploading
+    response = await system.stt_service.transcribe_stream(request.stream())
     if not response['success']:
         raise HTTPException(status_code=400, detail=response['message'])
     return response
 
 @app.post("/voice/synthesize")
-async def synthesize_speech(text_data: Dict[str, str]):
+async def synthesize_speech(text_data: Dict[str, Any]):
     """Convert text to speech"""
-    response = await system.tts_service.synthesize_speech(text_data['text'])
+    # Clients on constrained links can negotiate a smaller output format
+    output_config = {}
+    if text_data.get('sample_rate'):
+        # The TTS service accepts only its listed rates, at most the synthesized one
+        try:
+            output_config['output_sample_rate'] = int(text_data['sample_rate'])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="sample_rate must be an integer")
+    if text_data.get('encoding'):
+        output_config['output_encoding'] = text_data['encoding']
+    
+    response = await system.tts_service.synthesize_speech(
+        text_data['text'],
+        output_config
+    )
     if not response['success']:
         raise HTTPException(status_code=400, detail=response['message'])
     return response
@@ -335,43 +934,48 @@ async def synthesize_speech(text_data: Dict[str, str]):
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return {
-        "success": False,
-        "message": str(exc.detail),
-        "status_code": exc.status_code
-    }
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "success": False,
+            "message": str(exc.detail),
+            "status_code": exc.status_code
+        },
+        headers=exc.headers
+    )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     logger.error(f"Unexpected error: {str(exc)}")
-    return {
-        "success": False,
-        "message": "An unexpected error occurred",
-        "status_code": 500
-    }
-
-from contextlib import asynccontextmanager
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
-    logger.info("Starting AI Appointment Management System")
-    yield
-    # Shutdown
-    logger.info("Shutting down AI Appointment Management System")
-
-# Update the FastAPI initialization
-app = FastAPI(
-    title="AI Appointment Management System",
-    description="AI-powered system for managing medical appointments",
-    version="1.0.0",
-    lifespan=lifespan
-)
-
+    return JSONResponse(
+        status_code=500,
+        content={
+            "success": False,
+            "message": "An unexpected error occurred",
+            "status_code": 500
+        }
+    )
 
+def startup_report() -> None:
+    """Print what importing and building each component costs"""
+    imported_at = time.perf_counter()
+    errors = asyncio.run(system.warm_up())
+    total = time.perf_counter() - imported_at
+    
+    print(f"main imported in {(imported_at - PROCESS_STARTED) * 1000:.0f}ms")
+    print(f"{'component':<26}{'build (ms)':>12}")
+    for name, seconds in sorted(system.startup_timings.items(), key=lambda item: -item[1]):
+        print(f"{name:<26}{seconds * 1000:>12.1f}")
+    for name, error in errors.items():
+        print(f"{name:<26}{'failed':>12}  {error}")
+    print(f"all components built in {total * 1000:.0f}ms")
 
 
 if __name__ == "__main__":
+    if "--startup-report" in sys.argv:
+        startup_report()
+        sys.exit(0)
+    
     # Load environment variables
     port = int(os.getenv("PORT", 8000))
     
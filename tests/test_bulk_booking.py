@@ -0,0 +1,69 @@
+# test_bulk_booking.py
+"""
+Bulk bookings respect slot holds taken through the single-booking flow.
+"""
+import asyncio
+from datetime import datetime
+
+from app.db import create_database
+from app.patient.bulk_booking import BookingItem, BulkBooking
+from app.platform.slot_holds import SlotHolds
+
+MONDAY = datetime(2030, 1, 7, 9, 0)
+TUESDAY = datetime(2030, 1, 8, 9, 0)
+
+
+class FreeCalendar:
+    async def get_events(self, doctor_id, start, end):
+        return []
+
+
+async def booking_setup():
+    db = create_database('sqlite:///:memory:')
+    await db.connect()
+    await db.execute("INSERT INTO doctors (id, name, email) VALUES ('d1', 'Dr One', 'd1@example.com')")
+    await db.execute("INSERT INTO patients (id, name) VALUES ('p1', 'Pat'), ('p2', 'Sam')")
+    holds = SlotHolds(ttl=60)
+    return db, holds, BulkBooking(FreeCalendar(), db, slot_holds=holds)
+
+
+def test_held_slot_is_not_taken_by_a_bulk_booking():
+    async def main():
+        db, holds, bulk = await booking_setup()
+        held = await holds.hold('d1', MONDAY)
+
+        result = await bulk.book_many([
+            BookingItem('p2', 'd1', MONDAY),
+            BookingItem('p2', 'd1', TUESDAY)
+        ], atomic=False)
+
+        assert result['booked'] == 1
+        monday, tuesday = result['results']
+        assert not monday['success']
+        assert monday['message'] == 'Slot is being booked by another patient'
+        assert tuesday['success']
+
+        # The holder can still confirm, and bulk booking left no holds behind
+        assert await holds.confirm('d1', MONDAY, held.token) is not None
+        assert await holds.hold('d1', TUESDAY) is not None
+        await db.close()
+
+    asyncio.run(main())
+
+
+def test_atomic_series_books_nothing_when_a_slot_is_held():
+    async def main():
+        db, holds, bulk = await booking_setup()
+        await holds.hold('d1', TUESDAY)
+
+        result = await bulk.book_many([
+            BookingItem('p2', 'd1', MONDAY),
+            BookingItem('p2', 'd1', TUESDAY)
+        ])
+
+        assert not result['success']
+        assert result['booked'] == 0
+        assert await db.fetch_all("SELECT id FROM appointments") == []
+        await db.close()
+
+    asyncio.run(main())
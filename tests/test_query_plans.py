@@ -0,0 +1,51 @@
+# test_query_plans.py
+"""
+The app's hot queries stay index-backed on a freshly migrated schema.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.db import create_database
+from app.db.query_plans import assert_index_backed
+from app.patient.appointment_booking import SLOT_TAKEN_QUERY
+from app.patient.appointment_history import AFTER_CURSOR, DOCTOR_HISTORY_QUERY, PATIENT_HISTORY_QUERY
+from app.patient.appointment_reschedule import APPOINTMENT_QUERY
+
+SLOT = datetime(2030, 1, 7, 9, 0)
+
+CHECKS = {
+    'patient history': (
+        PATIENT_HISTORY_QUERY.format(after=''),
+        ('p1', 'cancelled', 21), 'appointments_patient_status_slot', True),
+    'patient history, later page': (
+        PATIENT_HISTORY_QUERY.format(after=AFTER_CURSOR),
+        ('p1', 'cancelled', SLOT, 10, 21), 'appointments_patient_status_slot', True),
+    'doctor history': (
+        DOCTOR_HISTORY_QUERY.format(status='', after=''),
+        ('d1', 21), 'appointments_doctor_slot', True),
+    'doctor history by status, later page': (
+        DOCTOR_HISTORY_QUERY.format(status='AND a.status = %s', after=AFTER_CURSOR),
+        ('d1', 'scheduled', SLOT, 10, 21), 'appointments_doctor_slot', True),
+    'slot overlap check': (
+        SLOT_TAKEN_QUERY, ('d1', SLOT, SLOT), 'appointments_doctor_slot', False),
+    'appointment by id': (
+        APPOINTMENT_QUERY, (1,), None, False),
+}
+
+
+@pytest.mark.parametrize('name', list(CHECKS))
+def test_query_is_index_backed(name):
+    query, params, index, ordered = CHECKS[name]
+
+    async def main():
+        database = create_database('sqlite:///:memory:')
+        # connect() creates the schema and applies the migrations
+        await database.connect()
+        try:
+            await assert_index_backed(database, query, params, index, ordered)
+        finally:
+            await database.close()
+
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+# test_state_backend.py
+"""
+The state backends against each other: RedisStateBackend talks to a
+fakeredis TCP server, a Redis-compatible stand-in, over real sockets.
+"""
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from app.platform.state_backend import InMemoryStateBackend, RedisStateBackend
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture
+def redis_url():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = fakeredis.TcpFakeServer(('127.0.0.1', port), server_type='redis')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'redis://127.0.0.1:{port}/0'
+    server.shutdown()
+    server.server_close()
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        await asyncio.sleep(0.01)
+
+
+def test_sessions_sequences_and_holds(redis_url):
+    async def main():
+        backend = RedisStateBackend(redis_url)
+        await backend.set_sessions({'u1': {'step': 1}, 'u2': {'step': 2}}, ttl=60)
+        assert await backend.get_sessions(['u1', 'u2', 'u3']) == {'u1': {'step': 1}, 'u2': {'step': 2}}
+        assert await backend.session_count() == 2
+        await backend.delete_session('u1')
+        assert await backend.get_session('u1') is None
+
+        await backend.register_connection('c1', 'worker-a', ttl=60)
+        assert await backend.connection_owner('c1') == 'worker-a'
+        await backend.unregister_connection('c1', 'worker-b')
+        assert await backend.connection_owner('c1') == 'worker-a'
+
+        assert [await backend.next_sequence('seq') for _ in range(3)] == [1, 2, 3]
+        assert await backend.get_sequence('seq') == 3
+
+        assert await backend.acquire_hold('d1:09:00', 'first', ttl=5)
+        assert not await backend.acquire_hold('d1:09:00', 'second', ttl=5)
+        await backend.close()
+
+    asyncio.run(main())
+
+
+def test_commands_do_not_queue_behind_a_slow_one(redis_url):
+    async def main():
+        backend = RedisStateBackend(redis_url, pool_size=2)
+        blocked = asyncio.create_task(backend._connection.execute('BLPOP', 'never-pushed', 1))
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        assert await backend.get_sequence('seq') == 0
+        assert time.monotonic() - started < 0.5
+        assert await blocked is None
+        await backend.close()
+
+    asyncio.run(main())
+
+
+def test_subscription_survives_a_dropped_connection(redis_url):
+    async def main():
+        backend = RedisStateBackend(redis_url)
+        backend.RECONNECT_DELAY = 0.01
+        received = []
+
+        async def handler(message):
+            received.append(message)
+
+        await backend.subscribe('one', handler)
+        await backend.subscribe('two', handler)
+        await asyncio.sleep(0.1)
+        await backend.publish('one', {'n': 1})
+        await wait_for(lambda: len(received) == 1)
+
+        # Cut the subscriber socket as a network blip would
+        backend._subscriber._writer.transport.abort()
+        await asyncio.sleep(0.2)
+
+        await backend.publish('one', {'n': 2})
+        await backend.publish('two', {'n': 3})
+        await wait_for(lambda: len(received) == 3)
+        assert received == [{'n': 1}, {'n': 2}, {'n': 3}]
+        await backend.close()
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize('kind', ['memory', 'redis'])
+def test_publish_behaves_the_same_on_both_backends(kind, request):
+    async def main():
+        if kind == 'redis':
+            backend = RedisStateBackend(request.getfixturevalue('redis_url'))
+        else:
+            backend = InMemoryStateBackend()
+        received = []
+
+        async def failing(message):
+            raise RuntimeError('handler bug')
+
+        async def recording(message):
+            received.append(message)
+
+        await backend.subscribe('channel', failing)
+        await backend.subscribe('channel', recording)
+        await asyncio.sleep(0.1)
+
+        message = {'n': 1}
+        # A failing handler never reaches the publisher, and delivery is not inline
+        await backend.publish('channel', message)
+        assert received == []
+        await wait_for(lambda: received)
+        assert received == [{'n': 1}]
+        assert received[0] is not message
+        await backend.close()
+
+    asyncio.run(main())
+
+
+def test_holds_extend_and_release_only_under_their_token(redis_url):
+    # EVAL needs fakeredis' optional Lua runtime
+    pytest.importorskip('lupa')
+
+    async def main():
+        backend = RedisStateBackend(redis_url)
+        assert await backend.acquire_hold('d1:09:00', 'mine', ttl=5)
+        assert not await backend.extend_hold('d1:09:00', 'theirs', ttl=5)
+        assert await backend.extend_hold('d1:09:00', 'mine', ttl=5)
+        assert not await backend.release_hold('d1:09:00', 'theirs')
+        assert await backend.release_hold('d1:09:00', 'mine')
+        assert await backend.acquire_hold('d1:09:00', 'theirs', ttl=5)
+        await backend.close()
+
+    asyncio.run(main())
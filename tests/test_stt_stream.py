@@ -0,0 +1,96 @@
+# test_stt_stream.py
+"""
+STTService.transcribe_stream fed a chunked WAV upload, with a fake
+transport standing in for Deepgram's prerecorded endpoint.
+"""
+import asyncio
+
+import numpy as np
+
+from app.voice.audio_processing import WAVE_FORMAT_PCM, build_wav, parse_wav_header
+from app.voice.stt_service import STTService
+
+SAMPLE_RATE = 16000
+
+
+class FakeTransport:
+    client = None
+
+    def __init__(self, transcript: str = 'book me for tuesday'):
+        self.transcript = transcript
+        self.uploads = []
+
+    async def call(self, func, *args, **kwargs):
+        return await func(*args, **kwargs)
+
+    async def transcribe_file(self, audio_data, options=None, mimetype='audio/wav'):
+        self.uploads.append((audio_data, options, mimetype))
+        return {
+            'metadata': {},
+            'results': {'channels': [{'alternatives': [
+                {'transcript': self.transcript, 'confidence': 0.9, 'words': []}
+            ]}]}
+        }
+
+
+def wav_upload(*parts: np.ndarray) -> bytes:
+    pcm = np.concatenate(parts).astype('<i2').tobytes()
+    return build_wav(pcm, WAVE_FORMAT_PCM, 1, SAMPLE_RATE, 16, 2)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.random.default_rng(0).normal(0, 20, int(SAMPLE_RATE * seconds))
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return 8000 * np.sin(2 * np.pi * 220 * t)
+
+
+async def chunked(data: bytes, size: int):
+    # An odd size, so chunk boundaries fall inside frames
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+def transcribe(upload: bytes, transport: FakeTransport):
+    service = STTService(transport=transport)
+    return asyncio.run(service.transcribe_stream(chunked(upload, 333)))
+
+
+def test_speech_is_sent_through_the_prerecorded_path_without_leading_silence():
+    speech = tone(1.0)
+    transport = FakeTransport()
+    result = transcribe(wav_upload(silence(2.0), speech), transport)
+
+    assert result['success'], result
+    assert result['transcript'] == 'book me for tuesday'
+    assert len(transport.uploads) == 1
+
+    audio, options, mimetype = transport.uploads[0]
+    info = parse_wav_header(audio)
+    assert mimetype == 'audio/wav'
+    assert options['model'] == 'general'
+    assert (info.sample_rate, info.channels, info.block_align) == (SAMPLE_RATE, 1, 2)
+    # Frame aligned, all the speech kept, most of the silence dropped
+    assert info.data_size % info.block_align == 0
+    assert speech.astype('<i2').tobytes() in audio
+    assert info.data_size < SAMPLE_RATE * 2 * 1.5
+
+
+def test_silent_upload_never_reaches_deepgram():
+    transport = FakeTransport()
+    result = transcribe(wav_upload(silence(2.0)), transport)
+
+    assert not result['success']
+    assert result['message'] == 'No speech detected in audio'
+    assert transport.uploads == []
+
+
+def test_malformed_upload_is_rejected():
+    transport = FakeTransport()
+    result = transcribe(b'RIFF' + b'\x00' * 100, transport)
+
+    assert not result['success']
+    assert result['message'].startswith('Invalid audio data format')
+    assert transport.uploads == []
@@ -0,0 +1,35 @@
+# test_wire_format.py
+"""
+Every codec puts the same values on the wire.
+"""
+from datetime import date, datetime, timezone
+
+import msgpack
+import pytest
+
+from app.platform import wire_format
+from app.platform.wire_format import JsonCodec, MsgpackCodec
+
+PAYLOAD = {
+    'naive': datetime(2030, 1, 7, 9, 0, 0, 250000),
+    'aware': datetime(2030, 1, 7, 9, 0, tzinfo=timezone.utc),
+    'day': date(2030, 1, 7)
+}
+EXPECTED = {
+    'naive': '2030-01-07T09:00:00.250000',
+    'aware': '2030-01-07T09:00:00+00:00',
+    'day': '2030-01-07'
+}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_json_dates_are_iso(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(wire_format, 'orjson', None)
+    elif wire_format.orjson is None:
+        pytest.skip('orjson is not installed')
+    assert JsonCodec().decode(JsonCodec().encode(PAYLOAD)) == EXPECTED
+
+
+def test_msgpack_dates_are_iso():
+    assert msgpack.unpackb(MsgpackCodec().encode(PAYLOAD), raw=False) == EXPECTED